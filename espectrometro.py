@@ -0,0 +1,128 @@
+import argparse
+import os
+import runpy
+import sys
+import warnings
+
+# --- PUNTO DE ENTRADA ÚNICO ---
+#
+#   python espectrometro.py capture [--carpeta datos/x] [--tramas 32] [--txt-png]
+#   python espectrometro.py live
+#   python espectrometro.py multi   [--puertos COM10,COM3]
+#   python espectrometro.py stats   [carpeta] [--titulo ...] [--espectro]
+#   python espectrometro.py overlay [carpeta] [--titulo ...]
+#
+# Cada subcomando importa sólo lo que usa: 'capture' no carga matplotlib salvo
+# con --txt-png, así una captura desde cron arranca en una fracción de segundo.
+# Sin pantalla (Linux sin DISPLAY/WAYLAND_DISPLAY) o con --headless se usa el
+# backend Agg: los gráficos se guardan como PNG sin abrir ventanas.
+# --puerto equivale a la variable ESPECTROMETRO_PUERTO ('sim', 'tcp://...', 'COM3', ...)
+# y --puertos a ESPECTROMETRO_PUERTOS ('COM10,COM3', 'sim,sim', ...).
+
+_DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+
+def _sin_pantalla():
+    return sys.platform.startswith("linux") and not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def _preparar_entorno(args):
+    """Backend de matplotlib y puerto, antes de importar cualquier módulo del proyecto."""
+    if args.headless:
+        os.environ["MPLBACKEND"] = "Agg"
+    elif _sin_pantalla():
+        os.environ.setdefault("MPLBACKEND", "Agg")
+    if os.environ.get("MPLBACKEND", "").lower() == "agg":
+        # plt.show() no hace nada con Agg: el aviso sólo ensucia la salida
+        warnings.filterwarnings("ignore", message=".*non-interactive.*")
+    if getattr(args, "puerto", None):
+        os.environ["ESPECTROMETRO_PUERTO"] = args.puerto
+    if getattr(args, "puertos", None):
+        os.environ["ESPECTROMETRO_PUERTOS"] = args.puertos
+
+
+def _opciones(args, *nombres):
+    """Sólo las opciones dadas en la línea de comandos; el resto, por defecto del script."""
+    return {nombre: getattr(args, nombre) for nombre in nombres if getattr(args, nombre) is not None}
+
+
+def comando_capture(args):
+    from espectrometro_captura_de_espectro_unico import capturar_espectro
+
+    espectro = capturar_espectro(**_opciones(args, "carpeta_path", "num_tramas", "metodo", "guardar_txt_png",
+                                             "protocolo"))
+    return 0 if espectro is not None else 1
+
+
+def comando_live(args):
+    # El script de captura en vivo se configura con sus constantes y corre a nivel de módulo
+    runpy.run_path(os.path.join(_DIRECTORIO, "espectrometro_captura_tiempo_real.py"), run_name="__main__")
+    return 0
+
+
+def comando_multi(args):
+    runpy.run_path(os.path.join(_DIRECTORIO, "espectrometro_captura_multiple.py"), run_name="__main__")
+    return 0
+
+
+def comando_stats(args):
+    import espectrometro_estadisticas as script
+
+    analisis = script.analisis_estadistico_y_histograma_ajustado
+    if args.espectro or (args.espectro is None and script.MODO_ANALISIS == "espectro"):
+        analisis = script.analisis_reproducibilidad_espectro
+    analisis(args.carpeta or script.CARPETA_DATOS, args.titulo or script.TITULO)
+    return 0
+
+
+def comando_overlay(args):
+    import espectrometro_grafico_de_datos as script
+
+    script.cargar_y_analizar_espectros(args.carpeta or script.CARPETA_DATOS, args.titulo or script.Titulo)
+    return 0
+
+
+def crear_parser():
+    # Sin valores por defecto aquí: los de cada script se usan recién al ejecutar el subcomando
+    parser = argparse.ArgumentParser(prog="espectrometro", description="Espectrómetro C12880MA")
+    parser.add_argument("--headless", action="store_true", help="sin ventanas (backend Agg)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    captura = sub.add_parser("capture", help="captura un espectro (ráfaga) y lo agrega al dataset")
+    captura.add_argument("--carpeta", dest="carpeta_path")
+    captura.add_argument("--tramas", dest="num_tramas", type=int, help="tramas de la ráfaga (1: una sola)")
+    captura.add_argument("--metodo", choices=("media", "mediana", "sigma"))
+    captura.add_argument("--protocolo", choices=("texto", "binario"))
+    captura.add_argument("--txt-png", dest="guardar_txt_png", action="store_const", const=True,
+                         help="también el .txt y el .png de 300 dpi")
+    captura.add_argument("--puerto")
+    captura.set_defaults(funcion=comando_capture)
+
+    vivo = sub.add_parser("live", help="espectro en tiempo real (espectrometro_captura_tiempo_real.py)")
+    vivo.add_argument("--puerto")
+    vivo.set_defaults(funcion=comando_live)
+
+    multiple = sub.add_parser("multi", help="varios espectrómetros a la vez (espectrometro_captura_multiple.py)")
+    multiple.add_argument("--puertos", help="separados por comas, p. ej. COM10,COM3 o sim,sim")
+    multiple.set_defaults(funcion=comando_multi)
+
+    for nombre, funcion, ayuda in (("stats", comando_stats, "estadísticas e histograma del peak de una carpeta"),
+                                   ("overlay", comando_overlay, "superposición de los espectros de una carpeta")):
+        analisis = sub.add_parser(nombre, help=ayuda)
+        analisis.add_argument("carpeta", nargs="?")
+        analisis.add_argument("--titulo")
+        analisis.set_defaults(funcion=funcion)
+        if nombre == "stats":
+            analisis.add_argument("--espectro", action="store_const", const=True,
+                                  help="los 288 píxeles por bloques: percentiles, CV e IC bootstrap y mapa de calor")
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    _preparar_entorno(args)
+    return args.funcion(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
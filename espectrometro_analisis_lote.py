@@ -0,0 +1,166 @@
+import contextlib
+import datetime
+import io
+import json
+import os
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from spectro_calibracion import cargar_espectros_calibrados, obtener_calibracion
+from spectro_core import EXTENSION_DATOS
+from spectro_dataset import cargar_espectros, existe_dataset
+from spectro_picos import pico_principal
+from spectro_stats import reporte_pico
+
+# --- ANÁLISIS EN LOTE DE TODAS LAS CARPETAS DE DATOS ---
+#
+# Recorre CARPETA_RAIZ, encuentra cada carpeta con capturas (.txt o dataset
+# binario) y las analiza en paralelo, una por proceso. Escribe un solo resumen
+# legible por máquina:
+#   resumen_lote.json   por carpeta: capturas, peak (nm), media, std y CV en el peak,
+#                       posición sub-píxel del peak por captura (media y std)
+#   resumen_lote.npz    arreglos por píxel (carpetas, longitud_onda, media, std, mínimo, máximo)
+# Los gráficos (histograma del peak y superposición de espectros de cada
+# carpeta) son una etapa aparte y opcional, también en paralelo.
+#
+# Uso: python espectrometro_analisis_lote.py [--graficos] [carpeta ...]
+
+# --- CONFIGURACIÓN ---
+CARPETA_RAIZ = "datos"
+USAR_CALIBRACION = True # Oscuro por píxel y eje de longitud de onda de datos/calibracion.npz
+GENERAR_GRAFICOS = False # True (o --graficos): también los PNG de cada carpeta
+PROCESOS = None # None: todos los núcleos
+ARCHIVO_RESUMEN = os.path.join(CARPETA_RAIZ, "resumen_lote") # Se agregan .json y .npz
+TRAMAS_POR_BLOQUE = 4096 # Capturas procesadas a la vez por el detector de picos
+# ---------------------------------------------
+
+
+def descubrir_carpetas(raiz=CARPETA_RAIZ):
+    """Carpetas bajo 'raiz' (a cualquier profundidad) con capturas .txt o dataset binario."""
+    carpetas = []
+    for carpeta, subcarpetas, archivos in os.walk(raiz):
+        subcarpetas[:] = sorted(d for d in subcarpetas if not d.startswith("."))
+        if existe_dataset(carpeta) or any(nombre.endswith(EXTENSION_DATOS) for nombre in archivos):
+            carpetas.append(carpeta)
+    return carpetas
+
+
+def _inicializar_trabajador():
+    # Cada proceso ya es uno de los núcleos: sin lectura en paralelo anidada de .txt
+    import spectro_txt
+    spectro_txt.MIN_ARCHIVOS_PARALELO = float("inf")
+
+
+def analizar_carpeta(carpeta_path, calibracion=None):
+    """Estadísticas de una carpeta: (resumen para el JSON, arreglos por píxel) o None si está vacía."""
+    if calibracion is not None:
+        longitud_onda, matriz_intensidad, _ = cargar_espectros_calibrados(carpeta_path, calibracion)
+    else:
+        longitud_onda, matriz_intensidad, _ = cargar_espectros(carpeta_path)
+    if len(matriz_intensidad) == 0:
+        return None
+    longitud_onda = np.asarray(longitud_onda, dtype=float)
+
+    media_intensidad = np.mean(matriz_intensidad, axis=0)
+    std_intensidad = np.std(matriz_intensidad, axis=0)
+    reporte = reporte_pico(media_intensidad, std_intensidad, longitud_onda)
+
+    # Posición sub-píxel del peak en cada captura, por bloques (memmap de cualquier tamaño)
+    posiciones = np.concatenate([
+        np.atleast_1d(pico_principal(np.asarray(matriz_intensidad[i:i + TRAMAS_POR_BLOQUE], dtype=float),
+                                     longitud_onda)[1])
+        for i in range(0, len(matriz_intensidad), TRAMAS_POR_BLOQUE)])
+
+    resumen = {
+        "carpeta": carpeta_path,
+        "capturas": len(matriz_intensidad),
+        "peak_nm": reporte["peak_nm"],
+        "peak_nm_subpixel": reporte["peak_nm_subpixel"],
+        "media_peak": reporte["media"],
+        "std_peak": reporte["std"],
+        "cv_peak_pct": reporte["error_relativo"],
+        "posicion_peak_media_nm": float(posiciones.mean()),
+        "posicion_peak_std_nm": float(posiciones.std()),
+    }
+    por_pixel = {
+        "longitud_onda": longitud_onda,
+        "media": media_intensidad,
+        "std": std_intensidad,
+        "minimo": np.min(matriz_intensidad, axis=0).astype(float),
+        "maximo": np.max(matriz_intensidad, axis=0).astype(float),
+    }
+    return resumen, por_pixel
+
+
+def guardar_resumen(resultados, ruta_base=ARCHIVO_RESUMEN, calibrado=USAR_CALIBRACION):
+    """Escribe ruta_base.json (tabla por carpeta) y ruta_base.npz (arreglos por píxel, mismo orden)."""
+    resumenes = [r[0] for r in resultados]
+    # NaN (p. ej. CV con media 0 en el oscuro) no es JSON estándar: se escribe null
+    tabla = [{k: (None if isinstance(v, float) and not np.isfinite(v) else v) for k, v in r.items()}
+             for r in resumenes]
+    with open(ruta_base + ".json", "w", encoding="utf-8") as f:
+        json.dump({"fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+                   "calibrado": calibrado, "carpetas": tabla}, f, indent=1, ensure_ascii=False)
+    arreglos = {clave: np.stack([r[1][clave] for r in resultados]) for clave in resultados[0][1]}
+    np.savez(ruta_base + ".npz", carpetas=np.array([r["carpeta"] for r in resumenes]), **arreglos)
+
+
+def imprimir_tabla(resumenes):
+    print(f"\n{'Carpeta':<32} {'Capturas':>8} {'Peak (nm)':>10} {'Media':>9} {'Std':>8} {'CV (%)':>7}")
+    for r in resumenes:
+        print(f"{r['carpeta']:<32} {r['capturas']:>8} {r['peak_nm_subpixel']:>10.2f} {r['media_peak']:>9.2f} "
+              f"{r['std_peak']:>8.2f} {r['cv_peak_pct']:>7.2f}")
+
+
+def graficar_carpeta(carpeta_path):
+    """Histograma del peak y superposición de espectros de una carpeta (sin ventanas)."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    import espectrometro_estadisticas
+    import espectrometro_grafico_de_datos
+
+    titulo = os.path.basename(os.path.normpath(carpeta_path))
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter("ignore") # plt.show() con Agg
+        espectrometro_estadisticas.analisis_estadistico_y_histograma_ajustado(carpeta_path, titulo)
+        espectrometro_grafico_de_datos.cargar_y_analizar_espectros(carpeta_path, titulo)
+    plt.close("all")
+    return carpeta_path
+
+
+# --- EJECUCIÓN ---
+# (protegida con __main__: el pool de procesos importa este script)
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    graficos = GENERAR_GRAFICOS or "--graficos" in argumentos
+    carpetas = [a for a in argumentos if a != "--graficos"] or descubrir_carpetas()
+    if not carpetas:
+        sys.exit(f"No se encontraron carpetas con capturas en '{CARPETA_RAIZ}'.")
+
+    # La calibración se construye una vez aquí; los procesos reciben una copia
+    calibracion = obtener_calibracion() if USAR_CALIBRACION else None
+    procesos = min(PROCESOS or os.cpu_count() or 1, len(carpetas))
+    print(f"Analizando {len(carpetas)} carpetas con {procesos} procesos...")
+
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_trabajador) as ejecutor:
+        resultados = list(ejecutor.map(analizar_carpeta, carpetas, [calibracion] * len(carpetas)))
+        vacias = [c for c, r in zip(carpetas, resultados) if r is None]
+        resultados = [r for r in resultados if r is not None]
+        if vacias:
+            print(f"Sin capturas: {', '.join(vacias)}")
+        if not resultados:
+            sys.exit("Ninguna carpeta tenía capturas para analizar.")
+
+        guardar_resumen(resultados)
+        imprimir_tabla([r[0] for r in resultados])
+        print(f"\nResumen guardado en: {ARCHIVO_RESUMEN}.json y {ARCHIVO_RESUMEN}.npz")
+
+        if graficos:
+            print("\nGenerando gráficos...")
+            for carpeta in ejecutor.map(graficar_carpeta, [r[0]["carpeta"] for r in resultados]):
+                print(f"Gráficos guardados en: {carpeta}")
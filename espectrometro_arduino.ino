@@ -11,6 +11,20 @@
 #define SPEC_CHANNELS    288 // New Spec Channel
 uint16_t data[SPEC_CHANNELS];
 
+/*
+ * Binary framing (optional, see spectro_serial.py):
+ *   0xA5 0x5A | uint16 frame counter | 288 x uint16 samples | uint16 checksum
+ * All uint16 little-endian; checksum = 16-bit sum of counter and samples.
+ * 582 bytes per frame instead of ~1.1 KB of text.
+ * The host switches at runtime by sending 'b' (binary) or 't' (text).
+ */
+#define BINARY_MODE      0 // 1 = start in binary mode
+#define SYNC_1           0xA5
+#define SYNC_2           0x5A
+
+bool binaryMode = BINARY_MODE;
+uint16_t frameCounter = 0;
+
 void setup(){
 
   //Set desired pins to OUTPUT
@@ -118,10 +132,42 @@ void printData(){
   Serial.print("\n");
 }
 
+/*
+ * Same frame in binary: the AVR is little-endian, so data[] is sent as is
+ */
+void printDataBinary(){
+
+  uint16_t checksum = frameCounter;
+  for (int i = 0; i < SPEC_CHANNELS; i++){
+    checksum += data[i];
+  }
+
+  Serial.write(SYNC_1);
+  Serial.write(SYNC_2);
+  Serial.write((uint8_t *)&frameCounter, sizeof(frameCounter));
+  Serial.write((uint8_t *)data, sizeof(data));
+  Serial.write((uint8_t *)&checksum, sizeof(checksum));
+}
+
+/*
+ * Host commands: 'b' = binary frames, 't' = text frames
+ */
+void readCommands(){
+
+  while (Serial.available() > 0){
+    char command = Serial.read();
+    if (command == 'b') binaryMode = true;
+    else if (command == 't') binaryMode = false;
+  }
+}
+
 void loop(){
    
+  readCommands();
   readSpectrometer();
-  printData();
+  if (binaryMode) printDataBinary();
+  else printData();
+  frameCounter++;
   delay(10);  
    
 }
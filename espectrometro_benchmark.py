@@ -0,0 +1,263 @@
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use("Agg") # Sin ventana: el benchmark corre en cualquier máquina Linux
+import matplotlib.pyplot as plt
+import numpy as np
+
+from spectro_cache import cargar_carpeta_cacheada
+from spectro_calibracion import Calibracion
+from spectro_core import LONGITUD_ONDA, Y_MAX_LIMITE
+from spectro_dataset import cargar_espectros, importar_txt
+from spectro_picos import SeguidorPicos, detectar_picos
+from spectro_render import RenderizadorEspectro
+from spectro_serial import (BufferCircular, DecodificadorBinario, DecodificadorTramas, FuenteSerial, HiloAdquisicion,
+                            codificar_binario)
+from spectro_simulador import PuertoSimulado, codificar_texto, tramas_sinteticas
+from spectro_stats import EstadisticasEnLinea
+from spectro_txt import cargar_capturas_txt
+
+# --- BENCHMARK DE EXTREMO A EXTREMO (SIN HARDWARE) ---
+#
+# Usa el simulador del Arduino (spectro_simulador.py) para medir:
+#   parseo      decodificación serial, texto y binaria (MB/s y tramas/s)
+#   sostenido   tramas/s del hilo lector con el procesamiento de la captura en vivo
+#   latencia    desde que la trama llega al PC hasta que se dibuja (Agg, con blitting)
+#   carga       lectura de carpetas de capturas: .txt, caché incremental y dataset binario
+#   arranque    de lanzar 'espectrometro.py capture' (sin pantalla, simulador) a tener el espectro guardado
+# Cada corrida se agrega a ARCHIVO_RESULTADOS y se compara con la anterior.
+#
+# Uso: python espectrometro_benchmark.py [parseo] [sostenido] [latencia] [carga] [arranque]
+
+ARCHIVO_RESULTADOS = "benchmark_resultados.json"
+TRAMAS_PARSEO = 4000
+BYTES_POR_LECTURA = 4096 # Tamaño típico de cada read() del puerto
+SEGUNDOS_SOSTENIDO = 3.0
+SEGUNDOS_LATENCIA = 3.0
+VELOCIDAD_LATENCIA = 10.0 # Simulador 10 veces más rápido que el Arduino real
+CAPTURAS_CARGA = 2000
+REPETICIONES_ARRANQUE = 5
+FPS_GUI = 30
+
+# En las claves terminadas así, menor es mejor (tiempos y pérdidas)
+_SUFIJOS_MENOR_ES_MEJOR = ("_ms", "_pct")
+
+
+def _cronometrar(funcion, repeticiones=3):
+    """Mejor tiempo (s) de varias repeticiones y el resultado de la última."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - t)
+    return mejor, resultado
+
+
+def bench_parseo():
+    """Decodificación en lecturas de BYTES_POR_LECTURA: texto de printData() (también en un
+    solo bloque) y tramas binarias."""
+    tramas = tramas_sinteticas(TRAMAS_PARSEO)
+    flujo = b"".join(codificar_texto(tramas))
+    flujo_binario = codificar_binario(tramas)
+
+    def por_trozos(datos, clase):
+        decodificador = clase()
+        for i in range(0, len(datos), BYTES_POR_LECTURA):
+            decodificador.alimentar(datos[i:i + BYTES_POR_LECTURA])
+        return decodificador.tramas_validas
+
+    def en_bloque():
+        return len(DecodificadorTramas().alimentar(flujo))
+
+    t_trozos, n = _cronometrar(lambda: por_trozos(flujo, DecodificadorTramas))
+    t_bloque, _ = _cronometrar(en_bloque)
+    t_binario, n_binario = _cronometrar(lambda: por_trozos(flujo_binario, DecodificadorBinario))
+    assert n == n_binario == TRAMAS_PARSEO
+    return {
+        "parseo_mb_s": len(flujo) / t_trozos / 1e6,
+        "parseo_tramas_s": n / t_trozos,
+        "parseo_bloque_tramas_s": n / t_bloque,
+        "parseo_binario_tramas_s": n / t_binario,
+    }
+
+
+def bench_sostenido():
+    """Tramas/s del hilo lector con el procesamiento de la captura en vivo (calibración,
+    estadísticas y picos) y pérdida de tramas al ritmo real del Arduino."""
+    calibracion = Calibracion.por_defecto()
+    estadisticas = EstadisticasEnLinea()
+    seguidor = SeguidorPicos()
+
+    def procesar_lote(tramas):
+        ajustadas = calibracion.aplicar(tramas)
+        estadisticas.agregar(ajustadas)
+        seguidor.actualizar_lote(detectar_picos(ajustadas))
+
+    resultados = {}
+    for nombre, velocidad, binario in (("maximo", None, False), ("real", 1.0, False),
+                                       ("real_binario", 1.0, True)):
+        puerto = PuertoSimulado(velocidad=velocidad, timeout=0.1, binario=binario)
+        decodificador = DecodificadorBinario() if binario else DecodificadorTramas()
+        hilo = HiloAdquisicion(FuenteSerial(puerto, decodificador), BufferCircular(256), [procesar_lote])
+        t = time.perf_counter()
+        hilo.start()
+        time.sleep(SEGUNDOS_SOSTENIDO)
+        hilo.detener()
+        duracion = time.perf_counter() - t
+        resultados[f"sostenido_{nombre}_tramas_s"] = hilo.capturadas / duracion
+        if nombre == "real":
+            esperadas = duracion * velocidad / puerto.periodo_trama
+            resultados["sostenido_real_perdidas_pct"] = max(0.0, 100 * (1 - hilo.capturadas / esperadas))
+    return resultados
+
+
+def bench_latencia():
+    """Tiempo desde que la trama termina de llegar al PC hasta que queda dibujada."""
+    puerto = PuertoSimulado(velocidad=VELOCIDAD_LATENCIA, timeout=0.1)
+    anillo = BufferCircular(256)
+    hilo = HiloAdquisicion(FuenteSerial(puerto), anillo)
+    calibracion = Calibracion.por_defecto()
+
+    fig, ax = plt.subplots(figsize=(14, 7))
+    renderizador = RenderizadorEspectro(ax, calibracion.longitud_onda, calibracion.colores, fps_objetivo=FPS_GUI)
+    ax.set_xlim(calibracion.longitud_onda[0], calibracion.longitud_onda[-1])
+    ax.set_ylim(0, Y_MAX_LIMITE)
+    fig.canvas.draw()
+
+    trama = np.zeros(LONGITUD_ONDA.size, dtype=np.uint16)
+    ajustada = np.zeros_like(trama)
+    latencias = []
+    ultima_secuencia = 0
+    hilo.start()
+    fin = time.perf_counter() + SEGUNDOS_LATENCIA
+    while time.perf_counter() < fin:
+        secuencia = anillo.ultima(trama)
+        if secuencia != ultima_secuencia:
+            ultima_secuencia = secuencia
+            renderizador.actualizar(calibracion.aplicar(trama, out=ajustada))
+            latencias.append(time.perf_counter() - puerto.instante_trama(secuencia - 1))
+        renderizador.esperar()
+    hilo.detener()
+    plt.close(fig)
+
+    latencias = np.array(latencias) * 1000
+    return {
+        "latencia_mediana_ms": float(np.median(latencias)),
+        "latencia_p95_ms": float(np.percentile(latencias, 95)),
+        "latencia_max_ms": float(latencias.max()),
+        "cuadros_s": renderizador.fps_medido,
+    }
+
+
+def _escribir_capturas_txt(carpeta_path, num):
+    """Capturas .txt con el formato de espectrometro_captura_de_espectro_unico.py."""
+    tramas = tramas_sinteticas(num).astype(float) - 127
+    inicio = datetime.datetime(2025, 1, 1)
+    for i, intensidad in enumerate(tramas):
+        tiempo = inicio + datetime.timedelta(seconds=i)
+        encabezado = (f"Espectro C12880MA - Capturado el {tiempo.strftime('%Y-%m-%d %H:%M:%S')}\n"
+                      f"Offset sustraido: 127\nLongitud_Onda (nm)\tIntensidad (ADC)")
+        np.savetxt(os.path.join(carpeta_path, f"Espectro_Captura_{tiempo.strftime('%Y%m%d_%H%M%S')}.txt"),
+                   np.stack((LONGITUD_ONDA, np.clip(intensidad, 0, None)), axis=1), fmt=['%.4f', '%d'],
+                   delimiter='\t', header=encabezado, comments='# ')
+
+
+def bench_carga():
+    """Lectura de una carpeta de CAPTURAS_CARGA capturas por cada camino de carga."""
+    with tempfile.TemporaryDirectory() as carpeta:
+        _escribir_capturas_txt(carpeta, CAPTURAS_CARGA)
+        rutas = sorted(os.path.join(carpeta, n) for n in os.listdir(carpeta))
+
+        t_secuencial, _ = _cronometrar(lambda: cargar_capturas_txt(rutas, procesos=1), 1)
+        t_paralelo, _ = _cronometrar(lambda: cargar_capturas_txt(rutas), 1)
+        t_cache_fria, _ = _cronometrar(lambda: cargar_carpeta_cacheada(carpeta), 1)
+        t_cache, _ = _cronometrar(lambda: cargar_carpeta_cacheada(carpeta))
+        t_importar, _ = _cronometrar(lambda: importar_txt(carpeta), 1)
+        t_dataset, _ = _cronometrar(lambda: np.mean(cargar_espectros(carpeta)[1], axis=0))
+
+    return {
+        "carga_txt_secuencial_ms": t_secuencial * 1000,
+        "carga_txt_paralelo_ms": t_paralelo * 1000,
+        "carga_cache_fria_ms": t_cache_fria * 1000,
+        "carga_cache_ms": t_cache * 1000,
+        "carga_importar_ms": t_importar * 1000,
+        "carga_dataset_media_ms": t_dataset * 1000,
+    }
+
+
+def bench_arranque():
+    """Procesos nuevos de la CLI, como los lanzaría cron: sólo la ayuda (importaciones de la CLI)
+    y una captura de una trama del simulador, sin pantalla."""
+    cli = os.path.join(os.path.dirname(os.path.abspath(__file__)), "espectrometro.py")
+    entorno = dict(os.environ, MPLBACKEND="Agg")
+    with tempfile.TemporaryDirectory() as carpeta:
+        def ejecutar(*argumentos):
+            subprocess.run([sys.executable, cli, *argumentos], cwd=carpeta, env=entorno, check=True,
+                           stdout=subprocess.DEVNULL)
+
+        t_ayuda, _ = _cronometrar(lambda: ejecutar("--help"), REPETICIONES_ARRANQUE)
+        t_captura, _ = _cronometrar(lambda: ejecutar("--headless", "capture", "--puerto", "sim",
+                                                     "--carpeta", "captura", "--tramas", "1"),
+                                    REPETICIONES_ARRANQUE)
+    return {
+        "arranque_cli_ms": t_ayuda * 1000,
+        "arranque_captura_ms": t_captura * 1000,
+    }
+
+
+BENCHMARKS = {
+    "parseo": bench_parseo,
+    "sostenido": bench_sostenido,
+    "latencia": bench_latencia,
+    "carga": bench_carga,
+    "arranque": bench_arranque,
+}
+
+
+def _anteriores(ruta):
+    if not os.path.isfile(ruta):
+        return []
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def imprimir_resultados(resultados, anterior=None):
+    """Tabla de resultados con la variación respecto de la corrida anterior."""
+    print("\n--- RESULTADOS DEL BENCHMARK ---")
+    for clave, valor in resultados.items():
+        linea = f"{clave:<32} {valor:>12.3f}"
+        if anterior and clave in anterior and anterior[clave]:
+            cambio = 100 * (valor - anterior[clave]) / abs(anterior[clave])
+            mejor = (cambio < 0) if clave.endswith(_SUFIJOS_MENOR_ES_MEJOR) else (cambio > 0)
+            if abs(cambio) >= 5: # Por debajo, ruido de medición
+                linea += f"   {cambio:+6.1f} % ({'mejor' if mejor else 'peor'})"
+        print(linea)
+
+
+# --- EJECUCIÓN ---
+# (protegida con __main__: la lectura en paralelo lanza procesos que importan este script)
+if __name__ == "__main__":
+    nombres = sys.argv[1:] or list(BENCHMARKS)
+    desconocidos = [n for n in nombres if n not in BENCHMARKS]
+    if desconocidos:
+        sys.exit(f"Benchmark desconocido: {', '.join(desconocidos)} (usar: {', '.join(BENCHMARKS)})")
+
+    resultados = {}
+    for nombre in nombres:
+        print(f"Midiendo: {nombre}...")
+        resultados.update(BENCHMARKS[nombre]())
+
+    historial = _anteriores(ARCHIVO_RESULTADOS)
+    anterior = historial[-1]["resultados"] if historial else None
+    imprimir_resultados(resultados, anterior)
+
+    historial.append({"fecha": datetime.datetime.now().isoformat(timespec="seconds"), "resultados": resultados})
+    with open(ARCHIVO_RESULTADOS, "w", encoding="utf-8") as f:
+        json.dump(historial, f, indent=1)
+    print(f"\nResultados agregados a: {ARCHIVO_RESULTADOS}")
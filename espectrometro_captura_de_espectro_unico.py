@@ -1,195 +1,214 @@
-import serial
-import numpy as np
-import matplotlib.pyplot as plt
-import time
-import datetime 
-import os # Importamos la librería OS
-from matplotlib.collections import LineCollection
-
-# --- CONFIGURACIÓN SERIAL Y OFFSET ---
-
-CARPETA_DATOS = os.path.join("datos", "laser_verde")
-
-ser = serial.Serial('COM10', 115200, timeout=1) # PC=Laptop
-
-#ser = serial.Serial('COM3', 115200, timeout=1) # PC= Torre
-
-
-print("Conectado -- Intentando capturar datos...")
-time.sleep(2)
-
-# VARIABLES GLOBALES
-OFFSET_VALOR = 127
-ADC_MAX = 1000 
-Y_MAX_LIMITE = ADC_MAX - OFFSET_VALOR 
-
-# Función para convertir nm a color RGB 
-def nm_to_rgb(wavelength):
-    """Convierte longitud de onda (nm) a color RGB aproximado"""
-    gamma = 1
-    
-    if wavelength < 380: wavelength = 380
-    if wavelength > 780: wavelength = 780
-        
-    if 380 <= wavelength < 440:
-        r = -(wavelength - 440) / (440 - 380)
-        g = 0.0
-        b = 1.0
-    elif 440 <= wavelength < 490:
-        r = 0.0
-        g = (wavelength - 440) / (490 - 440)
-        b = 1.0
-    elif 490 <= wavelength < 510:
-        r = 0.0
-        g = 1.0
-        b = -(wavelength - 510) / (510 - 490)
-    elif 510 <= wavelength < 580:
-        r = (wavelength - 510) / (580 - 510)
-        g = 1.0
-        b = 0.0
-    elif 580 <= wavelength < 645:
-        r = 1.0
-        g = -(wavelength - 645) / (645 - 580)
-        b = 0.0
-    elif 645 <= wavelength <= 780:
-        r = 1.0
-        g = 0.0
-        b = 0.0
-    else:
-        r, g, b = 0.0, 0.0, 0.0
-
-    # intensidad en los bordes
-    if 380 <= wavelength < 420:
-        factor = 0.3 + 0.7 * (wavelength - 380) / (420 - 380)
-    elif 420 <= wavelength < 700:
-        factor = 1.0
-    elif 700 <= wavelength <= 780:
-        factor = 0.3 + 0.7 * (780 - wavelength) / (780 - 700)
-    else:
-        factor = 1.0
-
-    r = min(1.0, (r * factor) ** gamma)
-    g = min(1.0, (g * factor) ** gamma)
-    b = min(1.0, (b * factor) ** gamma)
-    
-    return (r, g, b)
-
-# --- CAPTURA Y PROCESAMIENTO DE UNA SOLA LÍNEA DE DATOS ---
-
-datos_capturados = None
-datos_ajustados = None # Mantener esta variable para usarla más tarde
-
-# Esperamos hasta 10 segundos por una línea de datos válida
-tiempo_inicio = time.time()
-while time.time() - tiempo_inicio < 10: 
-    if ser.in_waiting > 0:
-        try:
-            raw = ser.readline()
-            texto = raw.decode('utf-8', errors='ignore').strip()
-            
-            if texto and ',' in texto:
-                numeros = []
-                for num in texto.split(','):
-                    num = num.strip()
-                    if num and num.isdigit():
-                        numeros.append(int(num))
-                
-                if len(numeros) == 288:
-                    # Datos válidos encontrados
-                    # Sustracción y Clip
-                    datos_numpy = np.array(numeros)
-                    datos_sustraidos = datos_numpy - OFFSET_VALOR
-                    datos_ajustados = np.clip(datos_sustraidos, 0, Y_MAX_LIMITE) 
-                    datos_capturados = datos_ajustados.tolist()
-                    print("Datos capturados exitosamente.")
-                    break
-        except Exception as e:
-            print(f"Error durante la lectura serial: {e}")
-            pass
-    time.sleep(0.01) # Pequeña pausa para no saturar la CPU
-
-# --- CIERRE TEMPRANO SI NO HAY DATOS ---
-if datos_capturados is None:
-    print("Error: No se pudieron capturar 288 puntos de datos válidos.")
-    ser.close()
-    exit()
-
-# --- CONFIGURACIÓN Y TRAZADO DE LA GRÁFICA (SIN MODO INTERACTIVO) ---
-
-# Crear array de longitudes de onda y colores (Necesario para el trazado)
-x = np.linspace(380, 850, 288)
-colors = [nm_to_rgb(wl) for wl in x]
-
-# Cálculo de información del peak
-peak_intensidad = np.max(datos_ajustados) # Usamos los datos_ajustados de la captura
-idx_peak = np.argmax(datos_ajustados)
-peak_longitud_onda = x[idx_peak]
-peak_color = nm_to_rgb(peak_longitud_onda)
-
-# Configurar gráfica
-fig, ax = plt.subplots(figsize=(14, 7))
-
-# Configuración de LineCollection con los datos capturados
-points = np.array([x, datos_capturados]).T.reshape(-1, 1, 2)
-segments = np.concatenate([points[:-1], points[1:]], axis=1)
-lc = LineCollection(segments, colors=colors, linewidth=2)
-ax.add_collection(lc)
-
-# Configuración de Ejes
-ax.set_xlim(380, 850)
-ax.set_ylim(0, Y_MAX_LIMITE) 
-ax.set_xlabel("Longitud de Onda (nm)", fontsize=12, fontweight='bold')
-ax.set_ylabel(f"Intensidad ", fontsize=12, fontweight='bold')
-
-# TÍTULO FINAL
-ax.set_title(f'Espectrómetro | Peak: {peak_longitud_onda:.1f} nm | Intensidad: {int(peak_intensidad)}', 
-             fontsize=14, fontweight='bold', color=peak_color)
-
-ax.grid(True, alpha=0.3)
-# ------------------------------------------------------------------
-
-# --- GESTIÓN DE CARPETAS Y GUARDADO DE ARCHIVOS ---
-
-# 1. Definir la ruta de la carpeta
-
-
-# 2. Crear la carpeta si no existe
-# os.makedirs(..., exist_ok=True) asegura que si ya existe, no arroje un error.
-os.makedirs(CARPETA_DATOS, exist_ok=True)
-print(f"Carpeta '{CARPETA_DATOS}' verificada/creada.")
-
-# 3. Crear el nombre de archivo base
-timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-nombre_base = f"Espectro_Captura_{timestamp}"
-
-# 4. Construir las rutas completas de los archivos
-# os.path.join() construye rutas que funcionan tanto en Windows, Linux como macOS.
-ruta_imagen = os.path.join(CARPETA_DATOS, nombre_base + ".png")
-ruta_datos = os.path.join(CARPETA_DATOS, nombre_base + ".txt")
-
-# 5. Guardar la imagen
-plt.savefig(ruta_imagen, bbox_inches='tight', dpi=300) 
-print(f"Imagen guardada en: {ruta_imagen}")
-
-# 6. Guardar los datos en TXT
-datos_combinados = np.stack((x, datos_ajustados), axis=1)
-
-header_text = f"Espectro C12880MA - Capturado el {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-header_text += f"Offset sustraido: {OFFSET_VALOR}\n"
-header_text += f"Longitud_Onda (nm)\tIntensidad (ADC)"
-
-np.savetxt(
-    ruta_datos,
-    datos_combinados,
-    fmt=['%.4f', '%d'], 
-    delimiter='\t',
-    header=header_text,
-    comments='# '
-)
-print(f"Datos guardados en: {ruta_datos}")
-# ------------------------------------------------------------------
-
-# --- FINALIZACIÓN DEL PROGRAMA ---
-ser.close()
-plt.close() 
-print("\nPrograma terminado exitosamente.")
\ No newline at end of file
+import numpy as np
+import time
+import datetime
+import os # Importamos la librería OS
+from spectro_calibracion import Calibracion, es_carpeta_oscuro, obtener_calibracion
+from spectro_core import Y_MAX_LIMITE, datos_pico
+from spectro_dataset import EscritorDataset
+from spectro_serial import abrir_puerto, crear_decodificador, esperar_placa
+from spectro_stats import reducir_rafaga
+
+# --- CONFIGURACIÓN SERIAL Y OFFSET ---
+
+CARPETA_DATOS = os.path.join("datos", "laser_verde")
+GUARDAR_TXT_PNG = False # True: además del dataset binario, guarda el .txt y el .png de 300 dpi por captura
+
+# CALIBRACIÓN (oscuro por píxel y eje de longitud de onda, ver spectro_calibracion.py)
+USAR_CALIBRACION = True # False: offset escalar OFFSET_VALOR y eje lineal 380-850 nm
+# Las capturas en la carpeta de oscuros (CARPETA_OSCURO, 'datos/Oscuro') se guardan crudas, sin restar nada
+
+# MODO RÁFAGA: N tramas consecutivas en una sola sesión, reducidas a un espectro
+NUM_TRAMAS_RAFAGA = 32 # 1 = comportamiento original (primera trama válida)
+METODO_RAFAGA = "sigma" # "media", "mediana" o "sigma" (media con rechazo de outliers)
+SIGMA_RECHAZO = 3.0
+
+# PROTOCOLO: "texto" (printData, ~1.1 KB por trama) o "binario" (582 bytes, con contador y checksum)
+PROTOCOLO = "texto"
+
+# COM10 (PC=Laptop) por defecto; otro puerto con ESPECTROMETRO_PUERTO (p. ej. COM3 en la torre,
+# la pseudo-terminal de spectro_simulador.py o 'sim' para el simulador sin hardware)
+
+# ---------------------------------------------
+
+
+def capturar_espectro(carpeta_path=CARPETA_DATOS, num_tramas=NUM_TRAMAS_RAFAGA, metodo=METODO_RAFAGA,
+                      guardar_txt_png=GUARDAR_TXT_PNG, protocolo=PROTOCOLO, puerto=None):
+    """Captura una ráfaga, la reduce a un espectro y lo agrega al dataset de la carpeta.
+
+    Devuelve el espectro (288,) o None si no llegaron datos. matplotlib sólo se
+    importa si hay que guardar el .png.
+    """
+    calibracion = obtener_calibracion() if USAR_CALIBRACION else Calibracion.por_defecto()
+    if es_carpeta_oscuro(carpeta_path):
+        # Oscuros crudos (offset 0, sin recorte en 0): de ellos sale el próximo oscuro por píxel
+        calibracion = Calibracion.cruda(calibracion.coeficientes)
+        print("Carpeta de oscuros: las tramas se guardan crudas.")
+    # El dataset se abre antes de adquirir: si la carpeta no admite la captura, la ráfaga no se pierde
+    # os.makedirs(..., exist_ok=True) lo hace el escritor: si ya existe, no arroja un error.
+    with EscritorDataset(carpeta_path, offset=calibracion.oscuro, longitud_onda=calibracion.longitud_onda) as escritor:
+        return _capturar_en(escritor, carpeta_path, calibracion, num_tramas, metodo, guardar_txt_png, protocolo,
+                            puerto)
+
+
+def _capturar_en(escritor, carpeta_path, calibracion, num_tramas, metodo, guardar_txt_png, protocolo, puerto):
+    ser = abrir_puerto(puerto)
+    print("Conectado -- Intentando capturar datos...")
+    if not esperar_placa(ser): # Hasta que el Arduino termina de reiniciarse y envía tramas
+        print("Aviso: el Arduino todavía no envía datos.")
+
+    # --- CAPTURA Y PROCESAMIENTO DE LA RÁFAGA ---
+
+    decodificador = crear_decodificador(protocolo, ser)
+    rafaga = np.empty((num_tramas, 288), dtype=np.uint16) # Preasignada para toda la ráfaga
+    num_capturadas = 0
+
+    # Esperamos hasta 10 segundos por la primera línea válida (más el tiempo de la ráfaga)
+    tiempo_inicio = time.time()
+    tiempo_limite = 10 + 0.2 * num_tramas
+    while time.time() - tiempo_inicio < tiempo_limite and num_capturadas < num_tramas:
+        try:
+            tramas = decodificador.leer(ser)
+        except Exception as e:
+            print(f"Error durante la lectura serial: {e}")
+            tramas = ()
+
+        if len(tramas) > 0:
+            # Datos válidos encontrados: se copian directo al array de la ráfaga
+            num = min(len(tramas), num_tramas - num_capturadas)
+            rafaga[num_capturadas:num_capturadas + num] = tramas[:num]
+            if num_capturadas == 0:
+                tiempo_captura = time.time()
+            num_capturadas += num
+            continue
+        time.sleep(0.01) # Pequeña pausa para no saturar la CPU
+
+    ser.close()
+
+    # --- CIERRE TEMPRANO SI NO HAY DATOS ---
+    if num_capturadas == 0:
+        print("Error: No se pudieron capturar 288 puntos de datos válidos.")
+        return None
+    if num_capturadas < num_tramas:
+        print(f"Aviso: sólo se capturaron {num_capturadas} de {num_tramas} tramas.")
+
+    # Sustracción del oscuro por píxel y Clip de toda la ráfaga (nada en los oscuros), luego reducción por píxel
+    rafaga = calibracion.aplicar(rafaga[:num_capturadas], out=rafaga[:num_capturadas])
+    datos_ajustados, std_ajustados, tramas_usadas = reducir_rafaga(rafaga, metodo, SIGMA_RECHAZO)
+    if num_capturadas == 1:
+        print("Datos capturados exitosamente.")
+    else:
+        print(f"Ráfaga capturada: {num_capturadas} tramas, método '{metodo}' "
+              f"(desviación típica media: {std_ajustados.mean():.2f} ADC).")
+
+    # Nombre de archivo base (también identifica la captura dentro del dataset)
+    timestamp = datetime.datetime.fromtimestamp(tiempo_captura).strftime("%Y%m%d_%H%M%S")
+    nombre_base = f"Espectro_Captura_{timestamp}"
+
+    # --- GUARDADO EN EL DATASET BINARIO DE LA CARPETA ---
+    escritor.agregar(np.rint(datos_ajustados), tiempo_captura)
+    if guardar_txt_png:
+        # El .txt ya está en el dataset: que importar_txt no lo duplique
+        escritor.marcar_importados([nombre_base + ".txt"])
+    print(f"Espectro agregado al dataset de '{carpeta_path}'.")
+
+    # Con ráfaga, la desviación típica por píxel se guarda junto al promedio
+    if num_capturadas > 1:
+        ruta_rafaga = os.path.join(carpeta_path, f"Rafaga_{timestamp}.npz")
+        np.savez(ruta_rafaga, intensidad=datos_ajustados, std=std_ajustados, tramas_usadas=tramas_usadas,
+                 num_tramas=num_capturadas, metodo=metodo, offset=calibracion.oscuro,
+                 longitud_onda=calibracion.longitud_onda, tiempo=tiempo_captura)
+        print(f"Promedio y desviación típica de la ráfaga guardados en: {ruta_rafaga}")
+
+    # --- FORMATO ANTERIOR (.TXT + .PNG), OPCIONAL ---
+    if guardar_txt_png:
+        guardar_txt_png_captura(carpeta_path, nombre_base, calibracion, datos_ajustados, std_ajustados,
+                                num_capturadas, tiempo_captura)
+    return datos_ajustados
+
+
+def guardar_txt_png_captura(carpeta_path, nombre_base, calibracion, datos_ajustados, std_ajustados,
+                            num_capturadas, tiempo_captura):
+    """Guarda la captura con el formato anterior: .png de 300 dpi y .txt de dos columnas."""
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+
+    # --- CONFIGURACIÓN Y TRAZADO DE LA GRÁFICA (SIN MODO INTERACTIVO) ---
+
+    # Crear array de longitudes de onda y colores (Necesario para el trazado)
+    x = calibracion.longitud_onda
+    colors = calibracion.colores
+
+    # Cálculo de información del peak (color por índice en la tabla precalculada)
+    idx_peak, peak_longitud_onda, peak_intensidad, peak_color = datos_pico(datos_ajustados, x, colors)
+
+    # Configurar gráfica
+    fig, ax = plt.subplots(figsize=(14, 7))
+
+    # Configuración de LineCollection con los datos capturados
+    points = np.array([x, datos_ajustados]).T.reshape(-1, 1, 2)
+    segments = np.concatenate([points[:-1], points[1:]], axis=1)
+    lc = LineCollection(segments, colors=colors, linewidth=2)
+    ax.add_collection(lc)
+
+    # Banda de ±1 desviación típica de la ráfaga
+    if num_capturadas > 1:
+        ax.fill_between(x, datos_ajustados - std_ajustados, datos_ajustados + std_ajustados,
+                        color='gray', alpha=0.3, linewidth=0, label=f'±1 $\\sigma$ ({num_capturadas} tramas)')
+        ax.legend(loc='upper right')
+
+    # Configuración de Ejes
+    ax.set_xlim(x[0], x[-1])
+    ax.set_ylim(0, Y_MAX_LIMITE)
+    ax.set_xlabel("Longitud de Onda (nm)", fontsize=12, fontweight='bold')
+    ax.set_ylabel(f"Intensidad ", fontsize=12, fontweight='bold')
+
+    # TÍTULO FINAL
+    ax.set_title(f'Espectrómetro | Peak: {peak_longitud_onda:.1f} nm | Intensidad: {int(peak_intensidad)}',
+                 fontsize=14, fontweight='bold', color=peak_color)
+
+    ax.grid(True, alpha=0.3)
+    # ------------------------------------------------------------------
+
+    # --- GESTIÓN DE CARPETAS Y GUARDADO DE ARCHIVOS ---
+
+    # 1. Carpeta ya creada por el dataset y nombre base ya definido
+
+    # 2. Construir las rutas completas de los archivos
+    # os.path.join() construye rutas que funcionan tanto en Windows, Linux como macOS.
+    ruta_imagen = os.path.join(carpeta_path, nombre_base + ".png")
+    ruta_datos = os.path.join(carpeta_path, nombre_base + ".txt")
+
+    # 3. Guardar la imagen
+    plt.savefig(ruta_imagen, bbox_inches='tight', dpi=300)
+    plt.close(fig)
+    print(f"Imagen guardada en: {ruta_imagen}")
+
+    # 4. Guardar los datos en TXT
+    datos_combinados = np.stack((x, datos_ajustados), axis=1)
+
+    header_text = f"Espectro C12880MA - Capturado el {datetime.datetime.fromtimestamp(tiempo_captura).strftime('%Y-%m-%d %H:%M:%S')}\n"
+    oscuro_uniforme = bool(np.all(calibracion.oscuro == calibracion.oscuro[0]))
+    header_text += f"Offset sustraido: {int(round(calibracion.oscuro.mean()))}"
+    if not oscuro_uniforme:
+        # El oscuro completo en la misma línea (el encabezado sigue teniendo 3): cada archivo se
+        # puede reajustar con el suyo aunque después cambie calibracion.npz
+        header_text += f" (oscuro por píxel: {','.join(map(str, calibracion.oscuro.tolist()))})"
+    header_text += "\n"
+    header_text += f"Longitud_Onda (nm)\tIntensidad (ADC)"
+
+    np.savetxt(
+        ruta_datos,
+        datos_combinados,
+        fmt=['%.4f', '%d' if num_capturadas == 1 else '%.2f'],
+        delimiter='\t',
+        header=header_text,
+        comments='# '
+    )
+    print(f"Datos guardados en: {ruta_datos}")
+    # ------------------------------------------------------------------
+
+
+# --- EJECUCIÓN DEL PROGRAMA ---
+if __name__ == "__main__":
+    if capturar_espectro() is not None:
+        print("\nPrograma terminado exitosamente.")
@@ -0,0 +1,103 @@
+import os
+import time
+
+import numpy as np
+
+from spectro_calibracion import Calibracion
+from spectro_dataset import EscritorDataset
+from spectro_multipuerto import AdquisicionMultiple
+from spectro_picos import pico_principal
+from spectro_serial import DecodificadorBinario
+from spectro_stats import EstadisticasEnLinea
+
+# --- CAPTURA SIMULTÁNEA CON VARIOS ESPECTRÓMETROS (SIN INTERFAZ) ---
+#
+# Un hilo lector por puerto (ver spectro_multipuerto.py). Las tramas de todos
+# los equipos se alinean por tiempo en conjuntos de una trama por equipo, que
+# pasan por el procesamiento (estadísticas por equipo) y la grabación (un
+# dataset por equipo en CARPETA_DATOS/espectrometro_<i>, con el mismo tiempo
+# de conjunto en todos). Para probar sin hardware:
+#     ESPECTROMETRO_PUERTOS=sim,sim,sim python espectrometro_captura_multiple.py
+
+# --- CONFIGURACIÓN ---
+PUERTOS = None # Lista de puertos; None: variable ESPECTROMETRO_PUERTOS o COM10 y COM3
+PROTOCOLO = "binario" # Con binario, el contador del firmware numera las tramas y muestra las perdidas
+TOLERANCIA_S = None # Máxima diferencia (s) con la trama de referencia; None: 3/4 del período
+GRABAR_DATASET = False # True: agrega cada conjunto a los datasets de CARPETA_DATOS
+CARPETA_DATOS = os.path.join("datos", "multiple")
+INTERVALO_REPORTE = 10 # Segundos entre líneas de estado
+# ---------------------------------------------
+
+# Oscuro escalar para todos: datos/calibracion.npz corresponde a un solo sensor
+calibracion = Calibracion.por_defecto()
+estadisticas = []
+escritores = []
+desfase = {"n": 0, "suma": 0.0, "max": 0.0} # Diferencia de tiempo dentro de cada conjunto
+
+
+def procesar_conjuntos(conjuntos, tiempos, secuencias):
+    """Procesa los conjuntos alineados (K, D, 288): estadísticas y grabación por equipo."""
+    ajustados = calibracion.aplicar(conjuntos)
+    dispersion = np.ptp(tiempos, axis=1)
+    desfase["n"] += len(dispersion)
+    desfase["suma"] += float(dispersion.sum())
+    desfase["max"] = max(desfase["max"], float(dispersion.max()))
+    tiempo_conjunto = adquisicion.a_epoch + tiempos.mean(axis=1) # Mismo tiempo en todos los datasets
+    for i, estadistica in enumerate(estadisticas):
+        estadistica.agregar(ajustados[:, i])
+    for i, escritor in enumerate(escritores):
+        escritor.agregar(ajustados[:, i], tiempo_conjunto)
+
+
+adquisicion = AdquisicionMultiple(PUERTOS, PROTOCOLO, [procesar_conjuntos], TOLERANCIA_S)
+dispositivos = adquisicion.dispositivos
+alineador = adquisicion.alineador
+estadisticas.extend(EstadisticasEnLinea() for _ in dispositivos)
+if GRABAR_DATASET:
+    escritores.extend(EscritorDataset(os.path.join(CARPETA_DATOS, d.nombre), offset=calibracion.oscuro,
+                                      longitud_onda=calibracion.longitud_onda) for d in dispositivos)
+
+print(f"Conectados {len(dispositivos)} espectrómetros: {', '.join(d.puerto for d in dispositivos)} "
+      f"(Ctrl+C para salir)")
+adquisicion.iniciar()
+
+anteriores = [0] * len(dispositivos)
+conjuntos_anteriores = 0
+try:
+    while True:
+        time.sleep(INTERVALO_REPORTE)
+        for i, d in enumerate(dispositivos):
+            recibidas = d.recibidas
+            linea = (f"{d.nombre} ({d.puerto}): {recibidas} tramas "
+                     f"({(recibidas - anteriores[i]) / INTERVALO_REPORTE:.1f}/s) | "
+                     f"sin pareja: {alineador.sin_pareja[i]}")
+            if isinstance(d.decodificador, DecodificadorBinario):
+                linea += f" | perdidas: {d.decodificador.tramas_perdidas}"
+            print(linea)
+            anteriores[i] = recibidas
+        conjuntos = alineador.conjuntos
+        print(f"Conjuntos alineados: {conjuntos} ({(conjuntos - conjuntos_anteriores) / INTERVALO_REPORTE:.1f}/s) | "
+              f"Desfase medio: {1e3 * desfase['suma'] / max(desfase['n'], 1):.1f} ms | "
+              f"máx: {1e3 * desfase['max']:.1f} ms\n")
+        conjuntos_anteriores = conjuntos
+except KeyboardInterrupt:
+    pass
+
+# --- FINALIZACIÓN ---
+adquisicion.detener()
+for escritor in escritores:
+    escritor.close()
+
+print(f"\nConjuntos alineados: {alineador.conjuntos}")
+for i, d in enumerate(dispositivos):
+    foto = estadisticas[i].instantanea()
+    resumen = f"{d.nombre} ({d.puerto}): {d.recibidas} tramas, {alineador.sin_pareja[i]} sin pareja"
+    if d.hilo.errores or d.hilo.errores_consumidores:
+        resumen += f", errores: {d.hilo.errores} de lectura y {d.hilo.errores_consumidores} de procesamiento"
+    if foto["n"]:
+        _, peak_nm, peak_intensidad = pico_principal(foto["media"], calibracion.longitud_onda)
+        resumen += f" | Peak medio: {peak_nm:.2f} nm ({peak_intensidad:.0f} ADC)"
+    print(resumen)
+if escritores:
+    print(f"Conjuntos guardados en: {CARPETA_DATOS}")
+print("\nPrograma terminado exitosamente.")
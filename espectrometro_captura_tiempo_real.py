@@ -1,178 +1,347 @@
-import serial
-import numpy as np
-import matplotlib.pyplot as plt
-import time
-from matplotlib.collections import LineCollection
-
-# --- CONFIGURACIÓN SERIAL Y OFFSET ---
-
-ser = serial.Serial('COM10', 115200, timeout=1) # PC=Laptop
-
-#ser = serial.Serial('COM3', 115200, timeout=1) # PC= Torre
-
-
-print("Conectado -- Esperando datos...")
-time.sleep(2)
-
-# VARIABLES GLOBALES
-OFFSET_VALOR = 127
-ADC_MAX = 1000 
-Y_MAX_LIMITE = ADC_MAX - OFFSET_VALOR 
-running = True # Flag de control para el bucle principal
-
-# Función para convertir nm a color RGB 
-def nm_to_rgb(wavelength):
-    """Convierte longitud de onda (nm) a color RGB aproximado"""
-    gamma = 1
-    
-    if wavelength < 380: wavelength = 380
-    if wavelength > 780: wavelength = 780
-        
-    if 380 <= wavelength < 440:
-        r = -(wavelength - 440) / (440 - 380)
-        g = 0.0
-        b = 1.0
-    elif 440 <= wavelength < 490:
-        r = 0.0
-        g = (wavelength - 440) / (490 - 440)
-        b = 1.0
-    elif 490 <= wavelength < 510:
-        r = 0.0
-        g = 1.0
-        b = -(wavelength - 510) / (510 - 490)
-    elif 510 <= wavelength < 580:
-        r = (wavelength - 510) / (580 - 510)
-        g = 1.0
-        b = 0.0
-    elif 580 <= wavelength < 645:
-        r = 1.0
-        g = -(wavelength - 645) / (645 - 580)
-        b = 0.0
-    elif 645 <= wavelength <= 780:
-        r = 1.0
-        g = 0.0
-        b = 0.0
-    else:
-        r, g, b = 0.0, 0.0, 0.0
-
-    # intensidad en los bordes
-    if 380 <= wavelength < 420:
-        factor = 0.3 + 0.7 * (wavelength - 380) / (420 - 380)
-    elif 420 <= wavelength < 700:
-        factor = 1.0
-    elif 700 <= wavelength <= 780:
-        factor = 0.3 + 0.7 * (780 - wavelength) / (780 - 700)
-    else:
-        factor = 1.0
-
-    r = min(1.0, (r * factor) ** gamma)
-    g = min(1.0, (g * factor) ** gamma)
-    b = min(1.0, (b * factor) ** gamma)
-    
-    return (r, g, b)
-
-# --- FUNCIONES DE CIERRE ---
-
-def on_close(event):
-    """Función para detener el bucle al cerrar la ventana de Matplotlib."""
-    global running
-    print("\nEvento de cierre de ventana detectado.")
-    running = False
-
-def on_key_press(event):
-    """Función para detener el bucle al presionar la tecla 'q'."""
-    global running
-    if event.key == 'q':
-        print("\nTecla 'q' (Quit) detectada.")
-        running = False
-# ----------------------------------
-
-# Configurar gráfica
-plt.ion()
-fig, ax = plt.subplots(figsize=(14, 7))
-
-# Conectar las funciones de cierre a los eventos de la figura
-fig.canvas.mpl_connect('close_event', on_close)
-fig.canvas.mpl_connect('key_press_event', on_key_press)
-
-# Crear array de longitudes de onda y colores
-x = np.linspace(380, 850, 288)
-colors = [nm_to_rgb(wl) for wl in x]
-
-# Configuración inicial de LineCollection y Ejes
-points = np.array([x, np.zeros(288)]).T.reshape(-1, 1, 2)
-segments = np.concatenate([points[:-1], points[1:]], axis=1)
-lc = LineCollection(segments, colors=colors, linewidth=2)
-ax.add_collection(lc)
-
-ax.set_xlim(380, 850)
-ax.set_ylim(0, Y_MAX_LIMITE) 
-ax.set_xlabel("Longitud de Onda (nm)", fontsize=12, fontweight='bold')
-ax.set_ylabel(f"Intensidad", fontsize=12, fontweight='bold')
-
-# --- TÍTULO  ---
-ax.set_title("Espectrómetro - Espectro en Tiempo Real", fontsize=14, fontweight='bold')
-
-
-fig.text(0.5, 0.01, 
-         "Presiona 'Q' para Salir o Cierra la Ventana", 
-         ha='center', va='bottom', 
-         fontsize=8, 
-         color='gray')
-
-# ------------------------------------------------------------------
-
-ax.grid(True, alpha=0.3)
-# --------------------------------------------------------
-
-# Bucle principal, usa flag running
-try:
-    while running:
-        if ser.in_waiting > 0:
-            try:
-                raw = ser.readline()
-                texto = raw.decode('utf-8', errors='ignore').strip()
-                
-                if texto and ',' in texto:
-                    numeros = []
-                    for num in texto.split(','):
-                        num = num.strip()
-                        if num and num.isdigit():
-                            numeros.append(int(num))
-                    
-                    if len(numeros) == 288:
-                        # Sustracción y Clip
-                        datos_numpy = np.array(numeros)
-                        datos_sustraidos = datos_numpy - OFFSET_VALOR
-                        datos_ajustados = np.clip(datos_sustraidos, 0, Y_MAX_LIMITE) 
-                        
-                        # Actualización de la gráfica
-                        numeros_ajustados = datos_ajustados.tolist() 
-                        new_points = np.array([x, numeros_ajustados]).T.reshape(-1, 1, 2)
-                        new_segments = np.concatenate([new_points[:-1], new_points[1:]], axis=1)
-                        lc.set_segments(new_segments)
-                        
-                        # Cálculo y actualización del título
-                        peak_intensidad = np.max(datos_ajustados)
-                        idx_peak = np.argmax(datos_ajustados)
-                        peak_longitud_onda = x[idx_peak]
-                        peak_color = nm_to_rgb(peak_longitud_onda) # Llama a la función para el color
-                        
-                        # Actualización del título limpio
-                        ax.set_title(f'Espectrómetro - Peak: {peak_longitud_onda:.1f} nm | Intensidad: {int(peak_intensidad)}', 
-                                     fontsize=14, fontweight='bold', color=peak_color)
-                        
-                        plt.pause(0.01)
-                        
-            except Exception as e:
-                # print(f"Error en el procesamiento de datos: {e}") 
-                pass 
-                
-except KeyboardInterrupt:
-    pass 
-    
-#FINALIZACIÓN DEL PROGRAMA 
-
-ser.close()
-plt.close()
+import numpy as np
+import matplotlib.pyplot as plt
+import os
+from matplotlib.collections import LineCollection
+from spectro_biblioteca import ClasificadorEnLinea, carpetas_de_referencia, construir_biblioteca
+from spectro_calibracion import Calibracion, obtener_calibracion
+from spectro_core import Y_MAX_LIMITE
+from spectro_dataset import EscritorDataset
+from spectro_disparo import DisparoPorCambio, ruido_de_carpeta
+from spectro_grabacion import GrabadorContinuo
+from spectro_instrumentacion import Instrumentacion
+from spectro_picos import SeguidorPicos, detectar_picos, imprimir_pistas, pico_principal
+from spectro_render import RenderizadorEspectro
+from spectro_serial import (BufferCircular, DecodificadorBinario, FuenteSerial, HiloAdquisicion, abrir_puerto,
+                            crear_decodificador, esperar_placa)
+from spectro_stats import EstadisticasEnLinea, imprimir_reporte_pico
+
+# --- CONFIGURACIÓN SERIAL Y OFFSET ---
+
+# COM10 (PC=Laptop) por defecto; otro puerto con ESPECTROMETRO_PUERTO (p. ej. COM3 en la torre,
+# la pseudo-terminal de spectro_simulador.py o 'sim' para el simulador sin hardware)
+ser = abrir_puerto()
+
+# PROTOCOLO: "texto" (printData, ~1.1 KB por trama) o "binario" (582 bytes, con contador y checksum)
+PROTOCOLO = "texto"
+
+
+print("Conectado -- Esperando datos...")
+if not esperar_placa(ser): # Hasta que el Arduino termina de reiniciarse y envía tramas
+    print("Aviso: el Arduino todavía no envía datos.")
+
+# VARIABLES GLOBALES (offset, límites y eje en spectro_core / spectro_calibracion)
+running = True # Flag de control para el bucle principal
+
+# ADQUISICIÓN EN SEGUNDO PLANO
+MODO_HILO = True # True: un hilo lee el puerto y la gráfica muestra sólo la última trama
+CAPACIDAD_ANILLO = 256 # Tramas guardadas en el buffer circular
+FPS_GUI = 30 # Frecuencia máxima de refresco de la gráfica
+MODO_BLIT = True # True: se dibuja el fondo una vez y sólo se redibujan línea y anotación del peak
+
+# CALIBRACIÓN (oscuro por píxel y eje de longitud de onda, ver spectro_calibracion.py)
+USAR_CALIBRACION = True # False: offset escalar OFFSET_VALOR y eje lineal 380-850 nm
+
+# REGISTRO EN DATASET BINARIO
+GRABAR_DATASET = False # True: agrega cada trama capturada al dataset de CARPETA_DATASET
+CARPETA_DATASET = os.path.join("datos", "tiempo_real")
+
+# GRABACIÓN CONTINUA (sesiones largas: bloques comprimidos escritos en segundo plano, con rotación)
+GRABAR_CONTINUO = False # True: graba cada trama con su tiempo en CARPETA_GRABACION (ver spectro_grabacion.py)
+CARPETA_GRABACION = os.path.join("datos", "grabaciones")
+
+# CAPTURA POR CAMBIO (escena vigilada: sólo se guarda cuando algo cambia, ver spectro_disparo.py)
+DISPARO_POR_CAMBIO = False # True: dataset y grabación continua reciben sólo las tramas alrededor de cada cambio
+CARPETA_RUIDO = None # Capturas de la escena quieta para el std por píxel; None: se aprende de las primeras tramas
+
+# ESTADÍSTICAS EN LÍNEA (media, varianza, mín/máx y peaks por píxel, en memoria constante)
+ESTADISTICAS_EN_LINEA = True # Tecla 's' imprime el reporte del peak en cualquier momento
+
+# SEGUIMIENTO DE PICOS (varios picos por trama, sub-píxel, sobre cada lote capturado)
+SEGUIR_PICOS = True # Tecla 's' también lista los picos seguidos y su deriva en nm
+PROMINENCIA_MIN = 25 # ADC sobre la base del pico para no seguir ruido
+
+# IDENTIFICACIÓN DE LA FUENTE (biblioteca espectral de las carpetas de datos, ver spectro_biblioteca.py)
+IDENTIFICAR_FUENTE = False # True: etiqueta cada trama con la fuente más parecida; tecla 'b' relee las carpetas
+CARPETAS_BIBLIOTECA = None # Lista de carpetas de referencia; None: cada subcarpeta de 'datos' es una fuente
+METRICA_BIBLIOTECA = "coseno" # "coseno", "sam" (ángulo en grados) o "correlacion"
+UMBRAL_BIBLIOTECA = 0.95 # Similitud mínima (ángulo máximo con "sam"); por debajo la trama es "desconocido"
+
+# INSTRUMENTACIÓN (tiempos por etapa, contadores y buffer serial, ver spectro_instrumentacion.py)
+INSTRUMENTAR = False # True: reporte cada INTERVALO_INSTRUMENTACION s, tecla 'i' y JSON al salir
+INTERVALO_INSTRUMENTACION = 10 # Segundos
+ARCHIVO_INSTRUMENTACION = "instrumentacion.json"
+
+# --- FUNCIONES DE CIERRE ---
+
+def on_close(event):
+    """Función para detener el bucle al cerrar la ventana de Matplotlib."""
+    global running
+    print("\nEvento de cierre de ventana detectado.")
+    running = False
+
+def on_key_press(event):
+    """Función para detener el bucle al presionar la tecla 'q' (o ver estadísticas con 's')."""
+    global running
+    if event.key == 'q':
+        print("\nTecla 'q' (Quit) detectada.")
+        running = False
+    elif event.key == 's' and (ESTADISTICAS_EN_LINEA or SEGUIR_PICOS or IDENTIFICAR_FUENTE):
+        mostrar_estadisticas()
+    elif event.key == 'i' and INSTRUMENTAR:
+        instrumentacion.imprimir_reporte()
+    elif event.key == 'b' and IDENTIFICAR_FUENTE:
+        print(f"\nBiblioteca: {biblioteca.actualizar()} capturas nuevas indexadas ({len(biblioteca)} en total).")
+# ----------------------------------
+
+# Configurar gráfica
+# 's' es por defecto 'guardar figura' (diálogo bloqueante): queda sólo para las estadísticas ('ctrl+s' guarda)
+plt.rcParams['keymap.save'] = [k for k in plt.rcParams['keymap.save'] if k != 's']
+plt.ion()
+fig, ax = plt.subplots(figsize=(14, 7))
+
+# Conectar las funciones de cierre a los eventos de la figura
+fig.canvas.mpl_connect('close_event', on_close)
+fig.canvas.mpl_connect('key_press_event', on_key_press)
+
+# Calibración, longitudes de onda y tabla de colores precalculada (288, 3)
+calibracion = obtener_calibracion() if USAR_CALIBRACION else Calibracion.por_defecto()
+x = calibracion.longitud_onda
+colors = calibracion.colores
+
+# Configuración inicial de LineCollection y Ejes
+if MODO_BLIT:
+    renderizador = RenderizadorEspectro(ax, x, colors, fps_objetivo=FPS_GUI)
+else:
+    points = np.array([x, np.zeros(288)]).T.reshape(-1, 1, 2)
+    segments = np.concatenate([points[:-1], points[1:]], axis=1)
+    lc = LineCollection(segments, colors=colors, linewidth=2)
+    ax.add_collection(lc)
+
+ax.set_xlim(x[0], x[-1])
+ax.set_ylim(0, Y_MAX_LIMITE) 
+ax.set_xlabel("Longitud de Onda (nm)", fontsize=12, fontweight='bold')
+ax.set_ylabel(f"Intensidad", fontsize=12, fontweight='bold')
+
+# --- TÍTULO  ---
+ax.set_title("Espectrómetro - Espectro en Tiempo Real", fontsize=14, fontweight='bold')
+
+
+fig.text(0.5, 0.01, 
+         "Presiona 'Q' para Salir o Cierra la Ventana | 'S' muestra estadísticas", 
+         ha='center', va='bottom', 
+         fontsize=8, 
+         color='gray')
+
+# ------------------------------------------------------------------
+
+ax.grid(True, alpha=0.3)
+# --------------------------------------------------------
+
+def esperar_gui():
+    """Deja respirar a la interfaz hasta el próximo cuadro."""
+    t = instrumentacion.reloj()
+    if MODO_BLIT:
+        renderizador.esperar()
+    else:
+        plt.pause(1 / FPS_GUI if MODO_HILO else 0.01)
+    instrumentacion.medir("espera_gui", t)
+
+if MODO_BLIT:
+    plt.show(block=False)
+    fig.canvas.draw()
+
+# Decodificador compartido (lee todo el buffer serial de una vez); también cambia el modo del firmware
+decodificador = crear_decodificador(PROTOCOLO, ser)
+
+# Sin INSTRUMENTAR, reloj() y medir() no hacen nada
+instrumentacion = Instrumentacion(INSTRUMENTAR, INTERVALO_INSTRUMENTACION)
+instrumentacion.registrar_contador("tramas_recibidas", lambda: decodificador.tramas_validas)
+instrumentacion.registrar_contador("tramas_mostradas", lambda: tramas_mostradas)
+instrumentacion.registrar_contador("tramas_no_mostradas", lambda: decodificador.tramas_validas - tramas_mostradas)
+if isinstance(decodificador, DecodificadorBinario):
+    instrumentacion.registrar_contador("tramas_malformadas", lambda: decodificador.tramas_invalidas)
+    instrumentacion.registrar_contador("tramas_perdidas", lambda: decodificador.tramas_perdidas)
+else:
+    instrumentacion.registrar_contador("tramas_malformadas", lambda: decodificador.lineas_invalidas)
+
+if GRABAR_DATASET:
+    escritor = EscritorDataset(CARPETA_DATASET, offset=calibracion.oscuro, longitud_onda=x)
+if GRABAR_CONTINUO:
+    grabador = GrabadorContinuo(CARPETA_GRABACION, offset=calibracion.oscuro, longitud_onda=x)
+if DISPARO_POR_CAMBIO and (GRABAR_DATASET or GRABAR_CONTINUO):
+    destinos = ([escritor] if GRABAR_DATASET else []) + ([grabador] if GRABAR_CONTINUO else [])
+    referencia, ruido = ruido_de_carpeta(CARPETA_RUIDO, calibracion) if CARPETA_RUIDO else (None, None)
+    disparo = DisparoPorCambio(destinos, referencia, ruido)
+if ESTADISTICAS_EN_LINEA:
+    estadisticas = EstadisticasEnLinea()
+if SEGUIR_PICOS:
+    seguidor = SeguidorPicos()
+if IDENTIFICAR_FUENTE:
+    # Las carpetas donde graba esta misma sesión no son fuentes de referencia
+    carpetas_sesion = {os.path.normpath(CARPETA_DATASET), os.path.normpath(CARPETA_GRABACION)}
+    biblioteca = construir_biblioteca([c for c in CARPETAS_BIBLIOTECA or carpetas_de_referencia()
+                                       if os.path.normpath(c) not in carpetas_sesion],
+                                      METRICA_BIBLIOTECA, calibracion=calibracion)
+    print(f"Biblioteca: {len(biblioteca)} espectros de {len(biblioteca.etiquetas)} fuentes "
+          f"({', '.join(biblioteca.etiquetas)})")
+    clasificador = ClasificadorEnLinea(biblioteca, UMBRAL_BIBLIOTECA)
+
+def procesar_lote(tramas):
+    """Procesa cada lote decodificado completo (en el hilo lector si MODO_HILO)."""
+    if not (GRABAR_DATASET or GRABAR_CONTINUO or ESTADISTICAS_EN_LINEA or SEGUIR_PICOS or IDENTIFICAR_FUENTE):
+        return
+    ajustadas = calibracion.aplicar(tramas)
+    if DISPARO_POR_CAMBIO and (GRABAR_DATASET or GRABAR_CONTINUO):
+        disparo.agregar(ajustadas)
+    else:
+        if GRABAR_DATASET:
+            escritor.agregar(ajustadas)
+        if GRABAR_CONTINUO:
+            grabador.agregar(ajustadas)
+    if ESTADISTICAS_EN_LINEA:
+        estadisticas.agregar(ajustadas)
+    if SEGUIR_PICOS:
+        seguidor.actualizar_lote(detectar_picos(ajustadas, x, prominencia_min=PROMINENCIA_MIN))
+    if IDENTIFICAR_FUENTE:
+        clasificador.agregar(ajustadas) # Todo el lote con una sola multiplicación de matrices
+
+def mostrar_estadisticas():
+    """Imprime el reporte del peak con todas las tramas acumuladas hasta ahora."""
+    if SEGUIR_PICOS:
+        imprimir_pistas(seguidor.activas(min_tramas=2))
+    if IDENTIFICAR_FUENTE:
+        clasificador.imprimir_conteos()
+    if not ESTADISTICAS_EN_LINEA:
+        return
+    reporte = estadisticas.reporte(x)
+    if reporte is None:
+        print("\nAún no hay tramas para estadísticas.")
+        return
+    imprimir_reporte_pico(reporte)
+    print(f"Tramas acumuladas: {reporte['n']} | Peak más frecuente: {reporte['peak_frecuente_nm']:.2f} nm")
+
+consumidores = [procesar_lote]
+
+if MODO_HILO:
+    anillo = BufferCircular(CAPACIDAD_ANILLO)
+    hilo = HiloAdquisicion(FuenteSerial(ser, decodificador, instrumentacion), anillo, consumidores,
+                           instrumentacion)
+    instrumentacion.registrar_contador("errores_lectura", lambda: hilo.errores)
+    instrumentacion.registrar_contador("errores_consumidores", lambda: hilo.errores_consumidores)
+    hilo.start()
+
+trama = np.zeros(288, dtype=np.uint16)
+datos_ajustados = np.zeros(288, dtype=np.uint16) # Buffer reutilizado por calibracion.aplicar
+ultima_secuencia = 0
+tramas_mostradas = 0
+
+# Bucle principal, usa flag running
+try:
+    while running:
+        instrumentacion.reportar_si_corresponde()
+        if MODO_HILO:
+            # La gráfica avanza a su propio ritmo; el hilo nunca espera al dibujo
+            secuencia = anillo.ultima(trama)
+            if secuencia == ultima_secuencia:
+                esperar_gui()
+                continue
+        else:
+            # Drena todo lo disponible y decodifica las tramas completas en bloque
+            t = instrumentacion.reloj()
+            if INSTRUMENTAR:
+                instrumentacion.nivel("buffer_serial_bytes", ser.in_waiting)
+            tramas = decodificador.leer(ser)
+            t = instrumentacion.medir("lectura_decodificacion", t)
+            if len(tramas) == 0:
+                esperar_gui()
+                continue
+            for consumidor in consumidores:
+                consumidor(tramas)
+            instrumentacion.medir("consumidores", t)
+            trama = tramas[-1]
+            secuencia = decodificador.tramas_validas
+
+        ultima_secuencia = secuencia
+        tramas_mostradas += 1
+
+        # Sólo se dibuja la trama más reciente
+        # Sustracción del oscuro por píxel y Clip (fusionados, sin arrays temporales)
+        t = instrumentacion.reloj()
+        calibracion.aplicar(trama, out=datos_ajustados)
+        t = instrumentacion.medir("calibracion", t)
+
+        fuente = ""
+        if IDENTIFICAR_FUENTE:
+            etiquetas, puntuaciones = biblioteca.clasificar(datos_ajustados, UMBRAL_BIBLIOTECA)
+            fuente = f" | {etiquetas[0]} ({puntuaciones[0]:.3f})"
+            t = instrumentacion.medir("identificacion", t)
+        
+        if MODO_BLIT:
+            # Sólo se actualizan los valores Y de la línea y la anotación del peak
+            renderizador.actualizar(datos_ajustados, fuente)
+        else:
+            # Actualización de la gráfica
+            new_points = np.array([x, datos_ajustados]).T.reshape(-1, 1, 2)
+            new_segments = np.concatenate([new_points[:-1], new_points[1:]], axis=1)
+            lc.set_segments(new_segments)
+            
+            # Cálculo y actualización del título (peak con refinamiento sub-píxel)
+            idx_peak, peak_longitud_onda, peak_intensidad = pico_principal(datos_ajustados, x)
+            
+            # Actualización del título limpio
+            ax.set_title(f'Espectrómetro - Peak: {peak_longitud_onda:.2f} nm | Intensidad: {int(peak_intensidad)}{fuente}', 
+                         fontsize=14, fontweight='bold', color=colors[idx_peak])
+        instrumentacion.medir("dibujo", t)
+
+        esperar_gui()
+                
+except KeyboardInterrupt:
+    pass 
+    
+#FINALIZACIÓN DEL PROGRAMA 
+
+if MODO_HILO:
+    hilo.detener()
+if DISPARO_POR_CAMBIO and (GRABAR_DATASET or GRABAR_CONTINUO):
+    print(f"Captura por cambio: {disparo.eventos} eventos, {disparo.guardadas} de {disparo.tramas} tramas guardadas "
+          f"({disparo.disparos} sobre el umbral)")
+    if disparo.aprendiendo:
+        print("Aviso: no llegaron tramas suficientes para aprender el ruido; no se guardó nada.")
+if GRABAR_DATASET:
+    escritor.close()
+    print(f"Tramas guardadas en el dataset de '{CARPETA_DATASET}'.")
+if GRABAR_CONTINUO:
+    grabador.close()
+    print(f"Grabación: {grabador.tramas - grabador.tramas_descartadas} tramas en {len(grabador.archivos)} "
+          f"archivo(s) de '{CARPETA_GRABACION}' ({grabador.bytes_escritos / 1e6:.1f} MB)")
+    if grabador.tramas_descartadas:
+        print(f"Tramas no grabadas (disco lento o error): {grabador.tramas_descartadas}")
+    if grabador.error is not None:
+        print(f"Error de escritura (la grabación se detuvo): {grabador.error}")
+
+ser.close()
+plt.close()
+
+# Resumen de adquisición: descartadas = capturadas que nunca llegaron a dibujarse
+tramas_capturadas = decodificador.tramas_validas
+print(f"\nTramas capturadas: {tramas_capturadas}")
+print(f"Tramas mostradas: {tramas_mostradas}")
+print(f"Tramas descartadas: {tramas_capturadas - tramas_mostradas}")
+if MODO_BLIT:
+    print(f"FPS de la gráfica: {renderizador.fps_medido:.1f}")
+if isinstance(decodificador, DecodificadorBinario): # También al suscribirse al servicio de captura
+    print(f"Tramas perdidas (contador): {decodificador.tramas_perdidas}")
+    if decodificador.tramas_invalidas:
+        print(f"Tramas inválidas descartadas: {decodificador.tramas_invalidas}")
+elif decodificador.lineas_invalidas:
+    print(f"Líneas inválidas descartadas: {decodificador.lineas_invalidas}")
+if MODO_HILO and (hilo.errores or hilo.errores_consumidores):
+    print(f"Errores en el hilo de adquisición: {hilo.errores} de lectura, {hilo.errores_consumidores} "
+          f"de procesamiento (último: {hilo.ultimo_error!r})")
+if INSTRUMENTAR:
+    instrumentacion.imprimir_reporte()
+    instrumentacion.guardar(ARCHIVO_INSTRUMENTACION)
+    print(f"Instrumentación guardada en: {ARCHIVO_INSTRUMENTACION}")
+if ESTADISTICAS_EN_LINEA or SEGUIR_PICOS or IDENTIFICAR_FUENTE:
+    mostrar_estadisticas()
 print("\nPrograma terminado exitosamente.")
\ No newline at end of file
@@ -1,94 +1,185 @@
-import numpy as np
-import matplotlib.pyplot as plt
-import os
-
-# --- CONFIGURACIÓN DE CARPETAS Y ARCHIVOS ---
-CARPETA_DATOS = os.path.join("datos", "diurna")
-EXTENSION_DATOS = ".txt"
-TITULO = "Análisis Estadístico - Luz Diurna"
-# ---------------------------------------------
-
-def analisis_estadistico_y_histograma_ajustado(carpeta_path, titulo):
-    """
-    Carga todos los espectros, calcula estadísticas y genera un histograma
-    enfocado exclusivamente en el PÍXEL DE INTENSIDAD MÁXIMA.
-    """
-    
-    archivos_espectro = []
-    # (Código para cargar archivos omitido por brevedad, asumiendo que funciona)
-    for nombre_archivo in os.listdir(carpeta_path):
-        if nombre_archivo.endswith(EXTENSION_DATOS):
-            ruta_completa = os.path.join(carpeta_path, nombre_archivo)
-            archivos_espectro.append(ruta_completa)
-            
-    if not archivos_espectro:
-        print(f"Error: No se encontraron archivos {EXTENSION_DATOS} en la carpeta '{carpeta_path}'.")
-        return
-
-    datos_completos = []
-    longitud_onda_x = None
-    
-    for ruta_archivo in archivos_espectro:
-        try:
-            datos = np.loadtxt(ruta_archivo, skiprows=3) 
-            if longitud_onda_x is None:
-                longitud_onda_x = datos[:, 0]
-            intensidad = datos[:, 1]
-            datos_completos.append(intensidad)
-        except Exception as e:
-            print(f"Error al procesar el archivo {os.path.basename(ruta_archivo)}: {e}")
-            continue
-
-    if not datos_completos: return
-
-    matriz_intensidad = np.array(datos_completos)
-    media_intensidad = np.mean(matriz_intensidad, axis=0) 
-    std_intensidad = np.std(matriz_intensidad, axis=0)
-    
-    # 1. ENCONTRAR EL PÍXEL DEL PEAK GLOBAL
-    # Encontramos la posición del píxel con la intensidad más alta en el espectro promedio.
-    idx_peak_global = np.argmax(media_intensidad)
-    peak_max_nm = longitud_onda_x[idx_peak_global]
-    
-    # 2. EXTRAER DATOS SÓLO DE ESE PÍXEL
-    # Extraemos todos los valores de intensidad de TODAS las capturas, pero solo para el píxel del pico.
-    datos_histograma_foco = matriz_intensidad[:, idx_peak_global]
-    
-    # --- RESULTADOS CLAVE ---
-    media_pico_val = media_intensidad[idx_peak_global]
-    std_pico_val = std_intensidad[idx_peak_global]
-    error_relativo = (std_pico_val / media_pico_val) * 100
-    
-    
-    # 3. GENERACIÓN DEL HISTOGRAMA (MÁS FÁCIL DE INTERPRETAR)
-    plt.figure(figsize=(10, 7))
-    
-    plt.hist(datos_histograma_foco, bins=10, color='darkgreen', alpha=0.8, edgecolor='black')
-    
-    # Líneas de referencia: Media y error de 1 sigma
-    plt.axvline(media_pico_val, color='red', linestyle='dashed', linewidth=2, label=f'Media: {media_pico_val:.2f}')
-    plt.axvline(media_pico_val + std_pico_val, color='orange', linestyle='dotted', linewidth=1, label=f'+1 $\sigma$')
-    plt.axvline(media_pico_val - std_pico_val, color='orange', linestyle='dotted', linewidth=1, label=f'-1 $\sigma$')
-    
-    plt.title(f"Distribución de Intensidad en el Peak ({peak_max_nm:.2f} nm)\n(Error Relativo: {error_relativo:.2f} %)", fontsize=14, fontweight='bold')
-    plt.xlabel("Intensidad (ADC sustraído Offset)", fontsize=12, fontweight='bold')
-    plt.ylabel("Frecuencia (Conteo de Espectros)", fontsize=12, fontweight='bold')
-    plt.legend()
-    plt.grid(axis='y', linestyle=':', alpha=0.5)
-    
-    # Guardar la figura del histograma
-    nombre_archivo_hist = os.path.join(carpeta_path, "Analisis_Histograma_Foco.png")
-    plt.savefig(nombre_archivo_hist, bbox_inches='tight', dpi=300)
-    print(f"Histograma de Intensidad ajustado guardado en: {nombre_archivo_hist}")
-    
-    
-    # 4. Salida para el informe
-    print("\n--- ERROR ESTADÍSTICO EN EL PICO MÁXIMO ---")
-    print(f"Pico de Intensidad Máximo: {peak_max_nm:.2f} nm")
-    print(f"Intensidad Promedio en el Pico: {media_pico_val:.2f} ADC")
-    print(f"Desviación Estándar (Error): {std_pico_val:.2f} ADC")
-    print(f"Error Relativo (Coeficiente de Variación): {error_relativo:.2f} %")
-
-
-# --- EJECUCIÓN ---
-analisis_estadistico_y_histograma_ajustado(CARPETA_DATOS, TITULO)
\ No newline at end of file
+import numpy as np
+import matplotlib.pyplot as plt
+import os
+from matplotlib.colors import LogNorm
+
+from spectro_core import EXTENSION_DATOS
+from spectro_calibracion import cargar_espectros_calibrados, obtener_calibracion
+from spectro_dataset import cargar_espectros, offset_filas
+from spectro_picos import SeguidorPicos, detectar_picos, imprimir_pistas, pico_principal
+from spectro_stats import imprimir_reporte_pico, reporte_pico, reproducibilidad_por_pixel
+
+# --- CONFIGURACIÓN DE CARPETAS Y ARCHIVOS ---
+CARPETA_DATOS = os.path.join("datos", "diurna")
+TITULO = "Análisis Estadístico - Luz Diurna"
+USAR_CALIBRACION = True # Oscuro por píxel y eje de longitud de onda de datos/calibracion.npz
+ANALIZAR_PICOS = True # Posición sub-píxel del peak en cada captura y seguimiento de varios picos
+TRAMAS_POR_BLOQUE = 4096 # Capturas procesadas a la vez (detector de picos y modo "espectro")
+
+# MODO "pico": histograma del píxel del peak (un PNG por carpeta)
+# MODO "espectro": los 288 píxeles por bloques de TRAMAS_POR_BLOQUE (memoria acotada para datasets grandes):
+#   histogramas con bins comunes, percentiles, CV e intervalos bootstrap por píxel en
+#   Reproducibilidad_Espectro.npz y un solo mapa de calor en Reproducibilidad_Espectro.png
+MODO_ANALISIS = "pico"
+# ---------------------------------------------
+
+def analisis_estadistico_y_histograma_ajustado(carpeta_path, titulo):
+    """
+    Carga todos los espectros, calcula estadísticas y genera un histograma
+    enfocado exclusivamente en el PÍXEL DE INTENSIDAD MÁXIMA.
+    """
+    
+    # Dataset binario (memmap) si existe; si no, los archivos .txt
+    if USAR_CALIBRACION:
+        longitud_onda_x, matriz_intensidad, _ = cargar_espectros_calibrados(carpeta_path, obtener_calibracion())
+    else:
+        longitud_onda_x, matriz_intensidad, _ = cargar_espectros(carpeta_path)
+            
+    if len(matriz_intensidad) == 0:
+        print(f"Error: No se encontraron espectros ({EXTENSION_DATOS} o dataset) en la carpeta '{carpeta_path}'.")
+        return
+
+    media_intensidad = np.mean(matriz_intensidad, axis=0) 
+    std_intensidad = np.std(matriz_intensidad, axis=0)
+    
+    # 1. ENCONTRAR EL PÍXEL DEL PEAK GLOBAL
+    # Encontramos la posición del píxel con la intensidad más alta en el espectro promedio.
+    reporte = reporte_pico(media_intensidad, std_intensidad, longitud_onda_x)
+    idx_peak_global = reporte["idx_peak"]
+    peak_max_nm = reporte["peak_nm"]
+    
+    # 2. EXTRAER DATOS SÓLO DE ESE PÍXEL
+    # Extraemos todos los valores de intensidad de TODAS las capturas, pero solo para el píxel del pico.
+    datos_histograma_foco = matriz_intensidad[:, idx_peak_global]
+    
+    # --- RESULTADOS CLAVE ---
+    media_pico_val = reporte["media"]
+    std_pico_val = reporte["std"]
+    error_relativo = reporte["error_relativo"]
+    
+    
+    # 3. GENERACIÓN DEL HISTOGRAMA (MÁS FÁCIL DE INTERPRETAR)
+    plt.figure(figsize=(10, 7))
+    
+    plt.hist(datos_histograma_foco, bins=10, color='darkgreen', alpha=0.8, edgecolor='black')
+    
+    # Líneas de referencia: Media y error de 1 sigma
+    plt.axvline(media_pico_val, color='red', linestyle='dashed', linewidth=2, label=f'Media: {media_pico_val:.2f}')
+    plt.axvline(media_pico_val + std_pico_val, color='orange', linestyle='dotted', linewidth=1, label=f'+1 $\sigma$')
+    plt.axvline(media_pico_val - std_pico_val, color='orange', linestyle='dotted', linewidth=1, label=f'-1 $\sigma$')
+    
+    plt.title(f"Distribución de Intensidad en el Peak ({peak_max_nm:.2f} nm)\n(Error Relativo: {error_relativo:.2f} %)", fontsize=14, fontweight='bold')
+    plt.xlabel("Intensidad (ADC sustraído Offset)", fontsize=12, fontweight='bold')
+    plt.ylabel("Frecuencia (Conteo de Espectros)", fontsize=12, fontweight='bold')
+    plt.legend()
+    plt.grid(axis='y', linestyle=':', alpha=0.5)
+    
+    # Guardar la figura del histograma
+    nombre_archivo_hist = os.path.join(carpeta_path, "Analisis_Histograma_Foco.png")
+    plt.savefig(nombre_archivo_hist, bbox_inches='tight', dpi=300)
+    print(f"Histograma de Intensidad ajustado guardado en: {nombre_archivo_hist}")
+    
+    
+    # 4. Salida para el informe
+    imprimir_reporte_pico(reporte)
+
+    if ANALIZAR_PICOS:
+        analisis_picos(matriz_intensidad, longitud_onda_x)
+
+
+def analisis_picos(matriz_intensidad, longitud_onda_x):
+    """Estabilidad en longitud de onda del peak y picos seguidos a lo largo de todas las capturas."""
+    seguidor = SeguidorPicos()
+    posiciones = []
+    for inicio in range(0, len(matriz_intensidad), TRAMAS_POR_BLOQUE):
+        bloque = np.asarray(matriz_intensidad[inicio:inicio + TRAMAS_POR_BLOQUE], dtype=float)
+        posiciones.append(pico_principal(bloque, longitud_onda_x)[1])
+        seguidor.actualizar_lote(detectar_picos(bloque, longitud_onda_x))
+    posiciones = np.concatenate(posiciones)
+
+    print("\n--- POSICIÓN DEL PEAK POR CAPTURA (SUB-PÍXEL) ---")
+    print(f"Media: {posiciones.mean():.3f} nm | Desviación Estándar: {posiciones.std():.3f} nm | "
+          f"Rango: {posiciones.min():.2f} - {posiciones.max():.2f} nm")
+    imprimir_pistas(seguidor.activas(min_tramas=max(2, len(matriz_intensidad) // 10)))
+
+
+def analisis_reproducibilidad_espectro(carpeta_path, titulo):
+    """Reproducibilidad de los 288 píxeles a la vez, recorriendo las capturas por bloques."""
+
+    # Sin calibrar de una vez: cada bloque del memmap se lleva al oscuro de la calibración al procesarlo
+    longitud_onda_x, matriz_intensidad, _, offsets = cargar_espectros(carpeta_path, con_offsets=True)
+    if len(matriz_intensidad) == 0:
+        print(f"Error: No se encontraron espectros ({EXTENSION_DATOS} o dataset) en la carpeta '{carpeta_path}'.")
+        return None
+    transformar = None
+    if USAR_CALIBRACION:
+        calibracion = obtener_calibracion()
+        longitud_onda_x = calibracion.longitud_onda
+        # El offset guardado puede cambiar entre tramos del dataset: se toma el de las filas del bloque
+        transformar = lambda bloque, inicio: calibracion.reajustar(
+            bloque, offset_filas(offsets, inicio, inicio + len(bloque)))
+    longitud_onda_x = np.asarray(longitud_onda_x, dtype=float)
+
+    resultado = reproducibilidad_por_pixel(matriz_intensidad, TRAMAS_POR_BLOQUE, transformar)
+    ruta_datos = os.path.join(carpeta_path, "Reproducibilidad_Espectro.npz")
+    np.savez(ruta_datos, longitud_onda=longitud_onda_x, **resultado)
+    print(f"Resultados por píxel guardados en: {ruta_datos}")
+
+    # --- MAPA DE CALOR: DISTRIBUCIÓN DE CADA PÍXEL + CV CON SU INTERVALO DE CONFIANZA ---
+    fig, (ax_mapa, ax_cv) = plt.subplots(2, 1, figsize=(14, 10), sharex=True, height_ratios=(3, 1))
+
+    # Fracción de capturas en cada bin de intensidad, por píxel (cero = sin datos, en blanco)
+    fraccion = resultado["histograma"].T / resultado["n"]
+    malla = ax_mapa.pcolormesh(longitud_onda_x, (resultado["bordes"][:-1] + resultado["bordes"][1:]) / 2,
+                               np.ma.masked_equal(fraccion, 0), norm=LogNorm(vmin=max(1 / resultado["n"], 1e-6),
+                                                                              vmax=1),
+                               cmap="viridis", shading="nearest", rasterized=True)
+    fig.colorbar(malla, ax=(ax_mapa, ax_cv), label="Fracción de capturas", pad=0.01) # Mismo ancho en ambos paneles
+    percentiles = dict(zip(resultado["percentiles"].tolist(), resultado["valores_percentiles"]))
+    ax_mapa.plot(longitud_onda_x, resultado["media"], color="red", linewidth=1, label="Media")
+    if 5 in percentiles and 95 in percentiles:
+        ax_mapa.plot(longitud_onda_x, percentiles[5], color="darkorange", linewidth=0.8, linestyle="dashed",
+                     label="Percentiles 5 y 95")
+        ax_mapa.plot(longitud_onda_x, percentiles[95], color="darkorange", linewidth=0.8, linestyle="dashed")
+    ax_mapa.set_ylim(0, max(float(resultado["maximo"].max()) * 1.05, 1))
+    ax_mapa.set_ylabel("Intensidad (ADC sustraído Offset)", fontsize=12, fontweight='bold')
+    ax_mapa.set_title(f"{titulo}\nDistribución de Intensidad por Píxel ({resultado['n']} capturas)",
+                      fontsize=14, fontweight='bold')
+    ax_mapa.legend(loc="upper right")
+
+    nivel = int(round(100 * resultado["nivel_confianza"]))
+    ax_cv.plot(longitud_onda_x, resultado["cv"], color="black", linewidth=1, label="CV")
+    ax_cv.fill_between(longitud_onda_x, resultado["ic_cv"][0], resultado["ic_cv"][1], color="gray", alpha=0.4,
+                       linewidth=0, label=f"IC {nivel} % (bootstrap)")
+    ax_cv.set_yscale("log") # Del ~1 % en el peak a >100 % en los píxeles casi oscuros
+    ax_cv.set_xlim(longitud_onda_x[0], longitud_onda_x[-1])
+    ax_cv.set_xlabel("Longitud de Onda (nm)", fontsize=12, fontweight='bold')
+    ax_cv.set_ylabel("Coef. de Variación (%)", fontsize=12, fontweight='bold')
+    ax_cv.grid(True, which="both", alpha=0.3)
+    ax_cv.legend(loc="upper right")
+
+    nombre_archivo = os.path.join(carpeta_path, "Reproducibilidad_Espectro.png")
+    plt.savefig(nombre_archivo, bbox_inches='tight', dpi=300)
+    plt.close(fig)
+    print(f"Mapa de calor guardado en: {nombre_archivo}")
+
+    # Salida para el informe: el peak, ahora con su intervalo de confianza
+    idx = int(np.argmax(resultado["media"]))
+    print(f"\n--- REPRODUCIBILIDAD DEL ESPECTRO ({resultado['n']} capturas) ---")
+    print(f"Peak: {longitud_onda_x[idx]:.2f} nm | Media: {resultado['media'][idx]:.2f} ADC "
+          f"(IC {nivel} %: {resultado['ic_media'][0, idx]:.2f} - {resultado['ic_media'][1, idx]:.2f})")
+    print(f"CV en el peak: {resultado['cv'][idx]:.2f} % "
+          f"(IC {nivel} %: {resultado['ic_cv'][0, idx]:.2f} - {resultado['ic_cv'][1, idx]:.2f} %)")
+    con_senal = resultado["media"] >= 0.1 * resultado["media"][idx] # Píxeles con al menos 10 % del peak
+    print(f"CV mediano en los {np.count_nonzero(con_senal)} píxeles con señal (>= 10 % del peak): "
+          f"{np.nanmedian(resultado['cv'][con_senal]):.2f} %")
+    return resultado
+
+
+# --- EJECUCIÓN ---
+# (protegida con __main__: la lectura en paralelo lanza procesos que importan este script)
+if __name__ == "__main__":
+    if MODO_ANALISIS == "espectro":
+        analisis_reproducibilidad_espectro(CARPETA_DATOS, TITULO)
+    else:
+        analisis_estadistico_y_histograma_ajustado(CARPETA_DATOS, TITULO)
\ No newline at end of file
@@ -1,125 +1,179 @@
-import numpy as np
-import matplotlib.pyplot as plt
-import os
-import datetime # Importamos datetime para generar el timestamp
-
-# --- CONFIGURACIÓN DE CARPETAS Y ARCHIVOS ---
-
-# La ruta a la carpeta donde están tus archivos .txt
-CARPETA_DATOS = os.path.join("datos", "laser_verde")
-EXTENSION_DATOS = ".txt"
-
-Titulo= "Láser Verde"
-
-# ---------------------------------------------
-
-def cargar_y_analizar_espectros(carpeta_path):
-
-    # 1. Preparar la lista de archivos
-    archivos_espectro = []
-    
-    # Recorre todos los archivos en el directorio especificado
-    for nombre_archivo in os.listdir(carpeta_path):
-        if nombre_archivo.endswith(EXTENSION_DATOS):
-            ruta_completa = os.path.join(carpeta_path, nombre_archivo)
-            archivos_espectro.append(ruta_completa)
-            
-    if not archivos_espectro:
-        print(f"Error: No se encontraron archivos {EXTENSION_DATOS} en la carpeta '{carpeta_path}'.")
-        return
-
-    print(f"Archivos encontrados: {len(archivos_espectro)}")
-    
-    # 2. Inicializar la figura y los ejes de Matplotlib
-    fig, ax = plt.subplots(figsize=(14, 7))
-    
-    min_x = float('inf')
-    max_x = float('-inf')
-    max_y = float('-inf')
-
-    # 3. Leer y trazar cada archivo
-    for i, ruta_archivo in enumerate(archivos_espectro):
-        nombre_archivo_base = os.path.basename(ruta_archivo)
-        
-        # --- ETIQUETA SIMPLIFICADA ---
-        etiqueta_leyenda = f"e{i+1}"
-        
-        try:
-            # Carga los datos (asumiendo 3 líneas de encabezado)
-            datos = np.loadtxt(ruta_archivo, skiprows=3) 
-            
-            # La primera columna es X (Longitud de Onda), la segunda es Y (Intensidad)
-            longitud_onda = datos[:, 0]
-            intensidad = datos[:, 1]
-            
-            # Actualiza los límites para el gráfico final
-            min_x = min(min_x, np.min(longitud_onda))
-            max_x = max(max_x, np.max(longitud_onda))
-            max_y = max(max_y, np.max(intensidad))
-            
-            # --- TRAZADO DEL ESPECTRO ---
-            # 'k--' significa: 'k' (black/negro) y '--' (dashed/punteada)
-            ax.plot(
-                longitud_onda, 
-                intensidad, 
-                'k--', 
-                linewidth=1, 
-                alpha=0.7, # Transparencia para que se vean bien superpuestos
-                label=etiqueta_leyenda # Usamos la etiqueta simplificada
-            )
-            print(f"Trazado: {nombre_archivo_base} (Etiqueta: {etiqueta_leyenda})")
-            
-        except Exception as e:
-            print(f"Error al procesar el archivo {nombre_archivo_base}: {e}")
-            continue
-
-    # 4. Configuración Final de la Gráfica
-    
-    # Ajustar el eje X basado en el rango de los datos
-    if min_x != float('inf'):
-        ax.set_xlim(min_x * 0.99, max_x * 1.01) # Añadir un pequeño margen
-
-    # Ajustar el eje Y de 0 hasta un poco más que el máximo
-    if max_y != float('-inf'):
-        ax.set_ylim(0, max_y * 1.1) 
-        
-    ax.set_xlabel("Longitud de Onda (nm)", fontsize=12, fontweight='bold')
-    ax.set_ylabel("Intensidad", fontsize=12, fontweight='bold')
-    ax.set_title(f"Superposición de Espectros de '{Titulo}'", 
-                 fontsize=14, fontweight='bold')
-    
-    ax.grid(True, linestyle=':', alpha=0.5)
-    
-    # Mostrar la leyenda
-    ax.legend(loc='upper right', fontsize=10) 
-    
-    # --- 5. GUARDAR LA IMAGEN (NUEVA SECCIÓN) ---
-    
-    # Crear un nombre de archivo único
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    nombre_archivo_imagen = f"Superposicion_{Titulo.replace(' ', '_')}_{timestamp}.png"
-    
-    # Crear la ruta completa donde se guardará la imagen (en la misma carpeta de los TXT)
-    ruta_guardado = os.path.join(carpeta_path, nombre_archivo_imagen)
-    
-    # Asegurarse de que la carpeta exista antes de guardar (aunque ya debería existir)
-    os.makedirs(carpeta_path, exist_ok=True)
-    
-    # Guardar la imagen
-    try:
-        plt.savefig(ruta_guardado, bbox_inches='tight', dpi=300)
-        print(f"\nImagen de superposición guardada en: {ruta_guardado}")
-    except Exception as e:
-        print(f"\nError al guardar la imagen: {e}")
-        
-    # 6. Mostrar la gráfica (es estática, no interactiva)
-    plt.show()
-
-# --- EJECUCIÓN DEL PROGRAMA ---
-
-# 1. Verificar la existencia de la carpeta principal 'datos'
-if not os.path.isdir("datos"):
-    print("Error: La carpeta principal 'datos' no existe. Asegúrate de que la ruta sea correcta.")
-else:
-    # 2. Llamar a la función con la ruta deseada
-    cargar_y_analizar_espectros(CARPETA_DATOS)
\ No newline at end of file
+import numpy as np
+import matplotlib.pyplot as plt
+import os
+import datetime # Importamos datetime para generar el timestamp
+from matplotlib.collections import LineCollection
+from matplotlib.colors import LogNorm
+
+from spectro_core import EXTENSION_DATOS
+from spectro_calibracion import cargar_espectros_calibrados, obtener_calibracion
+from spectro_dataset import cargar_espectros
+from spectro_stats import histograma_por_pixel
+
+# --- CONFIGURACIÓN DE CARPETAS Y ARCHIVOS ---
+
+# La ruta a la carpeta donde están tus archivos .txt
+CARPETA_DATOS = os.path.join("datos", "laser_verde")
+
+Titulo= "Láser Verde"
+USAR_CALIBRACION = True # Oscuro por píxel y eje de longitud de onda de datos/calibracion.npz
+
+# MODO DE GRÁFICO
+# "lineas": un ax.plot con leyenda por espectro (original, sólo para pocos espectros)
+# "coleccion": todos los espectros en una sola LineCollection + media ± desviación estándar
+# "densidad": mapa de calor longitud de onda × intensidad (un histograma vectorizado) + media ± desviación
+# "auto": "lineas" hasta MAX_ESPECTROS_LINEAS, "coleccion" hasta MAX_ESPECTROS_COLECCION y luego "densidad"
+MODO_GRAFICO = "auto"
+MAX_ESPECTROS_LINEAS = 20
+MAX_ESPECTROS_COLECCION = 2000 # Más líneas que esto tardan demasiado en Agg a dpi=300
+BINS_INTENSIDAD = 256 # Filas del mapa de densidad
+
+# ---------------------------------------------
+
+def cargar_y_analizar_espectros(carpeta_path, titulo=Titulo):
+
+    # 1. Cargar los espectros (dataset binario si existe; si no, los .txt)
+    if USAR_CALIBRACION:
+        longitud_onda, matriz_intensidad, nombres = cargar_espectros_calibrados(carpeta_path, obtener_calibracion())
+    else:
+        longitud_onda, matriz_intensidad, nombres = cargar_espectros(carpeta_path)
+            
+    if len(matriz_intensidad) == 0:
+        print(f"Error: No se encontraron espectros ({EXTENSION_DATOS} o dataset) en la carpeta '{carpeta_path}'.")
+        return
+
+    print(f"Espectros encontrados: {len(matriz_intensidad)}")
+    
+    # 2. Inicializar la figura y los ejes de Matplotlib
+    fig, ax = plt.subplots(figsize=(14, 7))
+    
+    # Límites para el gráfico final
+    min_x = np.min(longitud_onda)
+    max_x = np.max(longitud_onda)
+    max_y = np.max(matriz_intensidad)
+
+    modo = MODO_GRAFICO
+    if modo == "auto":
+        if len(matriz_intensidad) <= MAX_ESPECTROS_LINEAS:
+            modo = "lineas"
+        elif len(matriz_intensidad) <= MAX_ESPECTROS_COLECCION:
+            modo = "coleccion"
+        else:
+            modo = "densidad"
+
+    # 3. Trazar los espectros
+    if modo == "lineas":
+        trazar_lineas(ax, longitud_onda, matriz_intensidad, nombres)
+    elif modo == "coleccion":
+        trazar_coleccion(ax, longitud_onda, matriz_intensidad)
+        trazar_media_std(ax, longitud_onda, matriz_intensidad)
+    elif modo == "densidad":
+        trazar_densidad(ax, fig, longitud_onda, matriz_intensidad, max_y)
+        trazar_media_std(ax, longitud_onda, matriz_intensidad)
+    else:
+        print(f"Error: MODO_GRAFICO desconocido: '{MODO_GRAFICO}'.")
+        return
+
+    # 4. Configuración Final de la Gráfica
+    
+    # Ajustar el eje X basado en el rango de los datos
+    ax.set_xlim(min_x * 0.99, max_x * 1.01) # Añadir un pequeño margen
+
+    # Ajustar el eje Y de 0 hasta un poco más que el máximo
+    ax.set_ylim(0, max_y * 1.1) 
+        
+    ax.set_xlabel("Longitud de Onda (nm)", fontsize=12, fontweight='bold')
+    ax.set_ylabel("Intensidad", fontsize=12, fontweight='bold')
+    ax.set_title(f"Superposición de Espectros de '{titulo}'", 
+                 fontsize=14, fontweight='bold')
+    
+    ax.grid(True, linestyle=':', alpha=0.5)
+    
+    # Mostrar la leyenda
+    ax.legend(loc='upper right', fontsize=10) 
+    
+    # --- 5. GUARDAR LA IMAGEN (NUEVA SECCIÓN) ---
+    
+    # Crear un nombre de archivo único
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    nombre_archivo_imagen = f"Superposicion_{titulo.replace(' ', '_')}_{timestamp}.png"
+    
+    # Crear la ruta completa donde se guardará la imagen (en la misma carpeta de los TXT)
+    ruta_guardado = os.path.join(carpeta_path, nombre_archivo_imagen)
+    
+    # Asegurarse de que la carpeta exista antes de guardar (aunque ya debería existir)
+    os.makedirs(carpeta_path, exist_ok=True)
+    
+    # Guardar la imagen
+    try:
+        plt.savefig(ruta_guardado, bbox_inches='tight', dpi=300)
+        print(f"\nImagen de superposición guardada en: {ruta_guardado}")
+    except Exception as e:
+        print(f"\nError al guardar la imagen: {e}")
+        
+    # 6. Mostrar la gráfica (es estática, no interactiva)
+    plt.show()
+
+def trazar_lineas(ax, longitud_onda, matriz_intensidad, nombres):
+    """Un ax.plot por espectro, con su etiqueta en la leyenda."""
+    for i, intensidad in enumerate(matriz_intensidad):
+        
+        # --- ETIQUETA SIMPLIFICADA ---
+        etiqueta_leyenda = f"e{i+1}"
+        
+        # --- TRAZADO DEL ESPECTRO ---
+        # 'k--' significa: 'k' (black/negro) y '--' (dashed/punteada)
+        ax.plot(
+            longitud_onda, 
+            intensidad, 
+            'k--', 
+            linewidth=1, 
+            alpha=0.7, # Transparencia para que se vean bien superpuestos
+            label=etiqueta_leyenda # Usamos la etiqueta simplificada
+        )
+        print(f"Trazado: {nombres[i]} (Etiqueta: {etiqueta_leyenda})")
+
+
+def trazar_coleccion(ax, longitud_onda, matriz_intensidad):
+    """Todos los espectros como una sola LineCollection (N, 288, 2), rasterizada al guardar."""
+    num = len(matriz_intensidad)
+    segmentos = np.empty((num, len(longitud_onda), 2))
+    segmentos[:, :, 0] = longitud_onda
+    segmentos[:, :, 1] = matriz_intensidad
+    # Más espectros, más transparencia: las zonas densas siguen viéndose más oscuras
+    alpha = float(np.clip(20 / num, 0.02, 0.7))
+    coleccion = LineCollection(segmentos, colors='k', linewidths=0.5, alpha=alpha, rasterized=True,
+                               label=f"{num} espectros")
+    ax.add_collection(coleccion)
+
+
+def trazar_densidad(ax, fig, longitud_onda, matriz_intensidad, max_y):
+    """Mapa de calor: cuántos espectros pasan por cada (longitud de onda, intensidad)."""
+    bordes_y = np.linspace(0, max_y * 1.1, BINS_INTENSIDAD + 1)
+    conteos = histograma_por_pixel(matriz_intensidad, bordes_y)
+    # Bordes de cada píxel en longitud de onda: puntos medios entre píxeles vecinos
+    medios = (longitud_onda[1:] + longitud_onda[:-1]) / 2
+    bordes_x = np.concatenate([[2 * longitud_onda[0] - medios[0]], medios, [2 * longitud_onda[-1] - medios[-1]]])
+    malla = ax.pcolormesh(bordes_x, bordes_y, np.ma.masked_equal(conteos.T, 0), cmap='viridis',
+                          norm=LogNorm(vmin=1, vmax=max(int(conteos.max()), 2)), rasterized=True)
+    fig.colorbar(malla, ax=ax, label="Espectros por celda")
+
+
+def trazar_media_std(ax, longitud_onda, matriz_intensidad):
+    """Media y banda de ±1 desviación estándar por píxel."""
+    media_intensidad = np.mean(matriz_intensidad, axis=0)
+    std_intensidad = np.std(matriz_intensidad, axis=0)
+    ax.fill_between(longitud_onda, media_intensidad - std_intensidad, media_intensidad + std_intensidad,
+                    color='red', alpha=0.25, linewidth=0, label='±1 $\\sigma$')
+    ax.plot(longitud_onda, media_intensidad, 'r-', linewidth=1.5, label='Media')
+
+# --- EJECUCIÓN DEL PROGRAMA ---
+
+# (protegida con __main__: la lectura en paralelo lanza procesos que importan este script)
+if __name__ == "__main__":
+    # 1. Verificar la existencia de la carpeta principal 'datos'
+    if not os.path.isdir("datos"):
+        print("Error: La carpeta principal 'datos' no existe. Asegúrate de que la ruta sea correcta.")
+    else:
+        # 2. Llamar a la función con la ruta deseada
+        cargar_y_analizar_espectros(CARPETA_DATOS)
\ No newline at end of file
@@ -0,0 +1,53 @@
+import time
+
+from spectro_publicador import HOST_RED, PUERTO_RED, ServidorTramas
+from spectro_serial import (BufferCircular, FuenteSerial, HiloAdquisicion, abrir_puerto, crear_decodificador,
+                            esperar_placa)
+
+# --- SERVICIO DE CAPTURA SIN INTERFAZ ---
+#
+# Abre el puerto del Arduino (el único proceso que puede hacerlo) y publica
+# las tramas crudas por TCP. Los scripts de captura se conectan como si fuera
+# un puerto serie, en paralelo y sin frenar la adquisición, por ejemplo:
+#     ESPECTROMETRO_PUERTO=tcp://127.0.0.1:5760 python espectrometro_captura_tiempo_real.py
+# (una instancia para ver, otra con GRABAR_DATASET = True para registrar, etc.)
+
+# --- CONFIGURACIÓN ---
+PROTOCOLO = "binario" # Entre el Arduino y este servicio; los clientes siempre reciben binario
+HOST = HOST_RED # "0.0.0.0" para aceptar clientes de otras máquinas
+PUERTO = PUERTO_RED
+INTERVALO_REPORTE = 10 # Segundos entre líneas de estado
+# ---------------------------------------------
+
+ser = abrir_puerto()
+print("Conectado -- Esperando datos...")
+if not esperar_placa(ser): # Hasta que el Arduino termina de reiniciarse y envía tramas
+    print("Aviso: el Arduino todavía no envía datos.")
+
+decodificador = crear_decodificador(PROTOCOLO, ser)
+servidor = ServidorTramas(HOST, PUERTO)
+hilo = HiloAdquisicion(FuenteSerial(ser, decodificador), BufferCircular(16), [servidor.publicar])
+hilo.start()
+print(f"Publicando tramas en tcp://{servidor.direccion[0]}:{servidor.direccion[1]} (Ctrl+C para salir)")
+
+anteriores = 0
+try:
+    while True:
+        time.sleep(INTERVALO_REPORTE)
+        capturadas = hilo.capturadas
+        clientes = servidor.clientes
+        descartadas = sum(c.descartadas for c in clientes)
+        print(f"Tramas: {capturadas} ({(capturadas - anteriores) / INTERVALO_REPORTE:.1f}/s) | "
+              f"Clientes: {len(clientes)} | Descartadas por clientes lentos: {descartadas}")
+        anteriores = capturadas
+except KeyboardInterrupt:
+    pass
+
+# --- FINALIZACIÓN ---
+hilo.detener()
+servidor.cerrar()
+ser.close()
+print(f"\nTramas capturadas: {hilo.capturadas}")
+if PROTOCOLO == "binario":
+    print(f"Tramas perdidas (contador): {decodificador.tramas_perdidas}")
+print("\nServicio terminado.")
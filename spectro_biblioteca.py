@@ -0,0 +1,298 @@
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from spectro_core import NUM_PIXELES
+from spectro_dataset import cargar_espectros, offset_filas
+
+# --- BIBLIOTECA ESPECTRAL: IDENTIFICACIÓN DE FUENTES ---
+#
+# Índice precalculado (M, F) con las capturas de referencia de cada fuente
+# (datos/diurna, datos/Laser_verde, ...), cada fila ya transformada y
+# normalizada a norma 1. Una consulta, sea una trama o un lote (N, 288), se
+# resuelve con una sola multiplicación de matrices (N, F) @ (F, M) y una
+# selección parcial de los k mejores por fila.
+#
+# Métricas:
+#   coseno        similitud coseno (1 = misma forma, sin importar la intensidad)
+#   sam           ángulo espectral en grados (Spectral Angle Mapper), arccos del coseno
+#   correlacion   correlación de Pearson (coseno tras restar la media de cada espectro)
+# Características:
+#   espectro      las 288 intensidades
+#   derivada      diferencias entre píxeles vecinos (ignora un fondo constante)
+# Con componentes > 0 las características se proyectan sobre las primeras
+# componentes principales de la biblioteca (SVD sin centrar, que conserva los
+# productos escalares) y se vuelven a normalizar. La base se calcula con
+# ajustar_componentes() (construir_biblioteca lo hace al terminar de cargar);
+# las referencias agregadas después se proyectan sobre la base existente.
+#
+# Las carpetas registradas se releen con actualizar(): el dataset binario sólo
+# crece al final y los .txt pasan por la caché incremental, así que sólo se
+# indexan las capturas nuevas.
+
+CARPETA_RAIZ = "datos"
+METRICAS = ("coseno", "sam", "correlacion")
+CARACTERISTICAS = ("espectro", "derivada")
+K_VECINOS = 5
+NORMA_MINIMA = 1e-9 # Espectros nulos (oscuro ya sustraído) quedan como vector cero
+DESCONOCIDO = "desconocido"
+
+
+def carpetas_de_referencia(raiz=CARPETA_RAIZ):
+    """Subcarpetas directas de 'raiz' (una por fuente), en orden alfabético."""
+    return [os.path.join(raiz, nombre) for nombre in sorted(os.listdir(raiz))
+            if not nombre.startswith(".") and os.path.isdir(os.path.join(raiz, nombre))]
+
+
+class BibliotecaEspectral:
+    """Índice de espectros de referencia etiquetados con búsqueda de los k más parecidos.
+
+    Seguro entre hilos: el hilo lector puede clasificar lotes mientras otro
+    hilo agrega capturas o llama a actualizar().
+    """
+
+    def __init__(self, metrica="coseno", caracteristicas="espectro", componentes=0, calibracion=None):
+        if metrica not in METRICAS:
+            raise ValueError(f"Métrica desconocida: {metrica!r} (opciones: {', '.join(METRICAS)})")
+        if caracteristicas not in CARACTERISTICAS:
+            raise ValueError(f"Características desconocidas: {caracteristicas!r} "
+                             f"(opciones: {', '.join(CARACTERISTICAS)})")
+        self.metrica = metrica
+        self.caracteristicas = caracteristicas
+        self.componentes = componentes
+        self.calibracion = calibracion # Con calibración, las carpetas se llevan a su oscuro
+
+        self.etiquetas = [] # Nombre de cada fuente; las filas guardan su índice
+        self._base = None # (F, C) base de componentes principales, None sin reducción
+        self._crudas = np.empty((0, self._num_caracteristicas()), dtype=np.float32) # Sin proyectar
+        self._indice = np.empty((0, self._num_caracteristicas()), dtype=np.float32)
+        self._etiqueta_fila = np.empty(0, dtype=np.int32)
+        self._carpeta_fila = np.empty(0, dtype=np.int32) # -1: agregada a mano
+        self.capturas = [] # Identificador de cada fila (nombre del .txt o fecha)
+        self._carpetas = [] # [ruta, etiqueta, identificadores ya indexados]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._indice)
+
+    def _num_caracteristicas(self):
+        return NUM_PIXELES - 1 if self.caracteristicas == "derivada" else NUM_PIXELES
+
+    # --- TRANSFORMACIÓN ---
+
+    def _transformar(self, tramas):
+        """Características normalizadas (N, F) de un lote, antes de la proyección."""
+        x = np.asarray(tramas, dtype=np.float32).reshape(-1, NUM_PIXELES)
+        if self.caracteristicas == "derivada":
+            x = np.diff(x, axis=1)
+        if self.metrica == "correlacion":
+            x = x - x.mean(axis=1, keepdims=True)
+        return self._normalizar(x)
+
+    @staticmethod
+    def _normalizar(x):
+        normas = np.linalg.norm(x, axis=1, keepdims=True)
+        return np.divide(x, normas, out=np.zeros_like(x), where=normas > NORMA_MINIMA)
+
+    def _proyectar(self, z):
+        return z if self._base is None else self._normalizar(z @ self._base)
+
+    def ajustar_componentes(self, componentes=None):
+        """Recalcula la base de componentes principales con todas las referencias actuales."""
+        with self._lock:
+            if componentes is not None:
+                self.componentes = componentes
+            self._ajustar_base()
+
+    def _ajustar_base(self):
+        c = min(self.componentes, *self._crudas.shape) if self.componentes else 0
+        if c == 0:
+            self._base = None
+            self._indice = self._crudas
+            return
+        # Base de las C direcciones con más energía (sin centrar: conserva los productos escalares)
+        _, _, vt = np.linalg.svd(self._crudas, full_matrices=False)
+        self._base = np.ascontiguousarray(vt[:c].T)
+        self._indice = self._proyectar(self._crudas)
+
+    # --- CONSTRUCCIÓN INCREMENTAL ---
+
+    def agregar(self, tramas, etiqueta, capturas=None, _carpeta=-1):
+        """Agrega espectros de referencia (N, 288) o (288,) de la fuente 'etiqueta'."""
+        crudas = self._transformar(tramas)
+        if capturas is None:
+            capturas = [""] * len(crudas)
+        with self._lock:
+            if etiqueta not in self.etiquetas:
+                self.etiquetas.append(etiqueta)
+            self._crudas = np.concatenate([self._crudas, crudas])
+            numero = self.etiquetas.index(etiqueta)
+            self._etiqueta_fila = np.concatenate([self._etiqueta_fila, np.full(len(crudas), numero, np.int32)])
+            self._carpeta_fila = np.concatenate([self._carpeta_fila, np.full(len(crudas), _carpeta, np.int32)])
+            self.capturas.extend(capturas)
+            if self._base is None:
+                self._indice = self._crudas
+            else:
+                # Las nuevas referencias se proyectan sobre la base existente (ajustar_componentes la rehace)
+                self._indice = np.concatenate([self._indice, self._proyectar(crudas)])
+
+    def _quitar_carpeta(self, numero):
+        with self._lock:
+            conservar = self._carpeta_fila != numero
+            self._crudas = self._crudas[conservar]
+            self._indice = self._indice[conservar]
+            self._etiqueta_fila = self._etiqueta_fila[conservar]
+            self._carpeta_fila = self._carpeta_fila[conservar]
+            self.capturas = [c for c, v in zip(self.capturas, conservar) if v]
+
+    def agregar_carpeta(self, carpeta_path, etiqueta=None):
+        """Registra una carpeta de capturas (etiqueta: su nombre) e indexa todo lo que tenga."""
+        etiqueta = etiqueta or os.path.basename(os.path.normpath(carpeta_path))
+        self._carpetas.append([carpeta_path, etiqueta, []])
+        return self._sincronizar(len(self._carpetas) - 1)
+
+    def actualizar(self):
+        """Indexa las capturas nuevas de las carpetas registradas; devuelve cuántas se agregaron."""
+        return sum(self._sincronizar(numero) for numero in range(len(self._carpetas)))
+
+    def _sincronizar(self, numero):
+        carpeta_path, etiqueta, indexadas = self._carpetas[numero]
+        _, matriz, capturas, offsets = cargar_espectros(carpeta_path, con_offsets=True)
+        capturas = list(capturas)
+        if capturas[:len(indexadas)] != indexadas:
+            # Capturas borradas o modificadas: se rehace sólo esta carpeta
+            self._quitar_carpeta(numero)
+            indexadas = self._carpetas[numero][2] = []
+        nuevas = slice(len(indexadas), len(capturas))
+        if nuevas.start == nuevas.stop:
+            return 0
+        tramas = matriz[nuevas] # Sólo las filas nuevas (el memmap no se lee entero)
+        if self.calibracion is not None:
+            tramas = self.calibracion.reajustar(tramas, offset_filas(offsets, nuevas.start, nuevas.stop))
+        self.agregar(tramas, etiqueta, capturas[nuevas], _carpeta=numero)
+        self._carpetas[numero][2] = capturas
+        return nuevas.stop - nuevas.start
+
+    # --- CONSULTAS ---
+
+    def buscar(self, tramas, k=K_VECINOS, excluir=None):
+        """Los k espectros de referencia más parecidos a cada trama de un lote (N, 288) o (288,).
+
+        Devuelve (filas (N, k), puntuaciones (N, k)) de mejor a peor: similitud
+        (coseno o correlación, mayor es mejor) o ángulo en grados con 'sam'
+        (menor es mejor). 'excluir' (N,) es una fila a ignorar por trama (p. ej.
+        la propia captura al evaluar dejando una afuera).
+        """
+        with self._lock:
+            indice = self._indice
+            consultas = self._proyectar(self._transformar(tramas))
+        if len(indice) == 0:
+            raise ValueError("La biblioteca está vacía.")
+        similitud = consultas @ indice.T
+        if excluir is not None:
+            similitud[np.arange(len(similitud)), excluir] = -np.inf
+        k = min(k, len(indice))
+        if k == 1:
+            filas = np.argmax(similitud, axis=1)[:, None]
+        elif k < len(indice):
+            filas = np.argpartition(similitud, len(indice) - k, axis=1)[:, -k:]
+        else:
+            filas = np.broadcast_to(np.arange(len(indice)), similitud.shape)
+        mejores = np.take_along_axis(similitud, filas, axis=1)
+        orden = np.argsort(-mejores, axis=1)
+        filas = np.take_along_axis(filas, orden, axis=1)
+        puntuaciones = np.clip(np.take_along_axis(mejores, orden, axis=1), -1.0, 1.0).astype(np.float64)
+        if self.metrica == "sam":
+            puntuaciones = np.degrees(np.arccos(puntuaciones))
+        return filas, puntuaciones
+
+    def etiquetas_de(self, filas):
+        """Nombre de la fuente de cada fila del índice (mismo shape que 'filas')."""
+        with self._lock:
+            return np.asarray(self.etiquetas, dtype=object)[self._etiqueta_fila[filas]]
+
+    def clasificar(self, tramas, umbral=None, excluir=None):
+        """Fuente del espectro más parecido para cada trama: (etiquetas (N,), puntuaciones (N,)).
+
+        Con 'umbral' (similitud mínima, o ángulo máximo con 'sam') las tramas
+        que no se parecen lo suficiente a ninguna referencia quedan como DESCONOCIDO.
+        """
+        filas, puntuaciones = self.buscar(tramas, k=1, excluir=excluir)
+        etiquetas, puntuaciones = self.etiquetas_de(filas[:, 0]), puntuaciones[:, 0]
+        if umbral is not None:
+            lejos = puntuaciones > umbral if self.metrica == "sam" else puntuaciones < umbral
+            etiquetas[lejos] = DESCONOCIDO
+        return etiquetas, puntuaciones
+
+
+def construir_biblioteca(carpetas=None, metrica="coseno", caracteristicas="espectro", componentes=0,
+                         calibracion=None):
+    """Biblioteca con las capturas de 'carpetas' (por defecto, cada subcarpeta de datos es una fuente)."""
+    biblioteca = BibliotecaEspectral(metrica, caracteristicas, componentes, calibracion)
+    for carpeta in carpetas or carpetas_de_referencia():
+        biblioteca.agregar_carpeta(carpeta)
+    if componentes:
+        biblioteca.ajustar_componentes() # Con todas las fuentes ya cargadas
+    return biblioteca
+
+
+class ClasificadorEnLinea:
+    """Consumidor de lotes que etiqueta cada trama contra la biblioteca y cuenta las fuentes vistas."""
+
+    def __init__(self, biblioteca, umbral=None):
+        self.biblioteca = biblioteca
+        self.umbral = umbral
+        self.conteos = {}
+        self._lock = threading.Lock()
+
+    def agregar(self, tramas):
+        etiquetas, _ = self.biblioteca.clasificar(tramas, self.umbral)
+        if len(etiquetas) == 0:
+            return
+        nombres, cantidades = np.unique(etiquetas.astype(str), return_counts=True)
+        with self._lock:
+            for nombre, cantidad in zip(nombres.tolist(), cantidades.tolist()):
+                self.conteos[nombre] = self.conteos.get(nombre, 0) + cantidad
+
+    def imprimir_conteos(self):
+        with self._lock:
+            conteos = dict(self.conteos)
+        total = sum(conteos.values())
+        if not total:
+            print("\nAún no hay tramas clasificadas.")
+            return
+        print("\n--- FUENTES IDENTIFICADAS ---")
+        for nombre, cantidad in sorted(conteos.items(), key=lambda c: -c[1]):
+            print(f"{nombre:<24} {cantidad:>8} tramas ({100 * cantidad / total:.1f} %)")
+
+
+# --- EJECUCIÓN: evaluación dejando una afuera con las carpetas de datos ---
+if __name__ == "__main__":
+    from spectro_calibracion import cargar_espectros_calibrados, obtener_calibracion
+
+    metrica = next((a for a in sys.argv[1:] if a in METRICAS), "coseno")
+    caracteristicas = next((a for a in sys.argv[1:] if a in CARACTERISTICAS), "espectro")
+    biblioteca = construir_biblioteca(metrica=metrica, caracteristicas=caracteristicas,
+                                      calibracion=obtener_calibracion())
+    print(f"Biblioteca: {len(biblioteca)} espectros de {len(biblioteca.etiquetas)} fuentes "
+          f"({metrica}, {caracteristicas})")
+
+    # Cada captura contra todas las demás (su propia fila no cuenta); las filas siguen el orden de carga
+    consultas = np.concatenate([cargar_espectros_calibrados(carpeta, biblioteca.calibracion)[1]
+                                for carpeta, _, _ in biblioteca._carpetas])
+    reales = biblioteca.etiquetas_de(np.arange(len(biblioteca)))
+    t = time.perf_counter()
+    predichas, puntuaciones = biblioteca.clasificar(consultas, excluir=np.arange(len(consultas)))
+    duracion = time.perf_counter() - t
+
+    print(f"\n{'Fuente':<24} {'Capturas':>8} {'Aciertos':>8}  Confundidas con")
+    for etiqueta in biblioteca.etiquetas:
+        propias = reales == etiqueta
+        errores = predichas[propias & (predichas != etiqueta)]
+        confusiones = ", ".join(f"{n} ({c})" for n, c in zip(*np.unique(errores.astype(str), return_counts=True)))
+        print(f"{etiqueta:<24} {np.count_nonzero(propias):>8} {np.count_nonzero(predichas[propias] == etiqueta):>8}  "
+              f"{confusiones or '-'}")
+    print(f"\nConsulta del lote: {1e3 * duracion:.2f} ms ({1e6 * duracion / len(consultas):.1f} µs por trama)")
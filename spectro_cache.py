@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+
+from spectro_core import EXTENSION_DATOS, NUM_PIXELES
+from spectro_txt import cargar_capturas_txt
+
+# --- CACHÉ INCREMENTAL DE CARPETAS DE CAPTURAS .TXT ---
+#
+# Guarda en cada carpeta la matriz de intensidades ya apilada junto con el
+# tamaño y la fecha de modificación de cada archivo, y el offset (escalar u
+# oscuro por píxel) con que se guardó cada uno. En la siguiente lectura sólo se
+# parsean los archivos nuevos o modificados y se descartan los borrados.
+
+ARCHIVO_CACHE = ".cache_espectros.npz"
+VERSION_CACHE = 2 # 1: sin offsets por archivo
+
+
+def _listar_con_estado(carpeta_path, extension):
+    """Devuelve nombres ordenados con su tamaño y mtime (ns)."""
+    entradas = sorted((e for e in os.scandir(carpeta_path) if e.name.endswith(extension) and e.is_file()),
+                      key=lambda e: e.name)
+    nombres = [e.name for e in entradas]
+    estados = [e.stat() for e in entradas]
+    tamanos = np.array([st.st_size for st in estados], dtype=np.int64)
+    mtimes = np.array([st.st_mtime_ns for st in estados], dtype=np.int64)
+    return nombres, tamanos, mtimes
+
+
+def _leer_cache(ruta_cache):
+    try:
+        with np.load(ruta_cache, allow_pickle=False) as cache:
+            if int(cache["version"]) != VERSION_CACHE:
+                return None
+            return {clave: cache[clave] for clave in cache.files}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _escribir_cache(ruta_cache, **arrays):
+    # np.savez agrega '.npz' si falta: el temporal ya lo lleva
+    temporal = ruta_cache + ".tmp.npz"
+    np.savez(temporal, version=VERSION_CACHE, **arrays)
+    os.replace(temporal, ruta_cache)
+
+
+def cargar_carpeta_cacheada(carpeta_path, extension=EXTENSION_DATOS, con_offsets=False):
+    """Devuelve (longitud_onda, matriz_intensidad (N, 288), nombres) de las capturas de una carpeta.
+
+    Sólo parsea los archivos que no están en la caché o cuyo tamaño/mtime cambió.
+    Con con_offsets=True agrega al final los offsets (N, 288) de cada archivo.
+    """
+    ruta_cache = os.path.join(carpeta_path, ARCHIVO_CACHE)
+    nombres, tamanos, mtimes = _listar_con_estado(carpeta_path, extension)
+    cache = _leer_cache(ruta_cache)
+
+    # Filas reutilizables de la caché: mismo nombre, tamaño y mtime
+    fila_cache = {}
+    longitud_onda = None
+    if cache is not None:
+        longitud_onda = cache["longitud_onda"] if cache["longitud_onda"].size else None
+        for i, nombre in enumerate(cache["nombres"].tolist()):
+            fila_cache[nombre] = i
+
+    origen = np.full(len(nombres), -1, dtype=np.int64)
+    for i, nombre in enumerate(nombres):
+        j = fila_cache.get(nombre, -1)
+        if j >= 0 and cache["tamanos"][j] == tamanos[i] and cache["mtimes"][j] == mtimes[i]:
+            origen[i] = j
+
+    # Sin cambios: la caché se devuelve tal cual
+    if cache is not None and len(nombres) == len(cache["nombres"]) and np.all(origen == np.arange(len(nombres))):
+        if con_offsets:
+            return longitud_onda, cache["matriz"], nombres, cache["offsets"]
+        return longitud_onda, cache["matriz"], nombres
+
+    matriz = np.empty((len(nombres), NUM_PIXELES))
+    offsets = np.empty((len(nombres), NUM_PIXELES), dtype=np.int64)
+    validos = origen >= 0
+    if cache is not None and validos.any():
+        matriz[validos] = cache["matriz"][origen[validos]]
+        offsets[validos] = cache["offsets"][origen[validos]]
+
+    # Archivos nuevos o modificados: lectura rápida en bloque (en paralelo si son muchos)
+    pendientes = np.flatnonzero(~validos)
+    if pendientes.size:
+        rutas = [os.path.join(carpeta_path, nombres[i]) for i in pendientes]
+        longitud_archivos, intensidades, metadatos, rutas_ok = cargar_capturas_txt(rutas)
+        leidos = {os.path.basename(r) for r in rutas_ok}
+        ok = np.array([nombres[i] in leidos for i in pendientes], dtype=bool)
+        matriz[pendientes[ok]] = intensidades
+        offsets[pendientes[ok]] = [np.broadcast_to(m["offset"], (NUM_PIXELES,)) for m in metadatos]
+        validos[pendientes[ok]] = True
+        if longitud_onda is None:
+            longitud_onda = longitud_archivos
+
+    # Los archivos que no se pudieron leer no entran en la caché (se reintentan)
+    matriz = matriz[validos]
+    offsets = offsets[validos]
+    nombres = [n for n, v in zip(nombres, validos) if v]
+    _escribir_cache(ruta_cache, nombres=np.array(nombres, dtype=str), tamanos=tamanos[validos],
+                    mtimes=mtimes[validos], matriz=matriz, offsets=offsets,
+                    longitud_onda=np.array([]) if longitud_onda is None else longitud_onda)
+    if con_offsets:
+        return longitud_onda, matriz, nombres, offsets
+    return longitud_onda, matriz, nombres
@@ -0,0 +1,160 @@
+import os
+import sys
+
+import numpy as np
+
+from spectro_core import (ADC_MAX, LAMBDA_MAX, LAMBDA_MIN, NUM_PIXELES, OFFSET_VALOR, ajustar_offset,
+                          listar_capturas, nm_a_rgb)
+from spectro_dataset import ARCHIVO_DATOS, ARCHIVO_META, ARCHIVO_TIEMPOS, cargar_espectros
+
+# --- CALIBRACIÓN POR PÍXEL (OSCURO + LONGITUD DE ONDA) ---
+#
+# Reemplaza el offset escalar (OFFSET_VALOR) por un vector de oscuro por píxel
+# obtenido de las capturas de 'datos/Oscuro', y el eje lineal de 380 a 850 nm
+# por el polinomio de calibración del sensor:
+#     λ(p) = A0 + B1·p + B2·p² + B3·p³ + B4·p⁴ + B5·p⁵,   p = 1..288
+# (coeficientes de la hoja de inspección de cada C12880MA). Todo se precalcula
+# y se guarda en 'datos/calibracion.npz'; aplicar la calibración a un lote de
+# tramas es la misma resta y recorte fusionados de spectro_core.
+#
+# Los oscuros se guardan crudos (offset 0, sin recorte): restándoles el oscuro
+# vigente y recortando en 0 cada fila sería max(crudo, oscuro anterior), y el
+# promedio subiría con cada recaptura. Sólo esas filas crudas entran en el oscuro.
+
+CARPETA_OSCURO = os.path.join("datos", "Oscuro")
+ARCHIVO_CALIBRACION = os.path.join("datos", "calibracion.npz")
+VERSION_CALIBRACION = 2 # 1: oscuro de todas las capturas, también las recortadas en 0
+
+# Polinomio lineal equivalente a np.linspace(380, 850, 288) (sin hoja de inspección)
+_PASO_LINEAL = (LAMBDA_MAX - LAMBDA_MIN) / (NUM_PIXELES - 1)
+COEFICIENTES_LINEALES = (LAMBDA_MIN - _PASO_LINEAL, _PASO_LINEAL)
+
+# Coeficientes (A0, B1, ..., B5) del sensor; None usa la aproximación lineal
+COEFICIENTES_LONGITUD_ONDA = None
+
+
+def longitud_onda_polinomio(coeficientes, num_pixeles=NUM_PIXELES):
+    """Eje de longitudes de onda (nm) del polinomio de calibración, píxeles numerados desde 1."""
+    pixeles = np.arange(1, num_pixeles + 1, dtype=float)
+    return np.polynomial.polynomial.polyval(pixeles, coeficientes)
+
+
+class Calibracion:
+    """Oscuro por píxel y eje de longitudes de onda precalculados."""
+
+    def __init__(self, oscuro, coeficientes=COEFICIENTES_LINEALES):
+        self.oscuro = np.rint(np.asarray(oscuro, dtype=float)).astype(np.uint16)
+        self.limite = (ADC_MAX - self.oscuro.astype(np.int32)).clip(0).astype(np.uint16)
+        self.coeficientes = np.asarray(coeficientes, dtype=float)
+        self.longitud_onda = longitud_onda_polinomio(self.coeficientes, self.oscuro.size)
+        self.colores = nm_a_rgb(self.longitud_onda)
+
+    @classmethod
+    def cruda(cls, coeficientes=COEFICIENTES_LINEALES):
+        """Sin oscuro (offset 0): las tramas quedan crudas. Para capturar los oscuros."""
+        return cls(np.zeros(NUM_PIXELES), coeficientes)
+
+    @classmethod
+    def por_defecto(cls):
+        """Equivalente al offset escalar y al eje lineal originales."""
+        return cls(np.full(NUM_PIXELES, OFFSET_VALOR), COEFICIENTES_LINEALES)
+
+    def aplicar(self, tramas, out=None):
+        """Resta el oscuro por píxel y recorta un lote de tramas crudas (N, 288) en un solo paso."""
+        return ajustar_offset(tramas, self.oscuro, self.limite, out=out)
+
+    def reajustar(self, intensidad, offset_guardado):
+        """Lleva intensidades ya guardadas (con otro offset sustraído) al oscuro de esta calibración.
+
+        Los valores que se recortaron a 0 al guardarlos no se pueden recuperar.
+        """
+        crudas = np.asarray(intensidad, dtype=np.float64) + np.asarray(offset_guardado, dtype=np.float64)
+        np.subtract(crudas, self.oscuro, out=crudas)
+        return np.clip(crudas, 0, self.limite, out=crudas)
+
+    def guardar(self, ruta, firma=""):
+        np.savez(ruta, oscuro=self.oscuro, coeficientes=self.coeficientes, firma=firma)
+
+    @classmethod
+    def cargar(cls, ruta):
+        with np.load(ruta, allow_pickle=False) as datos:
+            return cls(datos["oscuro"], datos["coeficientes"]), str(datos["firma"])
+
+
+def _firma_carpeta(carpeta_path, coeficientes):
+    """Identifica el contenido de la carpeta de oscuros y los coeficientes usados."""
+    rutas = listar_capturas(carpeta_path) + [os.path.join(carpeta_path, n)
+                                             for n in (ARCHIVO_DATOS, ARCHIVO_TIEMPOS, ARCHIVO_META)]
+    partes = [f"{os.path.basename(r)}:{os.path.getsize(r)}:{os.stat(r).st_mtime_ns}"
+              for r in rutas if os.path.isfile(r)]
+    partes.append(",".join(f"{c:.10g}" for c in coeficientes))
+    partes.append(f"v{VERSION_CALIBRACION}") # Las calibraciones de otra versión se reconstruyen
+    return "|".join(partes)
+
+
+def es_carpeta_oscuro(carpeta_path, carpeta_oscuro=CARPETA_OSCURO):
+    return os.path.normcase(os.path.abspath(carpeta_path)) == os.path.normcase(os.path.abspath(carpeta_oscuro))
+
+
+def construir_calibracion(carpeta_oscuro=CARPETA_OSCURO, coeficientes=None):
+    """Promedia por píxel las capturas de oscuro crudas (guardadas con offset 0).
+
+    Las guardadas con un offset sustraído (recortadas en 0) no se usan.
+    """
+    coeficientes = COEFICIENTES_LINEALES if coeficientes is None else coeficientes
+    # Dataset o .txt, cada fila con el offset con que se guardó
+    _, matriz, _, offset = cargar_espectros(carpeta_oscuro, con_offsets=True)
+    crudas = np.all(np.broadcast_to(offset, (len(matriz), NUM_PIXELES)) == 0, axis=1)
+    if not crudas.any():
+        raise ValueError(f"No hay capturas de oscuro crudas (offset 0) en '{carpeta_oscuro}'.")
+    oscuro = np.mean(np.asarray(matriz[crudas], dtype=float), axis=0)
+    return Calibracion(oscuro, coeficientes)
+
+
+def obtener_calibracion(carpeta_oscuro=CARPETA_OSCURO, ruta=ARCHIVO_CALIBRACION, coeficientes=None):
+    """Calibración cacheada en 'ruta'; se reconstruye sólo si cambian los oscuros o los coeficientes.
+
+    Sin carpeta de oscuros se usa la calibración por defecto (offset escalar y eje lineal).
+    """
+    if coeficientes is None:
+        # Comparación con None: los coeficientes pueden ser un array (p. ej. de np.polyfit)
+        coeficientes = COEFICIENTES_LINEALES if COEFICIENTES_LONGITUD_ONDA is None else COEFICIENTES_LONGITUD_ONDA
+    if not os.path.isdir(carpeta_oscuro):
+        return Calibracion(np.full(NUM_PIXELES, OFFSET_VALOR), coeficientes)
+
+    firma = _firma_carpeta(carpeta_oscuro, coeficientes)
+    if os.path.isfile(ruta):
+        try:
+            calibracion, firma_guardada = Calibracion.cargar(ruta)
+            if firma_guardada == firma:
+                return calibracion
+        except (OSError, KeyError, ValueError):
+            pass
+
+    try:
+        calibracion = construir_calibracion(carpeta_oscuro, coeficientes)
+    except ValueError as e:
+        # Sólo oscuros con offset sustraído (capturas anteriores): no se cachea, se reintenta con los nuevos
+        print(f"Aviso: {e} Se usa el offset fijo de {OFFSET_VALOR}.")
+        return Calibracion(np.full(NUM_PIXELES, OFFSET_VALOR), coeficientes)
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    calibracion.guardar(ruta, firma)
+    return calibracion
+
+
+def cargar_espectros_calibrados(carpeta_path, calibracion):
+    """Como spectro_dataset.cargar_espectros, pero con el oscuro y el eje de la calibración."""
+    _, matriz, etiquetas, offsets = cargar_espectros(carpeta_path, con_offsets=True)
+    if len(matriz) == 0:
+        return calibracion.longitud_onda, matriz, etiquetas
+    return calibracion.longitud_onda, calibracion.reajustar(matriz, offsets), etiquetas
+
+
+# --- EJECUCIÓN: reconstruir la calibración ---
+if __name__ == "__main__":
+    carpeta = sys.argv[1] if len(sys.argv) > 1 else CARPETA_OSCURO
+    calibracion = obtener_calibracion(carpeta)
+    print(f"Calibración guardada en: {ARCHIVO_CALIBRACION}")
+    print(f"Oscuro por píxel: min {calibracion.oscuro.min()} | media {calibracion.oscuro.mean():.2f} | "
+          f"max {calibracion.oscuro.max()} ADC")
+    print(f"Longitud de onda: {calibracion.longitud_onda[0]:.2f} - {calibracion.longitud_onda[-1]:.2f} nm")
@@ -0,0 +1,83 @@
+import os
+
+import numpy as np
+
+# --- NÚCLEO COMPARTIDO DEL ESPECTRÓMETRO C12880MA ---
+#
+# Constantes del sensor, eje de longitudes de onda, tabla de colores y
+# operaciones vectorizadas sobre lotes de tramas (N, 288) usadas por todos
+# los scripts de captura y análisis.
+
+NUM_PIXELES = 288
+
+# Eje de longitudes de onda (aproximación lineal del rango del sensor)
+LAMBDA_MIN = 380
+LAMBDA_MAX = 850
+LONGITUD_ONDA = np.linspace(LAMBDA_MIN, LAMBDA_MAX, NUM_PIXELES)
+
+# Offset del ADC y límite de intensidad tras restarlo
+OFFSET_VALOR = 127
+ADC_MAX = 1000
+Y_MAX_LIMITE = ADC_MAX - OFFSET_VALOR
+
+EXTENSION_DATOS = ".txt"
+
+
+# --- COLORES ---
+
+# nm_to_rgb es lineal por tramos: se describe cada canal por sus vértices
+_NM_R = ([380, 440, 510, 580, 780], [1.0, 0.0, 0.0, 1.0, 1.0])
+_NM_G = ([380, 440, 490, 580, 645, 780], [0.0, 0.0, 1.0, 1.0, 0.0, 0.0])
+_NM_B = ([380, 490, 510, 780], [1.0, 1.0, 0.0, 0.0])
+_NM_FACTOR = ([380, 420, 700, 780], [0.3, 1.0, 1.0, 0.3]) # intensidad en los bordes
+
+
+def nm_a_rgb(longitudes):
+    """Convierte un array de longitudes de onda (nm) a colores RGB (N, 3)."""
+    wl = np.clip(np.asarray(longitudes, dtype=float), 380, 780)
+    factor = np.interp(wl, *_NM_FACTOR)
+    rgb = np.stack([np.interp(wl, *_NM_R), np.interp(wl, *_NM_G), np.interp(wl, *_NM_B)], axis=-1)
+    rgb *= factor[..., None]
+    return np.minimum(rgb, 1.0, out=rgb)
+
+
+def nm_to_rgb(wavelength):
+    """Convierte longitud de onda (nm) a color RGB aproximado"""
+    return tuple(nm_a_rgb(wavelength).tolist())
+
+
+# Tabla (288, 3) calculada una sola vez: color de cada píxel del sensor
+TABLA_COLORES = nm_a_rgb(LONGITUD_ONDA)
+
+
+# --- PROCESAMIENTO DE TRAMAS ---
+
+def ajustar_offset(tramas, offset=OFFSET_VALOR, limite=Y_MAX_LIMITE, out=None):
+    """Resta el offset y recorta a [0, limite] en un solo paso sobre un lote de tramas.
+
+    clip(x, offset, offset + limite) - offset equivale a clip(x - offset, 0, limite)
+    pero nunca produce negativos, así que el resultado se queda en uint16 sin
+    arrays temporales. Acepta 'out' para reutilizar un buffer entre lotes.
+    """
+    if out is None:
+        out = np.empty(np.shape(tramas), dtype=np.uint16)
+    np.clip(tramas, offset, np.add(offset, limite), out=out, casting='unsafe')
+    np.subtract(out, offset, out=out, casting='unsafe')
+    return out
+
+
+def indice_pico(tramas):
+    """Índice del píxel de máxima intensidad de cada trama (escalar o array (N,))."""
+    return np.argmax(tramas, axis=-1)
+
+
+def datos_pico(trama, longitud_onda=LONGITUD_ONDA, colores=TABLA_COLORES):
+    """Devuelve (idx, longitud de onda, intensidad, color) del peak de una trama."""
+    idx = int(np.argmax(trama))
+    return idx, longitud_onda[idx], trama[idx], colores[idx]
+
+
+def listar_capturas(carpeta_path, extension=EXTENSION_DATOS):
+    """Lista ordenada de las rutas de captura de una carpeta."""
+    return [os.path.join(carpeta_path, nombre) for nombre in sorted(os.listdir(carpeta_path))
+            if nombre.endswith(extension)]
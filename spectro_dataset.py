@@ -0,0 +1,344 @@
+import bisect
+import datetime
+import itertools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from spectro_cache import cargar_carpeta_cacheada
+from spectro_core import LONGITUD_ONDA, NUM_PIXELES, OFFSET_VALOR, listar_capturas
+from spectro_txt import cargar_capturas_txt
+
+# --- DATASET BINARIO DE ESPECTROS ---
+#
+# Cada carpeta de datos guarda sus capturas en tres archivos:
+#   espectros.u16          tramas uint16 little-endian (N x 288), sólo se agregan al final
+#   espectros_tiempos.f8   tiempo de captura (segundos epoch, float64) de cada trama
+#   espectros.json         metadatos: offsets sustraídos, eje de longitudes de onda, etc.
+# Las intensidades se guardan igual que en los .txt (offset ya sustraído) y se
+# leen con np.memmap, sin copiar ni parsear nada. Cada tramo de filas recuerda
+# el offset (escalar u oscuro por píxel) con que se guardó: al recapturar
+# datos/Oscuro las capturas nuevas se siguen agregando a los datasets viejos.
+
+ARCHIVO_DATOS = "espectros.u16"
+ARCHIVO_TIEMPOS = "espectros_tiempos.f8"
+ARCHIVO_META = "espectros.json"
+VERSION_FORMATO = 2 # 1: un único 'offset' para todo el dataset
+DTYPE_DATOS = np.dtype("<u2")
+DTYPE_TIEMPOS = np.dtype("<f8")
+
+
+def existe_dataset(carpeta_path):
+    return os.path.isfile(os.path.join(carpeta_path, ARCHIVO_META))
+
+
+def _leer_meta(carpeta_path):
+    with open(os.path.join(carpeta_path, ARCHIVO_META), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _escribir_meta(carpeta_path, meta):
+    ruta = os.path.join(carpeta_path, ARCHIVO_META)
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(ruta + ".tmp", ruta)
+
+
+def _offset_serializable(offset):
+    """Offset escalar (int) o por píxel (lista de 288 enteros) para el JSON."""
+    offset = np.asarray(offset)
+    if offset.ndim == 0 or np.all(offset == offset.flat[0]):
+        return int(offset.flat[0])
+    return offset.astype(int).tolist()
+
+
+def _actualizar_meta(meta):
+    """Metadatos de la versión 1 (un solo 'offset') con los tramos de offset de la actual."""
+    if "offsets" not in meta:
+        meta["offsets"] = [meta.pop("offset")]
+        meta["tramos_offset"] = [[0, 0]]
+        meta["version"] = VERSION_FORMATO
+    return meta
+
+
+def txt_pendientes(carpeta_path):
+    """Capturas .txt de la carpeta que todavía no están en su dataset (todas si no hay dataset)."""
+    importados = set(_leer_meta(carpeta_path)["importados"]) if existe_dataset(carpeta_path) else set()
+    return [r for r in listar_capturas(carpeta_path) if os.path.basename(r) not in importados]
+
+
+def _leer_txt_pendientes(rutas):
+    """(longitud_onda, intensidades (N, 288), tiempos, offsets, nombres) de las capturas .txt, en orden cronológico."""
+    longitud_onda, matriz, metadatos, rutas = cargar_capturas_txt(rutas)
+    orden = sorted(range(len(rutas)), key=lambda i: metadatos[i]["tiempo"])
+    # Redondeadas como al guardarlas en el dataset (uint16): mismos valores antes y después de importarlas
+    return (longitud_onda, np.rint(matriz[orden]), [metadatos[i]["tiempo"] for i in orden],
+            [metadatos[i]["offset"] for i in orden], [os.path.basename(rutas[i]) for i in orden])
+
+
+def _filas_completas(carpeta_path):
+    """Tramas completas del dataset (una escritura interrumpida puede dejar una a medias)."""
+    bytes_trama = NUM_PIXELES * DTYPE_DATOS.itemsize
+    return min(os.path.getsize(os.path.join(carpeta_path, ARCHIVO_DATOS)) // bytes_trama,
+               os.path.getsize(os.path.join(carpeta_path, ARCHIVO_TIEMPOS)) // DTYPE_TIEMPOS.itemsize)
+
+
+class EscritorDataset:
+    """Agrega tramas (ya sin offset) al dataset binario de una carpeta.
+
+    'offset' es el valor sustraído: escalar u oscuro por píxel (calibración).
+    Si difiere del de las últimas filas guardadas empieza un tramo nuevo. Al
+    abrirse importa primero las capturas .txt de la carpeta que todavía no
+    están en el dataset (cargar_espectros sólo lee el dataset cuando existe);
+    'importados_txt' dice cuántas.
+    """
+
+    def __init__(self, carpeta_path, offset=OFFSET_VALOR, longitud_onda=LONGITUD_ONDA):
+        os.makedirs(carpeta_path, exist_ok=True)
+        self.carpeta = carpeta_path
+        self.offset = _offset_serializable(offset)
+        ruta_datos = os.path.join(carpeta_path, ARCHIVO_DATOS)
+        ruta_tiempos = os.path.join(carpeta_path, ARCHIVO_TIEMPOS)
+
+        nuevo = not existe_dataset(carpeta_path)
+        if not nuevo:
+            self.meta = _actualizar_meta(_leer_meta(carpeta_path))
+            if self.meta["num_pixeles"] != NUM_PIXELES:
+                raise ValueError(f"El dataset de '{carpeta_path}' tiene {self.meta['num_pixeles']} píxeles "
+                                 f"por trama; no se pueden mezclar capturas.")
+        else:
+            self.meta = {
+                "version": VERSION_FORMATO,
+                "num_pixeles": NUM_PIXELES,
+                "dtype": DTYPE_DATOS.str,
+                "offsets": [], # Offsets distintos usados
+                "tramos_offset": [], # [primera fila, índice en 'offsets'] de cada tramo
+                "longitud_onda": np.asarray(longitud_onda, dtype=float).tolist(),
+                "importados": [],
+            }
+            _escribir_meta(carpeta_path, self.meta)
+
+        self._f_datos = open(ruta_datos, "ab")
+        self._f_tiempos = open(ruta_tiempos, "ab")
+        # Sin restos de una escritura interrumpida: las filas nuevas quedan alineadas con sus tiempos
+        self.filas = _filas_completas(carpeta_path)
+        self._f_datos.truncate(self.filas * NUM_PIXELES * DTYPE_DATOS.itemsize)
+        self._f_tiempos.truncate(self.filas * DTYPE_TIEMPOS.itemsize)
+        self.importados_txt = self._importar_txt(nuevo)
+
+    def _importar_txt(self, nuevo):
+        """Agrega las capturas .txt no importadas, en orden cronológico y cada una con su offset."""
+        rutas = txt_pendientes(self.carpeta)
+        if not rutas:
+            return 0
+        longitud_onda, matriz, tiempos, offsets, nombres = _leer_txt_pendientes(rutas)
+        if nuevo and longitud_onda is not None:
+            # El dataset conserva el eje de sus primeras capturas, como cuando ya existía
+            self.meta["longitud_onda"] = np.asarray(longitud_onda, dtype=float).tolist()
+        filas = range(len(nombres))
+        for offset, grupo in itertools.groupby(filas, key=lambda i: _offset_serializable(offsets[i])):
+            grupo = list(grupo)
+            self._escribir(matriz[grupo], [tiempos[i] for i in grupo], offset)
+        self.flush()
+        self.marcar_importados(nombres)
+        return len(nombres)
+
+    def _abrir_tramo(self, offset):
+        """Registra que las filas desde la actual se guardan con 'offset' (antes de escribirlas)."""
+        tramos = self.meta["tramos_offset"]
+        offsets = self.meta["offsets"]
+        if tramos and offsets[tramos[-1][1]] == offset:
+            return
+        if offset not in offsets:
+            offsets.append(offset)
+        tramos.append([self.filas, offsets.index(offset)])
+        _escribir_meta(self.carpeta, self.meta)
+
+    def agregar(self, tramas, tiempos=None):
+        """Agrega un lote (N, 288) o una trama (288,). Sin tiempos se usa la hora actual."""
+        self._escribir(tramas, tiempos, self.offset)
+
+    def _escribir(self, tramas, tiempos, offset):
+        tramas = np.ascontiguousarray(tramas, dtype=DTYPE_DATOS).reshape(-1, NUM_PIXELES)
+        if tiempos is None:
+            tiempos = time.time()
+        tiempos = np.broadcast_to(np.asarray(tiempos, dtype=DTYPE_TIEMPOS), (len(tramas),))
+        if len(tramas) == 0:
+            return
+        self._abrir_tramo(offset)
+
+        # Primero los datos y luego los tiempos: el lector usa el mínimo de ambos
+        tramas.tofile(self._f_datos)
+        np.ascontiguousarray(tiempos).tofile(self._f_tiempos)
+        self.filas += len(tramas)
+
+    def marcar_importados(self, nombres):
+        self.meta["importados"].extend(nombres)
+        _escribir_meta(self.carpeta, self.meta)
+
+    def flush(self):
+        self._f_datos.flush()
+        self._f_tiempos.flush()
+
+    def close(self):
+        self._f_datos.close()
+        self._f_tiempos.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Dataset:
+    """Vista de sólo lectura (memmap) del dataset de una carpeta."""
+
+    def __init__(self, carpeta_path):
+        self.carpeta = carpeta_path
+        self.meta = _actualizar_meta(_leer_meta(carpeta_path))
+        self.longitud_onda = np.array(self.meta["longitud_onda"])
+
+        ruta_datos = os.path.join(carpeta_path, ARCHIVO_DATOS)
+        ruta_tiempos = os.path.join(carpeta_path, ARCHIVO_TIEMPOS)
+        # Una escritura interrumpida puede dejar una trama a medias: se ignora
+        num = _filas_completas(carpeta_path)
+
+        if num == 0:
+            self.intensidad = np.empty((0, NUM_PIXELES), dtype=DTYPE_DATOS)
+            self.tiempos = np.empty(0, dtype=DTYPE_TIEMPOS)
+        else:
+            self.intensidad = np.memmap(ruta_datos, dtype=DTYPE_DATOS, mode="r", shape=(num, NUM_PIXELES))
+            self.tiempos = np.memmap(ruta_tiempos, dtype=DTYPE_TIEMPOS, mode="r", shape=(num,))
+
+    def __len__(self):
+        return len(self.intensidad)
+
+    @property
+    def offset(self):
+        """Offset de todas las filas: escalar o por píxel si es uno solo, si no (N, 288)."""
+        return self.offset_filas()
+
+    def offset_filas(self, inicio=0, fin=None):
+        """Offset con que se guardaron las filas [inicio:fin), para sumar a (o reajustar) esas filas.
+
+        Escalar o (288,) si todas comparten el mismo; (n, 288) si el rango
+        cruza tramos con offsets distintos.
+        """
+        inicio, fin, _ = slice(inicio, fin).indices(len(self))
+        offsets = self.meta["offsets"]
+        tramos = self.meta["tramos_offset"]
+        if not tramos:
+            return np.asarray(OFFSET_VALOR)
+        primeras = [t[0] for t in tramos]
+        # Tramo de la primera y de la última fila (el último que empieza en o antes de cada una)
+        desde = max(bisect.bisect_right(primeras, inicio) - 1, 0)
+        hasta = max(bisect.bisect_right(primeras, max(fin - 1, inicio)) - 1, 0)
+        indices = {tramos[k][1] for k in range(desde, hasta + 1)}
+        if len(indices) == 1:
+            return np.asarray(offsets[indices.pop()])
+        tabla = np.array([np.broadcast_to(o, (NUM_PIXELES,)) for o in offsets], dtype=float)
+        tramo = np.searchsorted(primeras, np.arange(inicio, fin), side="right") - 1
+        return tabla[np.array([t[1] for t in tramos])[tramo]]
+
+
+def abrir_dataset(carpeta_path):
+    return Dataset(carpeta_path)
+
+
+def _compactar_offsets(offsets):
+    """Offsets por fila (n, 288) como escalar o (288,) cuando todas las filas (y píxeles) coinciden."""
+    if len(offsets) == 0:
+        return np.asarray(OFFSET_VALOR)
+    if np.all(offsets == offsets[0]):
+        offsets = offsets[0]
+        return offsets[0] if np.all(offsets == offsets[0]) else offsets
+    return offsets
+
+
+def _offsets_con_pendientes(ds, offsets_txt):
+    """Offsets por fila (n, 288): los del dataset y después los de los .txt sin importar."""
+    offsets_txt = [np.broadcast_to(o, (NUM_PIXELES,)) for o in offsets_txt]
+    return np.concatenate([np.broadcast_to(ds.offset_filas(), (len(ds), NUM_PIXELES)),
+                           np.reshape(offsets_txt, (-1, NUM_PIXELES))])
+
+
+def offset_filas(offsets, inicio=0, fin=None):
+    """Las filas [inicio:fin) de los offsets que devuelve cargar_espectros(..., con_offsets=True)."""
+    return offsets[inicio:fin] if np.ndim(offsets) == 2 else offsets
+
+
+def offset_sustraido(carpeta_path, inicio=0, fin=None):
+    """Offset con que se guardaron las filas [inicio:fin) de cargar_espectros (dataset o .txt de cada fila).
+
+    Escalar, por píxel (288,) o por fila (n, 288): se suma directamente a esas filas.
+    Para cargar las filas y sus offsets de una vez, cargar_espectros(..., con_offsets=True).
+    """
+    if existe_dataset(carpeta_path):
+        ds = abrir_dataset(carpeta_path)
+        pendientes = txt_pendientes(carpeta_path)
+        if not pendientes:
+            return ds.offset_filas(inicio, fin)
+        # Las filas de los .txt sin importar van después de las del dataset (ver cargar_espectros)
+        offsets = _offsets_con_pendientes(ds, _leer_txt_pendientes(pendientes)[3])
+        return _compactar_offsets(offsets[inicio:fin])
+    # El de cada archivo (su encabezado), guardado en la caché junto con las intensidades
+    offsets = cargar_carpeta_cacheada(carpeta_path, con_offsets=True)[3]
+    return _compactar_offsets(offsets[inicio:fin])
+
+
+# --- IMPORTACIÓN DE CAPTURAS .TXT ---
+
+def importar_txt(carpeta_path):
+    """Convierte las capturas .txt de una carpeta al dataset binario (sólo las no importadas)."""
+    if not txt_pendientes(carpeta_path):
+        return 0
+    with EscritorDataset(carpeta_path) as escritor:
+        return escritor.importados_txt
+
+
+# --- CARGA PARA ANÁLISIS ---
+
+def cargar_espectros(carpeta_path, con_offsets=False):
+    """Devuelve (longitud_onda, matriz_intensidad (N, 288), etiquetas) de una carpeta.
+
+    Usa el dataset binario si existe (memmap, sin copia); si no, lee los .txt
+    a través de la caché incremental de la carpeta. Los .txt de una carpeta con
+    dataset que todavía no se importaron (los importa el próximo EscritorDataset)
+    se agregan al final, en orden cronológico. Con con_offsets=True agrega al
+    final el offset de las filas (como offset_sustraido), leído en la misma pasada.
+    """
+    if existe_dataset(carpeta_path):
+        ds = abrir_dataset(carpeta_path)
+        pendientes = txt_pendientes(carpeta_path)
+        tiempos = ds.tiempos
+        matriz = ds.intensidad
+        offsets = ds.offset_filas() if con_offsets else None
+        if pendientes:
+            _, matriz_txt, tiempos_txt, offsets_txt, _ = _leer_txt_pendientes(pendientes)
+            matriz = np.concatenate([matriz, matriz_txt.reshape(-1, NUM_PIXELES)])
+            tiempos = np.concatenate([tiempos, tiempos_txt])
+            if con_offsets:
+                offsets = _compactar_offsets(_offsets_con_pendientes(ds, offsets_txt))
+        etiquetas = [datetime.datetime.fromtimestamp(t).strftime("%Y%m%d_%H%M%S") for t in tiempos]
+        if con_offsets:
+            return ds.longitud_onda, matriz, etiquetas, offsets
+        return ds.longitud_onda, matriz, etiquetas
+
+    # Capturas .txt: sólo se parsean las nuevas o modificadas desde la última vez
+    if con_offsets:
+        longitud_onda, matriz, nombres, offsets = cargar_carpeta_cacheada(carpeta_path, con_offsets=True)
+        return longitud_onda, matriz, nombres, _compactar_offsets(offsets)
+    return cargar_carpeta_cacheada(carpeta_path)
+
+
+# --- EJECUCIÓN: importar las carpetas indicadas (o todas las de 'datos') ---
+if __name__ == "__main__":
+    carpetas = sys.argv[1:] or [os.path.join("datos", c) for c in sorted(os.listdir("datos"))
+                                if os.path.isdir(os.path.join("datos", c))]
+    for carpeta in carpetas:
+        num = importar_txt(carpeta)
+        print(f"{carpeta}: {num} capturas importadas")
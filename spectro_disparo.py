@@ -0,0 +1,172 @@
+import threading
+import time
+
+import numpy as np
+
+from spectro_core import NUM_PIXELES
+from spectro_stats import EstadisticasEnLinea
+
+# --- CAPTURA POR CAMBIO (DISPARO) ---
+#
+# Con la escena quieta casi todas las tramas son iguales dentro del ruido. El
+# disparo compara cada trama con una referencia móvil usando un umbral por
+# píxel (UMBRAL_SIGMAS veces la desviación estándar de ese píxel) y sólo deja
+# pasar a los destinos (EscritorDataset, GrabadorContinuo, ...) las tramas que
+# cambian, junto con TRAMAS_PREVIAS antes y TRAMAS_POSTERIORES después de cada
+# disparo: lo escrito en disco crece con la actividad, no con el tiempo.
+#
+# El ruido por píxel es el mismo std que calcula espectrometro_estadisticas.py:
+# se toma de una carpeta de capturas de la escena quieta (ruido_de_carpeta) o
+# se aprende de las primeras TRAMAS_APRENDIZAJE tramas.
+
+UMBRAL_SIGMAS = 5.0 # Desviación (en std del píxel) para que un píxel cuente como cambiado
+MIN_PIXELES_CAMBIO = 3 # Píxeles cambiados para disparar (un píxel solo suele ser un pico de ruido)
+RUIDO_MINIMO = 1.0 # ADC: piso del std (píxeles saturados o en cero tienen std ~0)
+TRAMAS_PREVIAS = 10
+TRAMAS_POSTERIORES = 20
+TRAMAS_APRENDIZAJE = 50
+ALFA_REFERENCIA = 0.02 # Media móvil exponencial de las tramas sin cambio (sigue derivas lentas)
+TRAMAS_REAJUSTE = 100 # Disparos seguidos tras los que la escena nueva pasa a ser la referencia
+
+
+def ruido_de_carpeta(carpeta_path, calibracion=None):
+    """Media y std por píxel de una carpeta de capturas (como espectrometro_estadisticas.py)."""
+    if calibracion is None:
+        from spectro_dataset import cargar_espectros
+        _, matriz, _ = cargar_espectros(carpeta_path)
+    else:
+        from spectro_calibracion import cargar_espectros_calibrados
+        _, matriz, _ = cargar_espectros_calibrados(carpeta_path, calibracion)
+    if len(matriz) < 2:
+        raise ValueError(f"Se necesitan al menos 2 capturas en '{carpeta_path}' para estimar el ruido.")
+    return np.mean(matriz, axis=0), np.std(matriz, axis=0)
+
+
+class DisparoPorCambio:
+    """Consumidor de lotes que reenvía a 'destinos' sólo las tramas alrededor de un cambio.
+
+    Cada destino es cualquier objeto con agregar(tramas, tiempos). Sin
+    referencia/ruido, las primeras tramas_aprendizaje tramas (que no se
+    guardan) los estiman. Seguro entre hilos como EstadisticasEnLinea.
+    """
+
+    def __init__(self, destinos, referencia=None, ruido=None, umbral_sigmas=UMBRAL_SIGMAS,
+                 min_pixeles=MIN_PIXELES_CAMBIO, tramas_previas=TRAMAS_PREVIAS,
+                 tramas_posteriores=TRAMAS_POSTERIORES, tramas_aprendizaje=TRAMAS_APRENDIZAJE,
+                 alfa=ALFA_REFERENCIA, tramas_reajuste=TRAMAS_REAJUSTE):
+        self.destinos = list(destinos)
+        self.umbral_sigmas = umbral_sigmas
+        self.min_pixeles = min_pixeles
+        self.tramas_previas = tramas_previas
+        self.tramas_posteriores = tramas_posteriores
+        self.tramas_aprendizaje = tramas_aprendizaje
+        self.alfa = alfa
+        self.tramas_reajuste = tramas_reajuste
+
+        self.tramas = 0 # Tramas recibidas
+        self.disparos = 0 # Tramas que superaron el umbral
+        self.eventos = 0 # Grupos de disparos separados por más de tramas_posteriores
+        self.guardadas = 0 # Tramas entregadas a los destinos
+        self.reajustes = 0 # Veces que un cambio persistente se tomó como nueva referencia
+        self._seguidas = 0 # Disparos consecutivos hasta la última trama
+
+        self.referencia = None
+        self._limite = None
+        self._aprendizaje = None
+        if referencia is not None and ruido is not None:
+            self._fijar_referencia(referencia, ruido)
+        else:
+            self._aprendizaje = EstadisticasEnLinea()
+
+        # Tramas recientes aún no guardadas (candidatas a pre-disparo), con su número y tiempo
+        self._previas = None
+        self._indices_previas = np.empty(0, dtype=np.int64)
+        self._tiempos_previas = np.empty(0)
+        self._ultimo_disparo = -tramas_posteriores - 1 # Número de la última trama que disparó
+        self._lock = threading.Lock()
+
+    def _fijar_referencia(self, referencia, ruido):
+        self.referencia = np.array(referencia, dtype=np.float64)
+        self._limite = self.umbral_sigmas * np.maximum(np.asarray(ruido, dtype=np.float64), RUIDO_MINIMO)
+
+    @property
+    def aprendiendo(self):
+        return self.referencia is None
+
+    def agregar(self, tramas, tiempos=None):
+        """Procesa un lote (N, 288) o una trama (288,); sin tiempos se usa la hora actual."""
+        tramas = np.asarray(tramas).reshape(-1, NUM_PIXELES)
+        if len(tramas) == 0:
+            return
+        if tiempos is None:
+            tiempos = time.time()
+        tiempos = np.broadcast_to(np.asarray(tiempos, dtype=float), (len(tramas),))
+
+        with self._lock:
+            if self.aprendiendo:
+                faltan = self.tramas_aprendizaje - self._aprendizaje.n
+                self._aprendizaje.agregar(tramas[:faltan])
+                self.tramas += min(faltan, len(tramas))
+                if self._aprendizaje.n < self.tramas_aprendizaje:
+                    return
+                foto = self._aprendizaje.instantanea()
+                self._fijar_referencia(foto["media"], foto["std"])
+                tramas, tiempos = tramas[faltan:], tiempos[faltan:]
+                if len(tramas) == 0:
+                    return
+            self._procesar(tramas, tiempos)
+
+    def _procesar(self, tramas, tiempos):
+        x = tramas.astype(np.float64)
+        indices = self.tramas + np.arange(len(x))
+        self.tramas += len(x)
+
+        # Todo el lote contra la referencia del inicio del lote
+        cambiados = np.count_nonzero(np.abs(x - self.referencia) > self._limite, axis=1)
+        disparo = cambiados >= self.min_pixeles
+
+        # La referencia sólo sigue a las tramas sin cambio, así un evento no la contamina.
+        # Media móvil exponencial exacta sobre el lote: pesos alfa * (1 - alfa)^(m-1-j)
+        quietas = x[~disparo]
+        if len(quietas):
+            retencion = (1 - self.alfa) ** np.arange(len(quietas) - 1, -1, -1)
+            self.referencia *= (1 - self.alfa) * retencion[0]
+            self.referencia += (self.alfa * retencion) @ quietas
+
+        # Un cambio que no termina (se movió la fuente, cambió la luz) pasa a ser la escena quieta
+        finales = len(disparo) - (np.flatnonzero(~disparo)[-1] + 1 if len(quietas) else 0)
+        self._seguidas = self._seguidas + finales if finales == len(disparo) else finales
+        if self._seguidas >= self.tramas_reajuste:
+            self.referencia[:] = x[-finales:].mean(axis=0)
+            self._seguidas = 0
+            self.reajustes += 1
+
+        # Candidatas: las previas pendientes y el lote, en orden
+        if self._previas is not None:
+            disparo = np.concatenate([np.zeros(len(self._previas), dtype=bool), disparo])
+            tramas = np.concatenate([self._previas, tramas])
+            indices = np.concatenate([self._indices_previas, indices])
+            tiempos = np.concatenate([self._tiempos_previas, tiempos])
+
+        indices_disparo = indices[disparo]
+        if len(indices_disparo):
+            self.disparos += len(indices_disparo)
+            anteriores = np.concatenate([[self._ultimo_disparo], indices_disparo[:-1]])
+            self.eventos += int(np.count_nonzero(indices_disparo - anteriores > self.tramas_posteriores))
+
+        # Último disparo en o antes de cada trama (post) y próximo en o después (pre)
+        ultimo = np.maximum.accumulate(np.where(disparo, indices, self._ultimo_disparo))
+        proximo = np.minimum.accumulate(np.where(disparo, indices, np.iinfo(np.int64).max)[::-1])[::-1]
+        guardar = (indices - ultimo <= self.tramas_posteriores) | (proximo - indices <= self.tramas_previas)
+        self._ultimo_disparo = int(ultimo[-1])
+
+        if np.any(guardar):
+            for destino in self.destinos:
+                destino.agregar(tramas[guardar], tiempos[guardar])
+            self.guardadas += int(np.count_nonzero(guardar))
+
+        # Las tramas no guardadas más recientes quedan como posibles previas del próximo disparo
+        pendientes = ~guardar & (indices > indices[-1] - self.tramas_previas)
+        self._previas = tramas[pendientes]
+        self._indices_previas = indices[pendientes]
+        self._tiempos_previas = tiempos[pendientes]
@@ -0,0 +1,295 @@
+import datetime
+import glob
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from spectro_core import LONGITUD_ONDA, NUM_PIXELES, OFFSET_VALOR
+
+# --- GRABACIÓN CONTINUA EN BLOQUES COMPRIMIDOS ---
+#
+# Para sesiones largas (millones de tramas) sin que nada tenga que caber en RAM.
+# El hilo lector sólo copia cada lote en un bloque preasignado; los bloques
+# llenos pasan por una cola acotada a un hilo escritor que los comprime y los
+# agrega al archivo actual. Si el disco se atrasa y la cola se llena, se
+# descarta el bloque (y se cuenta) en vez de frenar la lectura serial.
+#
+# Archivo 'grabacion_AAAAMMDD_HHMMSS.espg' (se rota por tamaño o por tiempo):
+#   b"ESPG" | uint32 largo | JSON (offset, longitud_onda, ...)
+#   bloques: cabecera _BLOQUE | tiempos float64 (n) + tramas uint16 (n, 288)
+# Con compresión, las tramas se guardan como diferencias con la trama anterior
+# y con los bytes altos y bajos separados antes de zlib (espectros parecidos
+# entre sí: muchos ceros).
+
+EXTENSION_GRABACION = ".espg"
+_MAGIA_ARCHIVO = b"ESPG"
+_MAGIA_BLOQUE = b"BLQ1"
+_BLOQUE = struct.Struct("<4sBBHIIdd") # magia, códec, reservado, reservado, n, largo, t_inicio, t_fin
+_CODEC_CRUDO = 0
+_CODEC_ZLIB = 1
+
+TRAMAS_POR_BLOQUE = 1024
+NIVEL_COMPRESION = 3 # zlib 1-9: más alto, más lento
+MAX_BYTES_ARCHIVO = 256 * 1024 * 1024
+MAX_SEGUNDOS_ARCHIVO = 3600
+MAX_BLOQUES_COLA = 8 # Bloques esperando al escritor (memoria acotada)
+
+
+def _codificar(tiempos, tramas, comprimir, nivel):
+    if not comprimir:
+        return _CODEC_CRUDO, tiempos.tobytes() + tramas.tobytes()
+    diferencias = tramas.copy()
+    np.subtract(tramas[1:], tramas[:-1], out=diferencias[1:]) # Módulo 2**16
+    separados = diferencias.view(np.uint8).reshape(len(tramas), NUM_PIXELES, 2).transpose(2, 0, 1)
+    return _CODEC_ZLIB, zlib.compress(tiempos.tobytes() + separados.tobytes(), nivel)
+
+
+def _decodificar(codec, datos, num):
+    if codec == _CODEC_ZLIB:
+        datos = zlib.decompress(datos)
+    tiempos = np.frombuffer(datos, dtype="<f8", count=num)
+    cuerpo = np.frombuffer(datos, dtype=np.uint8, offset=8 * num)
+    if codec == _CODEC_CRUDO:
+        return tiempos, cuerpo.view("<u2").reshape(num, NUM_PIXELES)
+    diferencias = cuerpo.reshape(2, num, NUM_PIXELES).transpose(1, 2, 0).copy().view("<u2")[..., 0]
+    return tiempos, np.cumsum(diferencias, axis=0, dtype=np.uint16)
+
+
+class GrabadorContinuo:
+    """Graba todas las tramas (con su tiempo) en archivos de bloques, escribiendo en segundo plano.
+
+    agregar() nunca bloquea por el disco: sólo copia el lote al bloque en curso.
+    """
+
+    def __init__(self, carpeta_path, offset=OFFSET_VALOR, longitud_onda=LONGITUD_ONDA,
+                 tramas_por_bloque=TRAMAS_POR_BLOQUE, comprimir=True, nivel=NIVEL_COMPRESION,
+                 max_bytes_archivo=MAX_BYTES_ARCHIVO, max_segundos_archivo=MAX_SEGUNDOS_ARCHIVO,
+                 max_bloques_cola=MAX_BLOQUES_COLA):
+        os.makedirs(carpeta_path, exist_ok=True)
+        self.carpeta = carpeta_path
+        self.comprimir = comprimir
+        self.nivel = nivel
+        self.max_bytes_archivo = max_bytes_archivo
+        self.max_segundos_archivo = max_segundos_archivo
+        offset = np.asarray(offset)
+        self.meta = {
+            "num_pixeles": NUM_PIXELES,
+            "offset": int(offset) if offset.ndim == 0 else offset.astype(int).tolist(),
+            "longitud_onda": np.asarray(longitud_onda, dtype=float).tolist(),
+        }
+
+        # Bloques preasignados: el que se llena, los de la cola y el que se escribe
+        self._libres = queue.Queue()
+        for _ in range(max_bloques_cola + 2):
+            self._libres.put((np.empty(tramas_por_bloque), np.empty((tramas_por_bloque, NUM_PIXELES), np.uint16)))
+        self._tiempos, self._tramas = self._libres.get()
+        self._llenas = 0
+        self._cola = queue.Queue(max_bloques_cola)
+
+        self.tramas = 0 # Tramas recibidas por agregar()
+        self.tramas_descartadas = 0 # Perdidas porque el escritor no daba abasto o tras un error de escritura
+        self.bytes_escritos = 0
+        self.bytes_sin_comprimir = 0
+        self.archivos = []
+        self.error = None
+        self._archivo = None
+        self._hilo = threading.Thread(target=self._escribir, name="grabador", daemon=True)
+        self._hilo.start()
+
+    # --- Hilo lector ---
+
+    def agregar(self, tramas, tiempos=None):
+        """Copia un lote (N, 288) o una trama (288,); sin tiempos se usa la hora actual."""
+        tramas = np.asarray(tramas).reshape(-1, NUM_PIXELES)
+        if tiempos is None:
+            tiempos = time.time()
+        tiempos = np.broadcast_to(np.asarray(tiempos, dtype=float), (len(tramas),))
+        self.tramas += len(tramas)
+        capacidad = len(self._tramas)
+        copiadas = 0
+        while copiadas < len(tramas):
+            num = min(len(tramas) - copiadas, capacidad - self._llenas)
+            self._tramas[self._llenas:self._llenas + num] = tramas[copiadas:copiadas + num]
+            self._tiempos[self._llenas:self._llenas + num] = tiempos[copiadas:copiadas + num]
+            self._llenas += num
+            copiadas += num
+            if self._llenas == capacidad:
+                self._entregar()
+
+    def _entregar(self):
+        """Pasa el bloque lleno al escritor y toma uno libre, sin esperar al disco."""
+        if self._llenas == 0:
+            return
+        try:
+            self._cola.put_nowait((self._tiempos, self._tramas, self._llenas))
+            self._tiempos, self._tramas = self._libres.get()
+        except queue.Full:
+            self.tramas_descartadas += self._llenas # Se reutiliza el mismo bloque
+        self._llenas = 0
+
+    # --- Hilo escritor ---
+
+    def _abrir_archivo(self, t_inicio):
+        nombre = datetime.datetime.fromtimestamp(t_inicio).strftime("grabacion_%Y%m%d_%H%M%S")
+        ruta = os.path.join(self.carpeta, nombre + EXTENSION_GRABACION)
+        sufijo = 1
+        while os.path.exists(ruta):
+            ruta = os.path.join(self.carpeta, f"{nombre}_{sufijo}{EXTENSION_GRABACION}")
+            sufijo += 1
+        meta = json.dumps(dict(self.meta, creado=t_inicio)).encode()
+        self._archivo = open(ruta, "wb")
+        self._archivo.write(_MAGIA_ARCHIVO + struct.pack("<I", len(meta)) + meta)
+        self._inicio_archivo = time.time()
+        self.archivos.append(ruta)
+
+    def _rotar_si_corresponde(self, t_inicio):
+        if self._archivo is not None and (self._archivo.tell() >= self.max_bytes_archivo
+                                          or time.time() - self._inicio_archivo >= self.max_segundos_archivo):
+            self._archivo.close()
+            self._archivo = None
+        if self._archivo is None:
+            self._abrir_archivo(t_inicio)
+
+    def _escribir(self):
+        while True:
+            bloque = self._cola.get()
+            if bloque is None:
+                break
+            tiempos, tramas, num = bloque
+            try:
+                if self.error is not None:
+                    # Después de un error ya no se escribe: los bloques siguientes también se pierden
+                    self.tramas_descartadas += num
+                    continue
+                self._rotar_si_corresponde(tiempos[0])
+                codec, datos = _codificar(tiempos[:num], tramas[:num], self.comprimir, self.nivel)
+                self._archivo.write(_BLOQUE.pack(_MAGIA_BLOQUE, codec, 0, 0, num, len(datos),
+                                                 tiempos[0], tiempos[num - 1]))
+                self._archivo.write(datos)
+                self._archivo.flush()
+                self.bytes_escritos += _BLOQUE.size + len(datos)
+                self.bytes_sin_comprimir += num * (8 + 2 * NUM_PIXELES)
+            except OSError as e:
+                self.error = e # Disco lleno, etc.: se deja de escribir, la captura sigue
+                self.tramas_descartadas += num
+            finally:
+                self._libres.put((tiempos, tramas))
+        if self._archivo is not None:
+            self._archivo.close()
+
+    def close(self):
+        """Escribe el bloque incompleto y espera al escritor."""
+        self._entregar()
+        self._cola.put(None)
+        self._hilo.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- LECTURA PEREZOSA ---
+
+def _leer_meta_archivo(f):
+    if f.read(4) != _MAGIA_ARCHIVO:
+        raise ValueError(f"'{f.name}' no es una grabación {EXTENSION_GRABACION}")
+    (largo,) = struct.unpack("<I", f.read(4))
+    return json.loads(f.read(largo))
+
+
+def _cabeceras(f):
+    """Recorre las cabeceras de bloque de un archivo abierto: (posición de datos, códec, n, largo, t0, t1)."""
+    while True:
+        cabecera = f.read(_BLOQUE.size)
+        if len(cabecera) < _BLOQUE.size:
+            return
+        magia, codec, _, _, num, largo, t_inicio, t_fin = _BLOQUE.unpack(cabecera)
+        if magia != _MAGIA_BLOQUE:
+            return
+        posicion = f.tell()
+        f.seek(largo, os.SEEK_CUR)
+        if f.tell() > os.fstat(f.fileno()).st_size:
+            return # Último bloque a medias (corte durante la escritura)
+        yield posicion, codec, num, largo, t_inicio, t_fin
+
+
+class LectorGrabacion:
+    """Lee una grabación (un archivo o la carpeta con todos sus archivos) bloque a bloque.
+
+    Sólo se descomprime el bloque que se está recorriendo, así que la memoria
+    usada no depende de la duración de la grabación.
+    """
+
+    def __init__(self, ruta):
+        if os.path.isdir(ruta):
+            self.archivos = sorted(glob.glob(os.path.join(ruta, "*" + EXTENSION_GRABACION)))
+        else:
+            self.archivos = [ruta]
+        if not self.archivos:
+            raise ValueError(f"No hay grabaciones {EXTENSION_GRABACION} en '{ruta}'.")
+        with open(self.archivos[0], "rb") as f:
+            self.meta = _leer_meta_archivo(f)
+        self.offset = np.asarray(self.meta["offset"])
+        self.longitud_onda = np.array(self.meta["longitud_onda"])
+
+    def indice(self):
+        """Lista de (archivo, n, t_inicio, t_fin) de cada bloque, leyendo sólo las cabeceras."""
+        bloques = []
+        for ruta in self.archivos:
+            with open(ruta, "rb") as f:
+                _leer_meta_archivo(f)
+                bloques += [(ruta, num, t0, t1) for _, _, num, _, t0, t1 in _cabeceras(f)]
+        return bloques
+
+    def __len__(self):
+        return sum(b[1] for b in self.indice())
+
+    def bloques(self, desde=None, hasta=None):
+        """Genera (tiempos (n,), tramas (n, 288)) por bloque; desde/hasta (epoch) filtran por tiempo."""
+        for ruta in self.archivos:
+            with open(ruta, "rb") as f:
+                _leer_meta_archivo(f)
+                for posicion, codec, num, largo, t_inicio, t_fin in _cabeceras(f):
+                    if (desde is not None and t_fin < desde) or (hasta is not None and t_inicio > hasta):
+                        continue
+                    regreso = f.tell()
+                    f.seek(posicion)
+                    tiempos, tramas = _decodificar(codec, f.read(largo), num)
+                    f.seek(regreso)
+                    if desde is not None or hasta is not None:
+                        dentro = np.ones(num, dtype=bool)
+                        if desde is not None:
+                            dentro &= tiempos >= desde
+                        if hasta is not None:
+                            dentro &= tiempos <= hasta
+                        tiempos, tramas = tiempos[dentro], tramas[dentro]
+                    yield tiempos, tramas
+
+    def __iter__(self):
+        return self.bloques()
+
+
+# --- EJECUCIÓN: resumen de una grabación ---
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Uso: python spectro_grabacion.py <archivo.espg o carpeta>")
+    lector = LectorGrabacion(sys.argv[1])
+    indice = lector.indice()
+    num = sum(b[1] for b in indice)
+    bytes_archivos = sum(os.path.getsize(r) for r in lector.archivos)
+    print(f"Archivos: {len(lector.archivos)} | Bloques: {len(indice)} | Tramas: {num}")
+    if indice:
+        inicio = datetime.datetime.fromtimestamp(indice[0][2])
+        fin = datetime.datetime.fromtimestamp(indice[-1][3])
+        print(f"Desde {inicio:%Y-%m-%d %H:%M:%S} hasta {fin:%Y-%m-%d %H:%M:%S} ({(fin - inicio).total_seconds():.0f} s)")
+        print(f"Tamaño: {bytes_archivos / 1e6:.1f} MB "
+              f"({num * (8 + 2 * NUM_PIXELES) / max(bytes_archivos, 1):.1f}x de compresión)")
@@ -0,0 +1,171 @@
+import bisect
+import json
+import time
+
+import numpy as np
+
+# --- INSTRUMENTACIÓN DEL CAMINO CRÍTICO ---
+#
+# Histogramas de tiempo por etapa (lectura serial, decodificación, calibración,
+# dibujo, espera de la GUI, ...), niveles muestreados (bytes esperando en el
+# puerto) y contadores (tramas recibidas, malformadas, perdidas, mostradas).
+# Uso en el bucle:
+#     t = inst.reloj()
+#     ...lectura...
+#     t = inst.medir("lectura_serial", t)   # devuelve el instante actual para encadenar
+#     ...decodificación...
+#     inst.medir("decodificacion", t)
+# Desactivada, reloj() y medir() son funciones vacías (~0.1 µs por llamada).
+# Cada etapa o nivel debe actualizarse desde un solo hilo; los contadores que
+# ya llevan otros objetos (decodificador, hilo lector) se registran como
+# funciones y sólo se leen al generar el reporte.
+
+INTERVALO_REPORTE = 10.0 # Segundos entre reportes periódicos
+# Bordes de los histogramas: 1 µs a 10 s, 10 bins por década
+BORDES_S = np.logspace(-6, 1, 71)
+_BORDES = BORDES_S.tolist()
+PERCENTILES = (50, 95, 99)
+
+
+def _cero():
+    return 0.0
+
+
+def _nada(*args):
+    return 0.0
+
+
+class _Etapa:
+    """Histograma de duraciones de una etapa con bordes logarítmicos fijos."""
+
+    __slots__ = ("conteos", "n", "total", "maximo")
+
+    def __init__(self):
+        self.conteos = [0] * (len(_BORDES) + 1) # Más un bin por debajo y otro por encima
+        self.n = 0
+        self.total = 0.0
+        self.maximo = 0.0
+
+    def agregar(self, duracion):
+        self.conteos[bisect.bisect(_BORDES, duracion)] += 1
+        self.n += 1
+        self.total += duracion
+        if duracion > self.maximo:
+            self.maximo = duracion
+
+    def resumen(self):
+        conteos = np.array(self.conteos)
+        acumulado = np.cumsum(conteos)
+        # Percentil = borde superior del bin donde el acumulado lo alcanza (cota por exceso)
+        bordes_sup = np.append(BORDES_S, np.inf)
+        resumen = {"n": self.n, "total_s": self.total,
+                   "media_us": 1e6 * self.total / self.n if self.n else 0.0, "max_us": 1e6 * self.maximo}
+        for p in PERCENTILES:
+            i = int(np.searchsorted(acumulado, p / 100 * self.n)) if self.n else 0
+            resumen[f"p{p}_us"] = 1e6 * min(float(bordes_sup[i]), self.maximo)
+        resumen["histograma"] = conteos.tolist()
+        return resumen
+
+
+class _Nivel:
+    """Valor muestreado (p. ej. bytes en el buffer serial): último, media y máximo."""
+
+    __slots__ = ("n", "suma", "maximo", "ultimo")
+
+    def __init__(self):
+        self.n = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+        self.ultimo = 0.0
+
+    def agregar(self, valor):
+        self.n += 1
+        self.suma += valor
+        self.ultimo = valor
+        if valor > self.maximo:
+            self.maximo = valor
+
+    def resumen(self):
+        return {"n": self.n, "media": self.suma / self.n if self.n else 0.0, "maximo": self.maximo,
+                "ultimo": self.ultimo}
+
+
+class Instrumentacion:
+    """Tiempos por etapa, niveles y contadores del lazo de captura; activa=False no mide nada."""
+
+    def __init__(self, activa=True, intervalo_reporte=INTERVALO_REPORTE):
+        self.activa = activa
+        self.intervalo_reporte = intervalo_reporte
+        self._etapas = {}
+        self._niveles = {}
+        self._contadores = {}
+        self._fuentes = {} # Contadores leídos de otros objetos al reportar
+        self._t_inicio = time.perf_counter()
+        self._proximo_reporte = self._t_inicio + intervalo_reporte
+        if not activa:
+            self.reloj = _cero
+            self.medir = _nada
+            self.nivel = _nada
+            self.contar = _nada
+
+    def reloj(self):
+        return time.perf_counter()
+
+    def medir(self, etapa, t_inicio):
+        """Registra el tiempo desde t_inicio en la etapa y devuelve el instante actual."""
+        ahora = time.perf_counter()
+        registro = self._etapas.get(etapa)
+        if registro is None:
+            registro = self._etapas[etapa] = _Etapa()
+        registro.agregar(ahora - t_inicio)
+        return ahora
+
+    def nivel(self, nombre, valor):
+        registro = self._niveles.get(nombre)
+        if registro is None:
+            registro = self._niveles[nombre] = _Nivel()
+        registro.agregar(valor)
+
+    def contar(self, nombre, cantidad=1):
+        self._contadores[nombre] = self._contadores.get(nombre, 0) + cantidad
+
+    def registrar_contador(self, nombre, funcion):
+        """Contador que ya lleva otro objeto: funcion() se evalúa sólo al reportar."""
+        self._fuentes[nombre] = funcion
+
+    def reporte(self):
+        """Diccionario serializable a JSON con todo lo medido hasta ahora."""
+        contadores = dict(self._contadores)
+        for nombre, funcion in self._fuentes.items():
+            contadores[nombre] = funcion()
+        return {
+            "duracion_s": time.perf_counter() - self._t_inicio,
+            "bordes_histograma_s": BORDES_S.tolist(),
+            "etapas": {nombre: etapa.resumen() for nombre, etapa in list(self._etapas.items())},
+            "niveles": {nombre: nivel.resumen() for nombre, nivel in list(self._niveles.items())},
+            "contadores": contadores,
+        }
+
+    def imprimir_reporte(self, reporte=None):
+        reporte = reporte or self.reporte()
+        print(f"\n--- INSTRUMENTACIÓN ({reporte['duracion_s']:.1f} s) ---")
+        print(f"{'Etapa':<22} {'n':>8} {'media':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'máx':>9}  (µs)")
+        for nombre, e in reporte["etapas"].items():
+            print(f"{nombre:<22} {e['n']:>8} {e['media_us']:>9.0f} {e['p50_us']:>9.0f} {e['p95_us']:>9.0f} "
+                  f"{e['p99_us']:>9.0f} {e['max_us']:>9.0f}")
+        for nombre, nivel in reporte["niveles"].items():
+            print(f"{nombre}: media {nivel['media']:.0f} | máx {nivel['maximo']:.0f} | último {nivel['ultimo']:.0f}")
+        if reporte["contadores"]:
+            print(" | ".join(f"{nombre}: {valor}" for nombre, valor in reporte["contadores"].items()))
+
+    def reportar_si_corresponde(self):
+        """Imprime el reporte cada intervalo_reporte segundos (llamar desde el bucle principal)."""
+        if not self.activa or time.perf_counter() < self._proximo_reporte:
+            return
+        self._proximo_reporte = time.perf_counter() + self.intervalo_reporte
+        self.imprimir_reporte()
+
+    def guardar(self, ruta):
+        """Escribe el reporte en JSON (para comparar corridas o graficar los histogramas)."""
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(self.reporte(), f, indent=1)
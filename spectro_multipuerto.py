@@ -0,0 +1,262 @@
+import collections
+import os
+import threading
+import time
+
+import numpy as np
+
+from spectro_core import NUM_PIXELES
+from spectro_serial import (BufferCircular, FuenteSerial, HiloAdquisicion, abrir_puerto, crear_decodificador,
+                            esperar_placa)
+
+# --- ADQUISICIÓN SIMULTÁNEA DE VARIOS ESPECTRÓMETROS ---
+#
+# Un HiloAdquisicion por puerto: cada hilo bloquea en su propio read() (que
+# libera el GIL) y decodifica sus tramas sin esperar a los demás, así el total
+# de tramas por segundo crece con el número de equipos en vez de repartirse un
+# único bucle de sondeo.
+#
+# Cada trama recibe un tiempo monotónico del PC (time.monotonic) y un número
+# de secuencia por equipo (el contador del firmware con el protocolo binario,
+# que deja ver las tramas perdidas; con texto, el orden de llegada). El
+# alineador toma cada trama del primer equipo como referencia, le junta la
+# trama más cercana en el tiempo de cada uno de los demás y entrega esos
+# conjuntos (K, D, 288) a los consumidores de procesamiento y grabación. Los
+# equipos corren libres (sin disparo común), así que el desfase dentro de un
+# conjunto llega hasta medio período; si la más cercana está a más de la
+# tolerancia (por defecto FRACCION_PERIODO del período del equipo más lento,
+# medido en marcha) la referencia se descarta.
+
+VARIABLE_PUERTOS = "ESPECTROMETRO_PUERTOS" # Lista separada por comas: "COM10,COM3" o "sim,sim"
+PUERTOS_POR_DEFECTO = ("COM10", "COM3") # Laptop y torre
+TOLERANCIA_S = None # Máxima diferencia de tiempo (s) dentro de un conjunto; None: según el período medido
+FRACCION_PERIODO = 0.75
+MAX_PENDIENTES = 256 # Tramas por equipo esperando pareja antes de descartar las más antiguas
+
+
+def puertos_configurados(puertos=None):
+    """Puertos a abrir: los dados, la variable ESPECTROMETRO_PUERTOS o PUERTOS_POR_DEFECTO."""
+    if puertos:
+        return list(puertos)
+    variable = os.environ.get(VARIABLE_PUERTOS)
+    if variable:
+        return [p.strip() for p in variable.split(",") if p.strip()]
+    return list(PUERTOS_POR_DEFECTO)
+
+
+class _Ritmo:
+    """Período medio entre tramas a partir de los instantes de lectura de cada lote.
+
+    El primer lote sólo marca el inicio: puede traer tramas acumuladas antes
+    de arrancar el hilo, todas con el mismo instante.
+    """
+
+    def __init__(self):
+        self._t_inicio = None
+        self._t_ultimo = None
+        self._tramas = 0 # Recibidas después del primer lote
+
+    def agregar(self, instante, num):
+        if self._t_inicio is None:
+            self._t_inicio = instante
+        else:
+            self._tramas += num
+        self._t_ultimo = instante
+
+    @property
+    def periodo(self):
+        """Segundos por trama; NaN hasta tener un lote después del primero."""
+        if self._tramas == 0:
+            return np.nan
+        return (self._t_ultimo - self._t_inicio) / self._tramas
+
+
+class Dispositivo:
+    """Un espectrómetro: puerto, decodificador y su propio hilo lector.
+
+    Sella cada lote decodificado con tiempos monotónicos y secuencias y lo
+    pasa al alineador. Dentro de un lote (varias tramas leídas de una vez)
+    los tiempos se reparten hacia atrás desde el instante de lectura con el
+    período medido del equipo.
+    """
+
+    def __init__(self, indice, ser, protocolo="binario", alineador=None, puerto=None):
+        self.indice = indice
+        self.ser = ser
+        self.puerto = puerto or getattr(ser, "port", str(indice))
+        self.nombre = f"espectrometro_{indice}"
+        self.alineador = alineador
+        self.decodificador = crear_decodificador(protocolo, self.ser)
+
+        self.recibidas = 0
+        self._ritmo = _Ritmo()
+        self._t_ultima = None
+        self.anillo = BufferCircular(16) # Última trama de este equipo, para la interfaz
+        self.hilo = HiloAdquisicion(FuenteSerial(self.ser, self.decodificador), self.anillo, [self._recibir])
+        self.hilo.name = f"adquisicion_{indice}"
+
+    @property
+    def periodo(self):
+        """Período medio entre tramas (s), medido en marcha."""
+        return self._ritmo.periodo
+
+    def _recibir(self, tramas):
+        ahora = time.monotonic()
+        num = len(tramas)
+        periodo = self.periodo
+        if num > 1 and np.isfinite(periodo):
+            tiempos = ahora - periodo * np.arange(num - 1, -1, -1)
+            if self._t_ultima is not None:
+                # Nunca antes de la trama anterior: el lote se comprime si hace falta
+                np.maximum(tiempos, np.linspace(self._t_ultima, ahora, num + 1)[1:], out=tiempos)
+        else:
+            tiempos = np.full(num, ahora)
+        secuencias = getattr(self.decodificador, "secuencias", None)
+        if secuencias is None or len(secuencias) != num:
+            secuencias = self.recibidas + np.arange(num)
+
+        self._ritmo.agregar(ahora, num)
+        self._t_ultima = ahora
+        self.recibidas += num
+        if self.alineador is not None:
+            self.alineador.agregar(self.indice, tramas, tiempos, secuencias)
+
+    def iniciar(self):
+        self.hilo.start()
+
+    def detener(self):
+        self.hilo.detener()
+        self.ser.close()
+
+
+class AlineadorTramas:
+    """Junta a cada trama del equipo 0 la más cercana de cada otro equipo y entrega los conjuntos.
+
+    Con tolerancia=None se usa FRACCION_PERIODO del período más largo entre
+    los equipos; hasta medirlo (dos lotes de cada uno) no se forman conjuntos.
+    Cada consumidor es f(conjuntos (K, D, 288), tiempos (K, D), secuencias (K, D)),
+    llamado en el hilo del equipo que completa los conjuntos y bajo el lock
+    del alineador (orden garantizado): debe ser rápido, como los consumidores
+    de HiloAdquisicion. Las tramas sin pareja se cuentan por equipo en
+    sin_pareja.
+    """
+
+    def __init__(self, num_dispositivos, consumidores=(), tolerancia=TOLERANCIA_S, max_pendientes=MAX_PENDIENTES):
+        self.num_dispositivos = num_dispositivos
+        self.consumidores = list(consumidores)
+        self.tolerancia = tolerancia
+        self.max_pendientes = max_pendientes
+        self._pendientes = [collections.deque() for _ in range(num_dispositivos)] # (tiempo, secuencia, trama)
+        self._ritmos = [_Ritmo() for _ in range(num_dispositivos)]
+        self.conjuntos = 0
+        self.sin_pareja = np.zeros(num_dispositivos, dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def agregar(self, dispositivo, tramas, tiempos, secuencias):
+        """Incorpora un lote sellado de un equipo (se copia: el decodificador reutiliza su buffer)."""
+        if len(tramas) == 0:
+            return
+        with self._lock:
+            self._ritmos[dispositivo].agregar(float(tiempos[-1]), len(tramas))
+            cola = self._pendientes[dispositivo]
+            cola.extend(zip(np.asarray(tiempos).tolist(), np.asarray(secuencias).tolist(), np.array(tramas)))
+            exceso = len(cola) - self.max_pendientes
+            if exceso > 0:
+                # Otro equipo dejó de enviar: no se acumula memoria esperándolo
+                for _ in range(exceso):
+                    cola.popleft()
+                self.sin_pareja[dispositivo] += exceso
+            self._emparejar()
+
+    @property
+    def tolerancia_actual(self):
+        """Tolerancia en uso (s); NaN mientras no se conoce el período de todos los equipos."""
+        if self.tolerancia is not None:
+            return self.tolerancia
+        periodos = [ritmo.periodo for ritmo in self._ritmos]
+        return np.nan if np.any(np.isnan(periodos)) else FRACCION_PERIODO * max(periodos)
+
+    def _emparejar(self):
+        tolerancia = self.tolerancia_actual
+        if np.isnan(tolerancia):
+            return
+        colas = self._pendientes
+        tiempos, secuencias, tramas = [], [], []
+        while colas[0]:
+            # Cada trama del equipo de referencia (el primero) se junta con la más cercana de cada uno de los demás
+            t_referencia = colas[0][0][0]
+            completo = True
+            for d in range(1, self.num_dispositivos):
+                cola = colas[d]
+                while len(cola) > 1 and abs(cola[1][0] - t_referencia) <= abs(cola[0][0] - t_referencia):
+                    cola.popleft() # La siguiente está más cerca de esta referencia
+                    self.sin_pareja[d] += 1
+                if not cola or (len(cola) == 1 and cola[0][0] < t_referencia):
+                    # La más cercana puede estar por llegar
+                    return self._entregar(tiempos, secuencias, tramas)
+                if abs(cola[0][0] - t_referencia) > tolerancia:
+                    completo = False
+            if not completo:
+                colas[0].popleft() # Algún equipo no tiene trama cerca de esta referencia
+                self.sin_pareja[0] += 1
+                continue
+            conjunto = [cola.popleft() for cola in colas]
+            tiempos.append([c[0] for c in conjunto])
+            secuencias.append([c[1] for c in conjunto])
+            tramas.append([c[2] for c in conjunto])
+        self._entregar(tiempos, secuencias, tramas)
+
+    def _entregar(self, tiempos, secuencias, tramas):
+        if not tramas:
+            return
+        self.conjuntos += len(tramas)
+        conjuntos = np.array(tramas, dtype=np.uint16).reshape(len(tramas), self.num_dispositivos, NUM_PIXELES)
+        tiempos = np.array(tiempos)
+        secuencias = np.array(secuencias, dtype=np.int64)
+        for consumidor in self.consumidores:
+            consumidor(conjuntos, tiempos, secuencias)
+
+
+class AdquisicionMultiple:
+    """Abre todos los puertos, un hilo lector por equipo, y alinea sus tramas en conjuntos.
+
+    'a_epoch' convierte los tiempos monotónicos a segundos epoch para los
+    escritores de datos (EscritorDataset, GrabadorContinuo).
+    """
+
+    def __init__(self, puertos=None, protocolo="binario", consumidores=(), tolerancia=TOLERANCIA_S):
+        puertos = puertos_configurados(puertos)
+        self.alineador = AlineadorTramas(len(puertos), consumidores, tolerancia)
+        self.a_epoch = time.time() - time.monotonic()
+        # Todos los puertos primero: los Arduino se reinician al abrirlos y arrancan a la vez
+        abiertos = []
+        try:
+            for puerto in puertos:
+                abiertos.append(abrir_puerto(puerto))
+            for puerto, ser in zip(puertos, abiertos):
+                if not esperar_placa(ser):
+                    print(f"Aviso: el Arduino de {puerto} todavía no envía datos.")
+            self.dispositivos = [Dispositivo(i, ser, protocolo, self.alineador, puerto)
+                                 for i, (puerto, ser) in enumerate(zip(puertos, abiertos))]
+        except Exception:
+            for ser in abiertos:
+                ser.close()
+            raise
+
+    def __len__(self):
+        return len(self.dispositivos)
+
+    def iniciar(self):
+        for dispositivo in self.dispositivos:
+            dispositivo.iniciar()
+
+    def detener(self):
+        for dispositivo in self.dispositivos:
+            dispositivo.detener()
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        self.detener()
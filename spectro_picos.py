@@ -0,0 +1,248 @@
+import collections
+import threading
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from spectro_core import LONGITUD_ONDA
+
+# --- DETECCIÓN DE PICOS SUB-PÍXEL Y SEGUIMIENTO ---
+#
+# Búsqueda de varios picos por trama sobre lotes (N, 288) sin bucles por trama:
+# máximos locales, prominencia (como scipy.signal.peak_prominences con ventana
+# limitada) y refinamiento sub-píxel con 3 puntos (parábola o gaussiana) o
+# centroide. El seguidor asocia los picos de trama en trama por cercanía en nm
+# para ver su deriva en el tiempo.
+
+PROMINENCIA_MIN = 25 # ADC; por debajo se considera ruido
+MAX_PICOS = 8 # Picos por trama (los más prominentes)
+VENTANA_PROMINENCIA = 48 # Píxeles a cada lado para buscar la base del pico (~80 nm)
+RADIO_CENTROIDE = 2 # Píxeles a cada lado del máximo para el método 'centroide'
+METODOS_REFINAMIENTO = ("parabolico", "gaussiano", "centroide")
+
+TOLERANCIA_NM = 3.0 # Distancia máxima para asociar un pico a una pista existente
+MAX_PERDIDAS = 10 # Tramas seguidas sin ver el pico antes de cerrar la pista
+MAX_CERRADAS = 256 # Pistas cerradas que se conservan (las más recientes): memoria acotada en sesiones largas
+
+
+def refinar_subpixel(tramas, indices, metodo="parabolico"):
+    """Desplazamiento sub-píxel (en [-0.5, 0.5]) de los máximos 'indices' (N, K) de 'tramas' (N, P)."""
+    x = np.asarray(tramas, dtype=np.float64)
+    filas = np.arange(len(x))[:, None]
+    indices = np.clip(indices, 1, x.shape[1] - 2)
+
+    if metodo == "centroide":
+        desplazamientos = np.arange(-RADIO_CENTROIDE, RADIO_CENTROIDE + 1)
+        columnas = np.clip(indices[..., None] + desplazamientos, 0, x.shape[1] - 1)
+        ventana = x[filas[..., None], columnas]
+        pesos = ventana - ventana.min(axis=-1, keepdims=True)
+        total = pesos.sum(axis=-1)
+        delta = np.divide((pesos * desplazamientos).sum(axis=-1), total, out=np.zeros_like(total),
+                          where=total > 0)
+    elif metodo in ("parabolico", "gaussiano"):
+        a, b, c = x[filas, indices - 1], x[filas, indices], x[filas, indices + 1]
+        if metodo == "gaussiano":
+            # Parábola sobre el logaritmo: exacta para picos gaussianos
+            a, b, c = np.log(np.maximum(a, 1.0)), np.log(np.maximum(b, 1.0)), np.log(np.maximum(c, 1.0))
+        den = a - 2 * b + c
+        delta = np.divide(0.5 * (a - c), den, out=np.zeros_like(den), where=den < 0)
+    else:
+        raise ValueError(f"Método de refinamiento desconocido: '{metodo}' (usar uno de {METODOS_REFINAMIENTO})")
+    return np.clip(delta, -0.5, 0.5)
+
+
+def _posicion_a_nm(posicion, longitud_onda):
+    """Interpola el eje (lineal o polinomio de calibración) en posiciones fraccionarias."""
+    return np.interp(posicion, np.arange(len(longitud_onda)), longitud_onda)
+
+
+def pico_principal(tramas, longitud_onda=LONGITUD_ONDA, metodo="parabolico"):
+    """Máximo global refinado de una trama (288,) o de cada trama de un lote (N, 288).
+
+    Devuelve (idx, nm, intensidad): píxel del máximo, longitud de onda sub-píxel
+    e intensidad en ese píxel.
+    """
+    x = np.asarray(tramas)
+    una = x.ndim == 1
+    x = x.reshape(-1, x.shape[-1])
+    idx = np.argmax(x, axis=1)
+    posicion = idx + refinar_subpixel(x, idx[:, None], metodo)[:, 0]
+    nm = _posicion_a_nm(posicion, longitud_onda)
+    intensidad = x[np.arange(len(x)), idx]
+    if una:
+        return int(idx[0]), float(nm[0]), intensidad[0]
+    return idx, nm, intensidad
+
+
+def _base(lado, alturas):
+    """Mínimo entre el pico y el punto más alto que él más cercano (o el borde) de un lado.
+
+    'lado' (M, V) tiene el píxel vecino al pico en la última columna.
+    """
+    mayor = lado > alturas[:, None]
+    bloqueado = np.flip(np.logical_or.accumulate(np.flip(mayor, axis=1), axis=1), axis=1)
+    return np.where(bloqueado, np.inf, lado).min(axis=1)
+
+
+def detectar_picos(tramas, longitud_onda=LONGITUD_ONDA, prominencia_min=PROMINENCIA_MIN, altura_min=0.0,
+                   max_picos=MAX_PICOS, ventana=VENTANA_PROMINENCIA, metodo="parabolico"):
+    """Busca hasta 'max_picos' picos por trama en un lote (N, 288) o una trama (288,).
+
+    Devuelve un dict de arrays (N, K) (o (K,) para una trama), ordenados de
+    mayor a menor prominencia: 'indice' (píxel), 'posicion' (píxel sub-píxel),
+    'nm', 'altura', 'prominencia' y 'valido'. Los huecos (menos picos que K)
+    tienen valido=False y NaN en 'posicion' y 'nm'.
+    """
+    x = np.asarray(tramas, dtype=np.float64)
+    una = x.ndim == 1
+    x = x.reshape(-1, x.shape[-1])
+    num, num_pixeles = x.shape
+
+    # Máximos locales (en una meseta cuenta el primer píxel)
+    centro = x[:, 1:-1]
+    filas, columnas = np.nonzero((centro > x[:, :-2]) & (centro >= x[:, 2:]))
+    columnas += 1
+    alturas = x[filas, columnas]
+
+    # Prominencia: altura sobre la más alta de las dos bases, buscadas hasta
+    # 'ventana' píxeles o hasta un punto más alto que el pico
+    relleno = np.pad(x, ((0, 0), (ventana, ventana)), constant_values=np.inf)
+    vistas = sliding_window_view(relleno, ventana, axis=1)
+    izquierda = vistas[filas, columnas]
+    derecha = vistas[filas, columnas + ventana + 1][:, ::-1]
+    prominencias = alturas - np.maximum(_base(izquierda, alturas), _base(derecha, alturas))
+
+    aceptados = (prominencias >= prominencia_min) & (alturas >= altura_min)
+    mapa = np.full((num, num_pixeles), -np.inf)
+    mapa[filas[aceptados], columnas[aceptados]] = prominencias[aceptados]
+
+    # Los K más prominentes de cada trama
+    k = min(max_picos, num_pixeles)
+    indices = np.argpartition(-mapa, k - 1, axis=1)[:, :k]
+    fila = np.arange(num)[:, None]
+    orden = np.argsort(-mapa[fila, indices], axis=1, kind="stable")
+    indices = indices[fila, orden]
+    prominencia = mapa[fila, indices]
+    valido = np.isfinite(prominencia)
+
+    posicion = indices + refinar_subpixel(x, indices, metodo)
+    posicion[~valido] = np.nan
+    picos = {
+        "indice": indices,
+        "posicion": posicion,
+        "nm": _posicion_a_nm(posicion, longitud_onda),
+        "altura": np.where(valido, x[fila, indices], np.nan),
+        "prominencia": np.where(valido, prominencia, np.nan),
+        "valido": valido,
+    }
+    if una:
+        return {clave: valor[0] for clave, valor in picos.items()}
+    return picos
+
+
+# --- SEGUIMIENTO DE PICOS EN EL TIEMPO ---
+
+class Pista:
+    """Un pico seguido de trama en trama: posición actual y media/desviación de su deriva en nm."""
+
+    def __init__(self, id_pista, nm, altura, tiempo):
+        self.id = id_pista
+        self.nm = nm
+        self.altura = altura
+        self.n = 1
+        self.media_nm = nm
+        self._m2_nm = 0.0
+        self.perdidas = 0
+        self.inicio = tiempo
+        self.ultimo = tiempo
+
+    def agregar(self, nm, altura, tiempo):
+        self.nm = nm
+        self.altura = altura
+        self.n += 1
+        delta = nm - self.media_nm
+        self.media_nm += delta / self.n
+        self._m2_nm += delta * (nm - self.media_nm)
+        self.perdidas = 0
+        self.ultimo = tiempo
+
+    @property
+    def std_nm(self):
+        return (self._m2_nm / self.n) ** 0.5
+
+
+class SeguidorPicos:
+    """Asocia los picos detectados en cada trama con pistas estables por cercanía en nm.
+
+    Seguro entre hilos: actualizar_lote() puede llamarse desde el hilo lector
+    mientras la interfaz consulta las pistas activas.
+    """
+
+    def __init__(self, tolerancia_nm=TOLERANCIA_NM, max_perdidas=MAX_PERDIDAS, max_cerradas=MAX_CERRADAS):
+        self.tolerancia_nm = tolerancia_nm
+        self.max_perdidas = max_perdidas
+        self.pistas = {} # id -> Pista activa
+        self.cerradas = collections.deque(maxlen=max_cerradas)
+        self.tramas = 0
+        self._siguiente_id = 0
+        self._lock = threading.Lock()
+
+    def _actualizar(self, nm, altura, tiempo):
+        """Una trama: nm y altura (K,) con NaN en los huecos."""
+        validos = ~np.isnan(nm)
+        nm, altura = nm[validos], altura[validos]
+        ids = list(self.pistas)
+        usados_pista, usados_pico = set(), set()
+
+        if ids and nm.size:
+            # Asociación voraz por distancia creciente (K y pistas son pocos)
+            actuales = np.array([self.pistas[i].nm for i in ids])
+            distancias = np.abs(actuales[:, None] - nm[None, :])
+            for plano in np.argsort(distancias, axis=None):
+                p, d = divmod(int(plano), nm.size)
+                if distancias[p, d] > self.tolerancia_nm:
+                    break
+                if p in usados_pista or d in usados_pico:
+                    continue
+                self.pistas[ids[p]].agregar(float(nm[d]), float(altura[d]), tiempo)
+                usados_pista.add(p)
+                usados_pico.add(d)
+
+        for p, id_pista in enumerate(ids):
+            if p not in usados_pista:
+                pista = self.pistas[id_pista]
+                pista.perdidas += 1
+                if pista.perdidas > self.max_perdidas:
+                    self.cerradas.append(self.pistas.pop(id_pista))
+        for d in range(nm.size):
+            if d not in usados_pico:
+                self.pistas[self._siguiente_id] = Pista(self._siguiente_id, float(nm[d]), float(altura[d]), tiempo)
+                self._siguiente_id += 1
+        self.tramas += 1
+
+    def actualizar_lote(self, picos, tiempos=None):
+        """Incorpora el resultado de detectar_picos para un lote (o una trama), en orden."""
+        nm = np.atleast_2d(picos["nm"])
+        altura = np.atleast_2d(picos["altura"])
+        if tiempos is None:
+            tiempos = np.full(len(nm), np.nan)
+        tiempos = np.broadcast_to(np.asarray(tiempos, dtype=float), (len(nm),))
+        with self._lock:
+            for i in range(len(nm)):
+                self._actualizar(nm[i], altura[i], float(tiempos[i]))
+
+    def activas(self, min_tramas=1):
+        """Pistas activas vistas en al menos 'min_tramas' tramas, ordenadas por longitud de onda."""
+        with self._lock:
+            return sorted((p for p in self.pistas.values() if p.n >= min_tramas), key=lambda p: p.nm)
+
+
+def imprimir_pistas(pistas):
+    """Tabla de picos seguidos: posición media, deriva (std) y número de tramas."""
+    print("\n--- PICOS SEGUIDOS ---")
+    if not pistas:
+        print("Sin picos por encima de la prominencia mínima.")
+        return
+    for pista in pistas:
+        print(f"Pico #{pista.id}: {pista.media_nm:.2f} nm ± {pista.std_nm:.3f} nm | "
+              f"Intensidad: {pista.altura:.0f} ADC | Tramas: {pista.n}")
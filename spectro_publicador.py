@@ -0,0 +1,177 @@
+import queue
+import socket
+import threading
+import time
+
+from spectro_serial import codificar_binario
+
+# --- PUBLICACIÓN DE TRAMAS EN LA RED LOCAL ---
+#
+# Sólo un proceso puede abrir el puerto COM. El servicio de captura
+# (espectrometro_servicio.py) lo abre y reenvía cada lote decodificado a todos
+# los clientes TCP conectados, con el mismo formato binario del firmware
+# (cabecera, contador, 288 uint16, checksum): un cliente lee el socket igual
+# que un puerto serie en modo binario, y el contador le indica las tramas que
+# se perdió. Cada cliente tiene su propia cola acotada y su hilo de envío: un
+# cliente lento pierde sus tramas más antiguas, pero nunca frena la adquisición.
+
+HOST_RED = "127.0.0.1"
+PUERTO_RED = 5760
+MAX_LOTES_COLA = 64 # Lotes pendientes por cliente antes de descartar los más antiguos
+
+
+class _Cliente(threading.Thread):
+    """Conexión de un suscriptor: cola acotada de lotes codificados y su hilo de envío."""
+
+    def __init__(self, conexion, direccion, max_lotes, al_terminar):
+        super().__init__(name=f"cliente_{direccion[0]}:{direccion[1]}", daemon=True)
+        self.conexion = conexion
+        self.direccion = direccion
+        self.descartadas = 0 # Tramas que este cliente no alcanzó a recibir
+        self._cola = queue.Queue(max_lotes)
+        self._al_terminar = al_terminar
+
+    def encolar(self, datos, num_tramas):
+        """Agrega un lote sin bloquear; si la cola está llena se descarta el más antiguo."""
+        while True:
+            try:
+                self._cola.put_nowait((datos, num_tramas))
+                return
+            except queue.Full:
+                try:
+                    self.descartadas += self._cola.get_nowait()[1]
+                except queue.Empty:
+                    pass
+
+    def run(self):
+        try:
+            while True:
+                datos, _ = self._cola.get()
+                if datos is None:
+                    break
+                self.conexion.sendall(datos)
+        except OSError:
+            pass # Cliente desconectado
+        finally:
+            self.conexion.close()
+            self._al_terminar(self)
+
+    def cerrar(self):
+        """Termina el hilo de envío después de los lotes ya encolados."""
+        self.encolar(None, 0)
+
+
+class ServidorTramas:
+    """Acepta suscriptores TCP y les reenvía los lotes que recibe publicar()."""
+
+    def __init__(self, host=HOST_RED, puerto=PUERTO_RED, max_lotes_cola=MAX_LOTES_COLA):
+        self.max_lotes_cola = max_lotes_cola
+        self.publicadas = 0
+        self._clientes = set()
+        self._lock = threading.Lock()
+        self._socket = socket.create_server((host, puerto))
+        self.direccion = self._socket.getsockname()
+        self._hilo = threading.Thread(target=self._aceptar, name="servidor_tramas", daemon=True)
+        self._hilo.start()
+
+    def _aceptar(self):
+        while True:
+            try:
+                conexion, direccion = self._socket.accept()
+            except OSError:
+                return # Servidor cerrado
+            conexion.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            cliente = _Cliente(conexion, direccion, self.max_lotes_cola, self._quitar)
+            with self._lock:
+                self._clientes.add(cliente)
+            cliente.start()
+            print(f"Cliente conectado: {direccion[0]}:{direccion[1]}")
+
+    def _quitar(self, cliente):
+        with self._lock:
+            self._clientes.discard(cliente)
+        print(f"Cliente desconectado: {cliente.direccion[0]}:{cliente.direccion[1]} "
+              f"(tramas descartadas: {cliente.descartadas})")
+
+    @property
+    def clientes(self):
+        with self._lock:
+            return list(self._clientes)
+
+    def publicar(self, tramas):
+        """Consumidor para HiloAdquisicion: codifica el lote una vez y lo encola para cada cliente."""
+        clientes = self.clientes
+        if clientes and len(tramas):
+            datos = codificar_binario(tramas, self.publicadas)
+            for cliente in clientes:
+                cliente.encolar(datos, len(tramas))
+        self.publicadas += len(tramas)
+
+    def cerrar(self):
+        self._socket.close()
+        for cliente in self.clientes:
+            cliente.cerrar()
+            cliente.join(1.0)
+
+
+class PuertoRed:
+    """Suscriptor con la interfaz de serial.Serial que usan los scripts (in_waiting, read, ...).
+
+    Siempre recibe tramas binarias: crear_decodificador() usa protocolo_fijo en
+    lugar del protocolo configurado, y los comandos al firmware se ignoran (el
+    modo lo elige el servicio de captura).
+    """
+
+    protocolo_fijo = "binario"
+
+    def __init__(self, host=HOST_RED, puerto=PUERTO_RED, timeout=1.0):
+        self.port = f"tcp://{host}:{puerto}"
+        self.timeout = timeout
+        self.is_open = True
+        self._buffer = bytearray()
+        self._socket = socket.create_connection((host, puerto), timeout=5)
+
+    def _recibir(self, espera):
+        """Recibe lo que llegue en 'espera' segundos (0: sólo lo ya disponible)."""
+        if not self.is_open:
+            return
+        self._socket.settimeout(max(espera, 0.0)) # 0: no bloqueante
+        try:
+            while True:
+                datos = self._socket.recv(1 << 16)
+                if not datos:
+                    self.is_open = False # El servicio se cerró
+                    return
+                self._buffer += datos
+                self._socket.settimeout(0.0) # Drena el resto sin esperar
+        except (BlockingIOError, socket.timeout):
+            pass
+        except OSError:
+            self.is_open = False
+
+    @property
+    def in_waiting(self):
+        self._recibir(0)
+        return len(self._buffer)
+
+    def read(self, size=1):
+        limite = None if self.timeout is None else time.perf_counter() + self.timeout
+        while len(self._buffer) < size and self.is_open:
+            espera = 3600.0 if limite is None else limite - time.perf_counter()
+            if espera <= 0:
+                break
+            self._recibir(espera)
+        datos = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return datos
+
+    def write(self, datos):
+        return len(datos)
+
+    def reset_input_buffer(self):
+        self._recibir(0)
+        self._buffer.clear()
+
+    def close(self):
+        self.is_open = False
+        self._socket.close()
@@ -0,0 +1,100 @@
+import time
+
+import numpy as np
+from matplotlib.collections import LineCollection
+
+from spectro_picos import pico_principal
+
+# --- RENDERIZADO EN TIEMPO REAL CON BLITTING ---
+#
+# El fondo (ejes, rejilla, etiquetas, título) se dibuja una sola vez y se
+# guarda como imagen. En cada cuadro sólo se restaura ese fondo y se vuelven a
+# dibujar la línea del espectro y la anotación del peak.
+
+
+class RenderizadorEspectro:
+    """Dibuja el espectro actualizando en su lugar las coordenadas Y de un único array de segmentos."""
+
+    def __init__(self, ax, x, colores, fps_objetivo=30, linewidth=2):
+        self.ax = ax
+        self.fig = ax.figure
+        self.canvas = self.fig.canvas
+        self.x = np.asarray(x, dtype=float)
+        self.colores = colores
+        self.periodo = 1.0 / fps_objetivo
+
+        # Segmentos (287, 2, 2): [i, 0] = punto i, [i, 1] = punto i+1
+        self._segmentos = np.zeros((len(self.x) - 1, 2, 2))
+        self._segmentos[:, 0, 0] = self.x[:-1]
+        self._segmentos[:, 1, 0] = self.x[1:]
+
+        self.linea = LineCollection(self._segmentos, colors=colores, linewidth=linewidth, animated=True)
+        ax.add_collection(self.linea)
+
+        # Si los Path de la colección comparten memoria con _segmentos basta con
+        # modificar el array; si no (otra versión de Matplotlib), se usa set_segments.
+        self._en_sitio = np.shares_memory(self.linea.get_paths()[0].vertices, self._segmentos)
+
+        self.anotacion = ax.text(0.99, 0.97, "", transform=ax.transAxes, ha='right', va='top',
+                                 fontsize=14, fontweight='bold', animated=True)
+
+        self._fondo = None
+        self._proximo = 0.0
+        self.cuadros = 0
+        self._t_inicio = None
+        self.canvas.mpl_connect('draw_event', self._capturar_fondo)
+
+    def _capturar_fondo(self, event):
+        """Guarda el fondo estático tras cada redibujado completo (inicio, cambio de tamaño)."""
+        if self.canvas.supports_blit:
+            self._fondo = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._dibujar_artistas()
+
+    def _dibujar_artistas(self):
+        self.ax.draw_artist(self.linea)
+        self.ax.draw_artist(self.anotacion)
+
+    def actualizar(self, y, sufijo=""):
+        """Actualiza la línea y la anotación del peak con un espectro de 288 valores.
+
+        'sufijo' se agrega a la anotación (p. ej. la fuente identificada).
+        """
+        self._segmentos[:, 0, 1] = y[:-1]
+        self._segmentos[:, 1, 1] = y[1:]
+        if self._en_sitio:
+            self.linea.stale = True
+        else:
+            self.linea.set_segments(self._segmentos)
+
+        # Peak con refinamiento sub-píxel (parábola sobre el máximo y sus vecinos)
+        idx_peak, peak_nm, peak_intensidad = pico_principal(y, self.x)
+        self.anotacion.set_text(f'Peak: {peak_nm:.2f} nm | Intensidad: {int(peak_intensidad)}{sufijo}')
+        self.anotacion.set_color(self.colores[idx_peak])
+
+        if self._fondo is None:
+            # Primer cuadro (o backend sin blitting): dibujo completo
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self._fondo)
+            self._dibujar_artistas()
+            self.canvas.blit(self.fig.bbox)
+
+        self.cuadros += 1
+        if self._t_inicio is None:
+            self._t_inicio = time.perf_counter()
+
+    def esperar(self):
+        """Procesa eventos de la ventana y espera hasta el próximo cuadro según el FPS objetivo."""
+        self.canvas.flush_events()
+        ahora = time.perf_counter()
+        if self._proximo > ahora:
+            time.sleep(self._proximo - ahora)
+            self._proximo += self.periodo
+        else:
+            self._proximo = ahora + self.periodo
+
+    @property
+    def fps_medido(self):
+        if self._t_inicio is None or self.cuadros < 2:
+            return 0.0
+        return (self.cuadros - 1) / max(time.perf_counter() - self._t_inicio, 1e-9)
@@ -0,0 +1,455 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from spectro_core import NUM_PIXELES
+from spectro_instrumentacion import Instrumentacion
+
+# --- DECODIFICADOR DE TRAMAS SERIALES (PROTOCOLO DE TEXTO) ---
+#
+# El Arduino (printData) envía cada espectro como una línea ASCII:
+#     v0,v1,v2,...,v287,\n
+# Este módulo drena todo lo disponible en el puerto con una sola lectura,
+# separa las líneas completas en un buffer reutilizable y convierte todas las
+# tramas de una vez con NumPy, sin listas intermedias de Python.
+
+MAX_DIGITOS = 5 # uint16 no supera 65535
+MAX_BUFFER_PENDIENTE = 64 * 1024 # Bytes sin salto de línea antes de descartar basura
+
+_CARACTERES_VALIDOS = b"0123456789,"
+_COMA = ord(",")
+_CERO = ord("0")
+_POTENCIAS_10 = 10 ** np.arange(MAX_DIGITOS, dtype=np.uint32)
+
+
+def _parsear_bloque(bloque, num_tramas, salida):
+    """Convierte un bloque de tramas 'v,v,...,v,' concatenadas en enteros.
+
+    Escribe los valores en salida[:num_tramas] y devuelve una máscara con las
+    tramas válidas (tramas con algún número de más de MAX_DIGITOS se rechazan).
+    """
+    arr = np.frombuffer(bloque, dtype=np.uint8)
+    es_coma = arr == _COMA
+    pos_comas = np.flatnonzero(es_coma)
+
+    # Inicio y largo de cada número (todos terminan en coma)
+    inicios = np.empty_like(pos_comas)
+    inicios[0] = 0
+    inicios[1:] = pos_comas[:-1] + 1
+    largos = pos_comas - inicios
+
+    # Exponente de cada dígito = distancia a la coma que cierra su número
+    indice_numero = np.cumsum(es_coma) - es_coma
+    exponente = pos_comas[indice_numero] - np.arange(arr.size) - 1
+    exponente[es_coma] = 0
+    np.minimum(exponente, MAX_DIGITOS - 1, out=exponente)
+
+    digitos = arr.astype(np.uint32)
+    digitos -= _CERO
+    digitos[es_coma] = 0
+    digitos *= _POTENCIAS_10[exponente]
+
+    valores = np.add.reduceat(digitos, inicios).reshape(num_tramas, NUM_PIXELES)
+    validas = ~np.any(largos.reshape(num_tramas, NUM_PIXELES) > MAX_DIGITOS, axis=1)
+
+    salida[:num_tramas] = valores
+    return validas
+
+
+class DecodificadorTramas:
+    """Decodifica tramas de texto del C12880MA en lotes (N, 288) uint16.
+
+    Las líneas incompletas se conservan para la siguiente lectura. El array
+    devuelto por alimentar()/leer() es una vista del buffer interno y se
+    sobrescribe en la llamada siguiente: copiarlo si se necesita conservarlo.
+    """
+
+    def __init__(self, capacidad_tramas=64):
+        self._pendiente = bytearray()
+        self._tramas = np.empty((capacidad_tramas, NUM_PIXELES), dtype=np.uint16)
+        self.tramas_validas = 0
+        self.lineas_invalidas = 0
+
+    def _asegurar_capacidad(self, num_tramas):
+        if num_tramas > self._tramas.shape[0]:
+            nueva = max(num_tramas, 2 * self._tramas.shape[0])
+            self._tramas = np.empty((nueva, NUM_PIXELES), dtype=np.uint16)
+
+    def alimentar(self, datos):
+        """Agrega bytes recibidos y devuelve las tramas completas decodificadas."""
+        self._pendiente += datos
+
+        fin = self._pendiente.rfind(b"\n")
+        if fin < 0:
+            if len(self._pendiente) > MAX_BUFFER_PENDIENTE:
+                self._pendiente.clear()
+                self.lineas_invalidas += 1
+            return self._tramas[:0]
+
+        lineas = bytes(self._pendiente[:fin]).split(b"\n")
+        del self._pendiente[:fin + 1]
+
+        # Validación por línea (operaciones en C, no por número)
+        lineas_ok = []
+        for linea in lineas:
+            linea = linea.strip(b"\r \t")
+            if not linea:
+                continue
+            if not linea.endswith(b","):
+                linea += b","
+            if (linea.count(b",") != NUM_PIXELES or linea.startswith(b",")
+                    or b",," in linea or linea.translate(None, _CARACTERES_VALIDOS)):
+                self.lineas_invalidas += 1
+                continue
+            lineas_ok.append(linea)
+
+        if not lineas_ok:
+            return self._tramas[:0]
+
+        num = len(lineas_ok)
+        self._asegurar_capacidad(num)
+        validas = _parsear_bloque(b"".join(lineas_ok), num, self._tramas)
+
+        if not validas.all():
+            self.lineas_invalidas += int(num - validas.sum())
+            num = int(validas.sum())
+            self._tramas[:num] = self._tramas[:validas.size][validas]
+
+        self.tramas_validas += num
+        return self._tramas[:num]
+
+    def leer(self, ser):
+        """Drena todo lo disponible en el puerto con una sola lectura."""
+        disponibles = ser.in_waiting
+        if disponibles <= 0:
+            return self._tramas[:0]
+        return self.alimentar(ser.read(disponibles))
+
+
+# --- DECODIFICADOR DE TRAMAS BINARIAS ---
+#
+# Modo binario del firmware (comando 'b'), 582 bytes por trama:
+#     0xA5 0x5A | contador uint16 | 288 muestras uint16 | checksum uint16
+# todo little-endian; checksum = suma de 16 bits del contador y las muestras.
+# Las tramas contiguas se validan y copian de una vez con np.frombuffer; sólo
+# ante un error se busca la siguiente cabecera. Los saltos del contador
+# cuentan las tramas perdidas.
+
+SYNC = b"\xa5\x5a"
+BYTES_TRAMA_BINARIA = 2 + 2 + 2 * NUM_PIXELES + 2
+COMANDO_BINARIO = b"b"
+COMANDO_TEXTO = b"t"
+PROTOCOLOS = ("texto", "binario")
+
+_U16 = np.dtype("<u2")
+
+
+def codificar_binario(tramas, contador_inicial=0):
+    """Tramas (N, 288) en el formato binario del firmware (bytes); útil para el simulador."""
+    tramas = np.atleast_2d(tramas)
+    num = len(tramas)
+    palabras = np.empty((num, BYTES_TRAMA_BINARIA // 2), dtype=_U16)
+    palabras[:, 0] = 0x5AA5 # SYNC leído como uint16 little-endian
+    palabras[:, 1] = (contador_inicial + np.arange(num)) & 0xFFFF
+    palabras[:, 2:-1] = tramas
+    palabras[:, -1] = palabras[:, 1:-1].sum(axis=1, dtype=np.uint32) & 0xFFFF
+    return palabras.tobytes()
+
+
+class DecodificadorBinario:
+    """Decodifica tramas binarias en lotes (N, 288) uint16, con la misma interfaz que DecodificadorTramas.
+
+    tramas_invalidas cuenta tramas con cabecera o checksum incorrectos (y
+    basura descartada al resincronizar); tramas_perdidas, los saltos del
+    contador del firmware. secuencias tiene el número de cada trama del último
+    lote según el contador del firmware, sin la vuelta de uint16 y contando
+    las perdidas (0 = primera trama recibida).
+    """
+
+    def __init__(self, capacidad_tramas=64):
+        self._pendiente = bytearray()
+        self._tramas = np.empty((capacidad_tramas, NUM_PIXELES), dtype=np.uint16)
+        self._secuencias = np.empty(capacidad_tramas, dtype=np.int64)
+        self.secuencias = self._secuencias[:0]
+        self._secuencia = -1
+        self._ultimo_contador = None
+        # Buscando cabecera tras una trama corrupta: la basura hasta la siguiente ya está contada,
+        # aunque llegue en varias lecturas
+        self._resincronizando = False
+        self.tramas_validas = 0
+        self.tramas_invalidas = 0
+        self.tramas_perdidas = 0
+
+    def _asegurar_capacidad(self, num_tramas):
+        if num_tramas > self._tramas.shape[0]:
+            nueva = max(num_tramas, 2 * self._tramas.shape[0])
+            self._tramas = np.empty((nueva, NUM_PIXELES), dtype=np.uint16)
+            self._secuencias = np.empty(nueva, dtype=np.int64)
+
+    def _validas_contiguas(self, arr, inicio):
+        """Tramas válidas consecutivas desde 'inicio': (contadores, muestras) como vistas."""
+        num = (arr.size - inicio) // BYTES_TRAMA_BINARIA
+        bloque = arr[inicio:inicio + num * BYTES_TRAMA_BINARIA].reshape(num, BYTES_TRAMA_BINARIA)
+        palabras = bloque.view(_U16)
+        ok = (palabras[:, 0] == 0x5AA5) & (
+            (palabras[:, 1:-1].sum(axis=1, dtype=np.uint32) & 0xFFFF) == palabras[:, -1])
+        malas = np.flatnonzero(~ok)
+        num_ok = int(malas[0]) if malas.size else num
+        return palabras[:num_ok, 1], palabras[:num_ok, 2:-1], num_ok < num
+
+    def alimentar(self, datos):
+        """Agrega bytes recibidos y devuelve las tramas completas decodificadas."""
+        self._pendiente += datos
+        bloque = bytes(self._pendiente)
+        arr = np.frombuffer(bloque, dtype=np.uint8)
+        contadores, lotes = [], []
+        pos = 0
+        while True:
+            inicio = bloque.find(SYNC, pos)
+            if inicio < 0:
+                # Se conserva un posible primer byte de cabecera al final; la basura que se
+                # descarta ahora se cuenta ya, y su continuación en la próxima lectura no
+                fin = max(pos, len(bloque) - 1)
+                if fin > pos and not self._resincronizando:
+                    self.tramas_invalidas += 1
+                    self._resincronizando = True
+                pos = fin
+                break
+            if inicio > pos and not self._resincronizando:
+                self.tramas_invalidas += 1 # Basura o texto antes de la cabecera
+            if len(bloque) - inicio < BYTES_TRAMA_BINARIA:
+                pos = inicio
+                break
+            contador, muestras, error = self._validas_contiguas(arr, inicio)
+            if len(contador):
+                contadores.append(contador)
+                lotes.append(muestras)
+            pos = inicio + len(contador) * BYTES_TRAMA_BINARIA
+            self._resincronizando = error
+            if error:
+                # Trama corrupta (o cabecera falsa): se busca la siguiente desde el byte siguiente
+                self.tramas_invalidas += 1
+                pos += 1
+
+        num = sum(len(c) for c in contadores)
+        if num:
+            self._asegurar_capacidad(num)
+            np.concatenate(lotes, out=self._tramas[:num])
+            contador = np.concatenate(contadores).astype(np.int64)
+            primera = self._ultimo_contador is None
+            if not primera:
+                contador = np.concatenate([[self._ultimo_contador], contador])
+            saltos = (np.diff(contador) - 1) % 0x10000
+            saltos[saltos >= 0x8000] = 0 # Contador reiniciado (reset de la placa), no pérdidas
+            self.tramas_perdidas += int(saltos.sum())
+            pasos = saltos + 1
+            if primera:
+                pasos = np.concatenate([[1], pasos])
+            np.cumsum(pasos, out=self._secuencias[:num])
+            self._secuencias[:num] += self._secuencia
+            self._secuencia = int(self._secuencias[num - 1])
+            self._ultimo_contador = int(contador[-1])
+            self.tramas_validas += num
+
+        del self._pendiente[:pos]
+        if len(self._pendiente) > MAX_BUFFER_PENDIENTE:
+            self._pendiente.clear()
+            self.tramas_invalidas += 1
+        self.secuencias = self._secuencias[:num]
+        return self._tramas[:num]
+
+    def leer(self, ser):
+        """Drena todo lo disponible en el puerto con una sola lectura."""
+        disponibles = ser.in_waiting
+        if disponibles <= 0:
+            return self._tramas[:0]
+        return self.alimentar(ser.read(disponibles))
+
+
+def crear_decodificador(protocolo="texto", ser=None):
+    """Decodificador para 'texto' o 'binario'; con 'ser' también cambia el modo del firmware.
+
+    Los puertos que sólo entregan un protocolo (p. ej. el suscriptor de red) lo
+    indican con el atributo protocolo_fijo, que tiene prioridad.
+    """
+    protocolo = getattr(ser, "protocolo_fijo", None) or protocolo
+    if protocolo not in PROTOCOLOS:
+        raise ValueError(f"Protocolo desconocido: '{protocolo}' (usar uno de {PROTOCOLOS})")
+    if ser is not None:
+        ser.write(COMANDO_BINARIO if protocolo == "binario" else COMANDO_TEXTO)
+        ser.reset_input_buffer() # Lo que quedó del modo anterior
+    return DecodificadorBinario() if protocolo == "binario" else DecodificadorTramas()
+
+
+# --- APERTURA DEL PUERTO ---
+
+BAUDIOS = 115200
+PUERTO_POR_DEFECTO = "COM10" # PC=Laptop ('COM3' en la torre)
+VARIABLE_PUERTO = "ESPECTROMETRO_PUERTO"
+
+
+def abrir_puerto(puerto=None, baudios=BAUDIOS, timeout=1):
+    """Abre el puerto del Arduino. La variable de entorno ESPECTROMETRO_PUERTO lo cambia sin editar
+    los scripts: 'COM3', '/dev/ttyACM0', la pseudo-terminal de spectro_simulador.py, 'sim' /
+    'sim:<carpeta>' para el simulador en proceso (tramas sintéticas o repetidas de una carpeta), o
+    'tcp://host:puerto' para suscribirse al servicio de captura (espectrometro_servicio.py).
+    """
+    puerto = puerto or os.environ.get(VARIABLE_PUERTO, PUERTO_POR_DEFECTO)
+    if puerto.startswith("tcp://"):
+        from spectro_publicador import PuertoRed
+
+        host, _, numero = puerto[6:].rpartition(":")
+        return PuertoRed(host or "127.0.0.1", int(numero), timeout=timeout)
+    if puerto == "sim" or puerto.startswith("sim:"):
+        from spectro_simulador import PuertoSimulado, tramas_de_carpeta
+
+        carpeta = puerto[4:]
+        return PuertoSimulado(tramas_de_carpeta(carpeta) if carpeta else None, baudios=baudios, timeout=timeout)
+
+    import serial
+
+    return serial.Serial(puerto, baudios, timeout=timeout)
+
+
+ESPERA_PLACA_MAX = 5.0 # Segundos: abrir el puerto reinicia el Arduino y el bootloader tarda ~1.5-2 s
+
+
+def esperar_placa(ser, timeout=ESPERA_PLACA_MAX, intervalo=0.005):
+    """Espera a que el firmware empiece a enviar tramas, en vez de un time.sleep(2) fijo.
+
+    Los comandos escritos mientras corre el bootloader se pierden, así que hay
+    que llamarla antes de crear_decodificador(). Devuelve True apenas llega el
+    primer byte (el simulador y el servicio de red, casi de inmediato) y False
+    si se agota el timeout.
+    """
+    limite = time.perf_counter() + timeout
+    while ser.in_waiting <= 0:
+        if time.perf_counter() >= limite:
+            return False
+        time.sleep(intervalo)
+    return True
+
+
+# --- ADQUISICIÓN EN SEGUNDO PLANO ---
+
+_SIN_INSTRUMENTACION = Instrumentacion(activa=False)
+
+
+class FuenteSerial:
+    """Fuente de tramas que bloquea en el puerto hasta que llegan datos.
+
+    Con instrumentación mide la lectura (incluye la espera de datos), la
+    decodificación y los bytes que había en el buffer del puerto.
+    """
+
+    def __init__(self, ser, decodificador=None, instrumentacion=None):
+        self.ser = ser
+        self.decodificador = decodificador or DecodificadorTramas()
+        self.instrumentacion = instrumentacion or _SIN_INSTRUMENTACION
+
+    def leer_tramas(self):
+        inst = self.instrumentacion
+        t = inst.reloj()
+        disponibles = self.ser.in_waiting
+        # read() bloquea hasta el timeout del puerto si no hay nada (sin sondeo activo)
+        datos = self.ser.read(max(1, disponibles))
+        t = inst.medir("lectura_serial", t)
+        tramas = self.decodificador.alimentar(datos)
+        inst.medir("decodificacion", t)
+        inst.nivel("buffer_serial_bytes", disponibles)
+        return tramas
+
+
+class BufferCircular:
+    """Buffer circular de tamaño fijo (capacidad, 288) compartido entre hilos."""
+
+    def __init__(self, capacidad=256):
+        self.capacidad = capacidad
+        self._datos = np.zeros((capacidad, NUM_PIXELES), dtype=np.uint16)
+        self._escritas = 0 # Número total de tramas agregadas (secuencia)
+        self._lock = threading.Lock()
+
+    @property
+    def escritas(self):
+        return self._escritas
+
+    def agregar(self, tramas):
+        """Copia un lote (N, 288) al buffer, sobrescribiendo las más antiguas."""
+        num = len(tramas)
+        if num == 0:
+            return
+        with self._lock:
+            if num > self.capacidad:
+                self._escritas += num - self.capacidad
+                tramas = tramas[-self.capacidad:]
+                num = self.capacidad
+            inicio = self._escritas % self.capacidad
+            primera = min(num, self.capacidad - inicio)
+            self._datos[inicio:inicio + primera] = tramas[:primera]
+            self._datos[:num - primera] = tramas[primera:]
+            self._escritas += num
+
+    def ultima(self, salida):
+        """Copia la trama más reciente en 'salida' y devuelve su número de secuencia."""
+        with self._lock:
+            if self._escritas:
+                salida[:] = self._datos[(self._escritas - 1) % self.capacidad]
+            return self._escritas
+
+
+class HiloAdquisicion(threading.Thread):
+    """Hilo lector: decodifica tramas de la fuente y las empuja al buffer circular.
+
+    Cada consumidor es una función f(tramas) que se llama en este hilo con el
+    lote recién decodificado (vista temporal: copiar si se necesita conservarlo).
+    Los errores de lectura y de los consumidores se cuentan (errores,
+    errores_consumidores, ultimo_error) sin detener la adquisición; el primero
+    de cada tipo se imprime.
+    """
+
+    def __init__(self, fuente, anillo, consumidores=(), instrumentacion=None):
+        super().__init__(name="adquisicion", daemon=True)
+        self.fuente = fuente
+        self.anillo = anillo
+        self.consumidores = list(consumidores)
+        self.instrumentacion = instrumentacion or _SIN_INSTRUMENTACION
+        self.capturadas = 0
+        self.errores = 0
+        self.errores_consumidores = 0
+        self.ultimo_error = None
+        self._tipos_error = set() # Tipos de excepción ya impresos
+        self._detener = threading.Event()
+
+    def _registrar_error(self, e, contexto):
+        if type(e) not in self._tipos_error:
+            self._tipos_error.add(type(e))
+            print(f"Error en {contexto} (hilo de adquisición): {e!r}")
+        self.ultimo_error = e
+
+    def run(self):
+        inst = self.instrumentacion
+        while not self._detener.is_set():
+            try:
+                tramas = self.fuente.leer_tramas()
+            except Exception as e:
+                self.errores += 1
+                self._registrar_error(e, "la lectura")
+                time.sleep(0.01)
+                continue
+            if len(tramas):
+                t = inst.reloj()
+                self.anillo.agregar(tramas)
+                self.capturadas += len(tramas)
+                for consumidor in self.consumidores:
+                    try:
+                        consumidor(tramas)
+                    except Exception as e:
+                        self.errores_consumidores += 1
+                        self._registrar_error(e, getattr(consumidor, "__name__", "un consumidor"))
+                inst.medir("consumidores", t)
+
+    def detener(self, timeout=2.0):
+        self._detener.set()
+        self.join(timeout)
@@ -0,0 +1,249 @@
+import os
+import select
+import sys
+import threading
+import time
+
+import numpy as np
+
+from spectro_core import ADC_MAX, LONGITUD_ONDA, NUM_PIXELES, OFFSET_VALOR
+from spectro_serial import codificar_binario
+
+# --- SIMULADOR DEL ARDUINO + C12880MA ---
+#
+# Emite tramas con el mismo formato que printData() en espectrometro_arduino.ino
+# ('v0,v1,...,v287,\n') y con su ritmo real: lectura del sensor (~288
+# analogRead), envío a 115200 baudios (10 bits por byte) y delay(10) del loop.
+# 'velocidad' acelera ese ritmo (velocidad=None: tan rápido como se lea).
+# Las tramas son sintéticas o se repiten desde una carpeta de datos/.
+#
+#   PuertoSimulado   objeto con la interfaz de serial.Serial usada por los scripts
+#   ServidorPTY      pseudo-terminal (Linux/macOS) para abrir el simulador como un puerto
+#
+# Ejecutable: python spectro_simulador.py [carpeta_a_repetir] [velocidad]
+
+BAUDIOS = 115200
+BITS_POR_BYTE = 10 # 8N1: inicio + 8 datos + parada
+T_LECTURA_SENSOR = 0.035 # readSpectrometer(): 288 analogRead (~112 µs) + pulsos de reloj
+T_DELAY_LOOP = 0.010 # delay(10) en loop()
+LOTE_MAXIMO_BYTES = 64 * 1024 # in_waiting sin límite de velocidad
+
+
+def tramas_sinteticas(num_tramas=64, semilla=0):
+    """Tramas crudas (con offset) con dos líneas de emisión, fondo ancho y ruido de lectura."""
+    rng = np.random.default_rng(semilla)
+    x = LONGITUD_ONDA
+    espectro = (500 * np.exp(-0.5 * ((x - 532.0) / 2.5) ** 2)
+                + 180 * np.exp(-0.5 * ((x - 650.0) / 4.0) ** 2)
+                + 60 * np.exp(-0.5 * ((x - 580.0) / 80.0) ** 2))
+    tramas = OFFSET_VALOR + espectro + rng.normal(0, 3, (num_tramas, NUM_PIXELES))
+    return np.clip(np.rint(tramas), 0, ADC_MAX).astype(np.uint16)
+
+
+def tramas_de_carpeta(carpeta_path):
+    """Tramas crudas reconstruidas desde las capturas guardadas (se les devuelve el offset)."""
+    from spectro_dataset import cargar_espectros
+
+    _, matriz, _, offsets = cargar_espectros(carpeta_path, con_offsets=True)
+    if len(matriz) == 0:
+        raise ValueError(f"No hay capturas para repetir en '{carpeta_path}'.")
+    crudas = np.asarray(matriz, dtype=float) + offsets
+    return np.clip(np.rint(crudas), 0, ADC_MAX).astype(np.uint16)
+
+
+def codificar_texto(tramas):
+    """Líneas de texto de printData() para cada trama (lista de bytes)."""
+    return [(",".join(map(str, fila.tolist())) + ",\n").encode() for fila in np.atleast_2d(tramas)]
+
+
+class PuertoSimulado:
+    """Puerto serie en proceso que entrega tramas al ritmo del Arduino.
+
+    Implementa lo que usan los scripts de serial.Serial: in_waiting, read(),
+    write(), reset_input_buffer() y close(). Como el firmware, atiende los
+    comandos 'b' (tramas binarias) y 't' (texto) al comenzar cada trama y
+    numera las tramas con un contador uint16. Las tramas se repiten en ciclo;
+    con num_tramas se detiene tras enviar esa cantidad. prob_perdida y
+    prob_corrupcion simulan tramas que no llegan o llegan con un byte dañado.
+    """
+
+    def __init__(self, tramas=None, baudios=BAUDIOS, velocidad=1.0, timeout=1.0, num_tramas=None,
+                 binario=False, prob_perdida=0.0, prob_corrupcion=0.0, semilla=0):
+        self.port = "sim"
+        self.baudrate = baudios
+        self.timeout = timeout
+        self.velocidad = velocidad
+        self.num_tramas = num_tramas
+        self.binario = binario
+        self.prob_perdida = prob_perdida
+        self.prob_corrupcion = prob_corrupcion
+        self.is_open = True
+        self.comandos = bytearray() # Todo lo escrito por el PC
+        self._rng = np.random.default_rng(semilla)
+
+        self._tramas = tramas_sinteticas() if tramas is None else np.atleast_2d(tramas)
+        self._lineas = codificar_texto(self._tramas)
+        self.periodo_trama = self._periodo(np.mean([len(linea) for linea in self._lineas]))
+
+        self._cola = bytearray() # Bytes generados y aún no leídos
+        self._tramas_en_vuelo = [] # [inicio, fin, bytes, ya leídos] de las tramas que se están enviando
+        self._fin_tramas = [] # Momento en que terminó de llegar cada trama
+        self._contador = 0 # Contador uint16 del firmware
+        self._t0 = time.perf_counter()
+        self._proxima = self._t0 # Inicio (readSpectrometer) de la próxima trama
+
+    def _periodo(self, bytes_trama):
+        """Tiempo de una vuelta de loop(): lectura + envío + delay."""
+        return T_LECTURA_SENSOR + bytes_trama * BITS_POR_BYTE / self.baudrate + T_DELAY_LOOP
+
+    def _escala(self, segundos):
+        return 0.0 if self.velocidad is None else segundos / self.velocidad
+
+    def _generar_hasta(self, ahora):
+        """Genera las tramas que el firmware ya habría empezado a enviar en 'ahora'."""
+        while self._proxima <= ahora:
+            if self.num_tramas is not None and self._contador_total() >= self.num_tramas:
+                return
+            if self.velocidad is None and len(self._cola) >= LOTE_MAXIMO_BYTES:
+                return
+            self._atender_comandos()
+            k = self._contador_total()
+            fila = k % len(self._tramas)
+            if self.binario:
+                datos = bytearray(codificar_binario(self._tramas[fila], self._contador))
+            else:
+                datos = bytearray(self._lineas[fila])
+
+            inicio_envio = self._proxima + self._escala(T_LECTURA_SENSOR)
+            fin_envio = inicio_envio + self._escala(len(datos) * BITS_POR_BYTE / self.baudrate)
+            self._proxima = fin_envio + self._escala(T_DELAY_LOOP)
+            self._contador = (self._contador + 1) & 0xFFFF
+            self._fin_tramas.append(fin_envio)
+
+            if self._rng.random() < self.prob_perdida:
+                continue
+            if self._rng.random() < self.prob_corrupcion:
+                datos[int(self._rng.integers(len(datos)))] ^= 0xFF
+            if fin_envio <= ahora and not self._tramas_en_vuelo:
+                self._cola += datos
+            else:
+                self._tramas_en_vuelo.append([inicio_envio, fin_envio, datos, 0])
+
+    def _contador_total(self):
+        return len(self._fin_tramas)
+
+    def _atender_comandos(self):
+        """Como readCommands() del firmware: el último comando válido manda."""
+        for comando in self.comandos:
+            if comando == ord("b"):
+                self.binario = True
+            elif comando == ord("t"):
+                self.binario = False
+        self.comandos.clear()
+
+    def _actualizar(self):
+        ahora = time.perf_counter()
+        self._generar_hasta(ahora)
+        # Las tramas enviadas del todo pasan a la cola; la que está en curso, en parte
+        while self._tramas_en_vuelo and self._tramas_en_vuelo[0][1] <= ahora:
+            _, _, datos, leidos = self._tramas_en_vuelo.pop(0)
+            self._cola += datos[leidos:]
+        if self._tramas_en_vuelo:
+            inicio, fin, datos, leidos = self._tramas_en_vuelo[0]
+            fraccion = min(max((ahora - inicio) / (fin - inicio), 0.0), 1.0)
+            return len(self._cola) + max(int(len(datos) * fraccion) - leidos, 0)
+        return len(self._cola)
+
+    def instante_trama(self, k):
+        """Momento (perf_counter) en que la trama k (desde 0) terminó de llegar al PC."""
+        return self._fin_tramas[k]
+
+    @property
+    def in_waiting(self):
+        return self._actualizar()
+
+    def _extraer(self, num):
+        # Bytes de la trama en curso ya "recibidos": se adelantan a la cola
+        if num > len(self._cola):
+            en_curso = self._tramas_en_vuelo[0]
+            faltan = num - len(self._cola)
+            self._cola += en_curso[2][en_curso[3]:en_curso[3] + faltan]
+            en_curso[3] += faltan
+        salida = bytes(self._cola[:num])
+        del self._cola[:num]
+        return salida
+
+    def _terminado(self):
+        return (self.num_tramas is not None and self._contador_total() >= self.num_tramas
+                and not self._tramas_en_vuelo)
+
+    def read(self, size=1):
+        """Como serial.Serial.read: espera hasta 'size' bytes o hasta el timeout."""
+        limite = None if self.timeout is None else time.perf_counter() + self.timeout
+        while True:
+            disponibles = self.in_waiting
+            if (disponibles >= size or self._terminado()
+                    or (limite is not None and time.perf_counter() >= limite)):
+                return self._extraer(min(size, disponibles))
+            espera = self._escala(self.periodo_trama) / 20
+            if limite is not None:
+                espera = min(espera, max(limite - time.perf_counter(), 0.0))
+            time.sleep(espera)
+
+    def write(self, datos):
+        self.comandos += datos
+        return len(datos)
+
+    def reset_input_buffer(self):
+        self._extraer(self.in_waiting)
+
+    def close(self):
+        self.is_open = False
+
+
+class ServidorPTY(threading.Thread):
+    """Expone un PuertoSimulado como pseudo-terminal; 'ruta' se abre como cualquier puerto serie."""
+
+    def __init__(self, puerto_simulado):
+        import tty
+
+        super().__init__(name="simulador_pty", daemon=True)
+        self.simulado = puerto_simulado
+        self._maestro, self._esclavo = os.openpty()
+        tty.setraw(self._esclavo)
+        self.ruta = os.ttyname(self._esclavo)
+        self._detener = threading.Event()
+
+    def run(self):
+        self.simulado.timeout = 0.05
+        while not self._detener.is_set():
+            # Comandos del PC hacia el "Arduino"
+            if select.select([self._maestro], [], [], 0)[0]:
+                self.simulado.write(os.read(self._maestro, 1024))
+            datos = self.simulado.read(max(1, self.simulado.in_waiting))
+            if datos:
+                os.write(self._maestro, datos)
+
+    def detener(self):
+        self._detener.set()
+        self.join(1.0)
+        os.close(self._maestro)
+        os.close(self._esclavo)
+
+
+# --- EJECUCIÓN: simulador en una pseudo-terminal ---
+if __name__ == "__main__":
+    carpeta = sys.argv[1] if len(sys.argv) > 1 and sys.argv[1] != "-" else None
+    velocidad = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    simulado = PuertoSimulado(tramas_de_carpeta(carpeta) if carpeta else None, velocidad=velocidad or None)
+    servidor = ServidorPTY(simulado)
+    servidor.start()
+    print(f"Simulador escuchando en: {servidor.ruta} "
+          f"({1 / simulado.periodo_trama * (velocidad or float('inf')):.1f} tramas/s)")
+    print(f"Usar con: ESPECTROMETRO_PUERTO={servidor.ruta} python espectrometro_captura_tiempo_real.py")
+    try:
+        while servidor.is_alive():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    servidor.detener()
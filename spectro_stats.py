@@ -0,0 +1,292 @@
+import threading
+import warnings
+
+import numpy as np
+
+from spectro_core import ADC_MAX, LONGITUD_ONDA, NUM_PIXELES, indice_pico
+from spectro_picos import pico_principal
+
+# --- ESTADÍSTICAS POR PÍXEL ---
+#
+# Reporte del peak compartido por el análisis de carpetas y por la captura en
+# tiempo real, y acumulador en línea (Welford / Chan) que mantiene media,
+# varianza, mínimo, máximo y conteo de peaks de los 288 canales en memoria
+# constante, actualizándose por lotes de tramas.
+
+
+def reporte_pico(media_intensidad, std_intensidad, longitud_onda=LONGITUD_ONDA):
+    """Datos del píxel del peak global (máximo del espectro promedio)."""
+    idx_peak_global = int(indice_pico(media_intensidad))
+    media_pico_val = float(media_intensidad[idx_peak_global])
+    std_pico_val = float(std_intensidad[idx_peak_global])
+    return {
+        "idx_peak": idx_peak_global,
+        "peak_nm": float(longitud_onda[idx_peak_global]),
+        "peak_nm_subpixel": pico_principal(media_intensidad, longitud_onda)[1],
+        "media": media_pico_val,
+        "std": std_pico_val,
+        "error_relativo": (std_pico_val / media_pico_val) * 100 if media_pico_val else float("nan"),
+    }
+
+
+def imprimir_reporte_pico(reporte):
+    """Salida para el informe (mismo formato que el análisis de carpetas)."""
+    print("\n--- ERROR ESTADÍSTICO EN EL PICO MÁXIMO ---")
+    print(f"Pico de Intensidad Máximo: {reporte['peak_nm']:.2f} nm")
+    print(f"Pico Refinado (sub-píxel): {reporte['peak_nm_subpixel']:.2f} nm")
+    print(f"Intensidad Promedio en el Pico: {reporte['media']:.2f} ADC")
+    print(f"Desviación Estándar (Error): {reporte['std']:.2f} ADC")
+    print(f"Error Relativo (Coeficiente de Variación): {reporte['error_relativo']:.2f} %")
+
+
+class EstadisticasEnLinea:
+    """Media, varianza, mínimo, máximo y conteo de peaks por píxel, sin guardar las tramas.
+
+    Seguro entre hilos: agregar() puede llamarse desde el hilo lector mientras
+    la interfaz pide instantáneas.
+    """
+
+    def __init__(self, num_pixeles=NUM_PIXELES):
+        self.n = 0
+        self.media = np.zeros(num_pixeles)
+        self._m2 = np.zeros(num_pixeles) # Suma de cuadrados de las desviaciones
+        self.minimo = np.full(num_pixeles, np.inf)
+        self.maximo = np.full(num_pixeles, -np.inf)
+        self.conteo_peak = np.zeros(num_pixeles, dtype=np.int64) # Veces que cada píxel fue el máximo
+        self._lock = threading.Lock()
+
+    def agregar(self, tramas):
+        """Incorpora un lote (N, 288) o una trama (288,) combinando sus momentos (Chan et al.)."""
+        x = np.asarray(tramas, dtype=np.float64).reshape(-1, self.media.size)
+        k = len(x)
+        if k == 0:
+            return
+        media_lote = x.mean(axis=0)
+        m2_lote = np.square(x - media_lote).sum(axis=0)
+        peaks = np.bincount(np.argmax(x, axis=1), minlength=self.media.size)
+
+        with self._lock:
+            n_total = self.n + k
+            delta = media_lote - self.media
+            self.media += delta * (k / n_total)
+            self._m2 += m2_lote + np.square(delta) * (self.n * k / n_total)
+            np.minimum(self.minimo, x.min(axis=0), out=self.minimo)
+            np.maximum(self.maximo, x.max(axis=0), out=self.maximo)
+            self.conteo_peak += peaks
+            self.n = n_total
+
+    @property
+    def varianza(self):
+        # Poblacional (ddof=0), igual que np.std en el análisis de carpetas
+        return self._m2 / self.n if self.n else np.zeros_like(self._m2)
+
+    def instantanea(self):
+        """Copia consistente de todas las estadísticas en este momento."""
+        with self._lock:
+            return {
+                "n": self.n,
+                "media": self.media.copy(),
+                "std": np.sqrt(self.varianza),
+                "minimo": self.minimo.copy(),
+                "maximo": self.maximo.copy(),
+                "conteo_peak": self.conteo_peak.copy(),
+            }
+
+    def reporte(self, longitud_onda=LONGITUD_ONDA):
+        """Mismo reporte del peak que el análisis de carpetas, más el píxel que más veces fue máximo."""
+        foto = self.instantanea()
+        if foto["n"] == 0:
+            return None
+        reporte = reporte_pico(foto["media"], foto["std"], longitud_onda)
+        reporte["n"] = foto["n"]
+        reporte["peak_frecuente_nm"] = float(longitud_onda[np.argmax(foto["conteo_peak"])])
+        return reporte
+
+
+# --- HISTOGRAMAS POR PÍXEL ---
+
+def histograma_por_pixel(matriz_intensidad, bordes, tramas_por_bloque=4096):
+    """Conteos (288, len(bordes) - 1) de la intensidad de cada píxel con bordes comunes.
+
+    Un solo np.bincount por bloque de capturas (índice = píxel * bins + bin),
+    así que sirve para matrices memmap de cualquier tamaño. Los valores fuera
+    de los bordes se acumulan en el primer o último bin.
+    """
+    bordes = np.asarray(bordes, dtype=float)
+    num_bins = bordes.size - 1
+    num_pixeles = matriz_intensidad.shape[1]
+    base = np.arange(num_pixeles) * num_bins
+    conteos = np.zeros(num_pixeles * num_bins, dtype=np.int64)
+    ancho = _ancho_uniforme(bordes)
+    for inicio in range(0, len(matriz_intensidad), tramas_por_bloque):
+        bloque = np.asarray(matriz_intensidad[inicio:inicio + tramas_por_bloque], dtype=float)
+        conteos += _conteos_bloque(bloque, bordes, base, ancho)
+    return conteos.reshape(num_pixeles, num_bins)
+
+
+def _ancho_uniforme(bordes):
+    """Ancho de bin si los bordes son equiespaciados (índice por aritmética), si no None."""
+    anchos = np.diff(bordes)
+    return float(anchos[0]) if np.allclose(anchos, anchos[0]) else None
+
+
+def _conteos_bloque(bloque, bordes, base, ancho=None):
+    """Conteos aplanados (píxel * bins + bin) de un bloque (N, 288) en un solo np.bincount."""
+    if ancho:
+        indices = np.floor((bloque - bordes[0]) / ancho).astype(np.intp) # ~10x más rápido que searchsorted
+    else:
+        indices = np.searchsorted(bordes, bloque, side="right") - 1
+    np.clip(indices, 0, bordes.size - 2, out=indices)
+    indices += base
+    return np.bincount(indices.ravel(), minlength=base.size * (bordes.size - 1))
+
+
+# --- REPRODUCIBILIDAD DE TODO EL ESPECTRO ---
+
+# Bins de 1 ADC centrados en cada entero: con intensidades enteras los percentiles son exactos
+BORDES_ADC = np.arange(-0.5, ADC_MAX + 1)
+PERCENTILES_REPRODUCIBILIDAD = (5, 25, 50, 75, 95)
+REMUESTREOS_BOOTSTRAP = 200
+NIVEL_CONFIANZA = 0.95
+
+
+class ReproducibilidadPorPixel:
+    """Distribución, percentiles, CV e intervalos bootstrap de los 288 píxeles, por bloques.
+
+    Cada bloque de capturas actualiza histogramas con bordes comunes, los
+    momentos por píxel y B réplicas de bootstrap de Poisson (cada captura
+    entra en cada réplica con un peso ~ Poisson(1)), así que la memoria no
+    depende del número de capturas. Los percentiles salen del histograma
+    (orden estadístico, como np.percentile(..., method="inverted_cdf")).
+    """
+
+    def __init__(self, bordes=BORDES_ADC, remuestreos=REMUESTREOS_BOOTSTRAP, semilla=0, num_pixeles=NUM_PIXELES):
+        self.bordes = np.asarray(bordes, dtype=float)
+        self.remuestreos = remuestreos
+        num_bins = self.bordes.size - 1
+        self._ancho = _ancho_uniforme(self.bordes)
+        self._base = np.arange(num_pixeles) * num_bins
+        self._conteos = np.zeros(num_pixeles * num_bins, dtype=np.int64)
+        self.momentos = EstadisticasEnLinea(num_pixeles)
+        # Réplicas: suma de pesos, de pesos * x y de pesos * x²
+        self._rng = np.random.default_rng(semilla)
+        self._w = np.zeros(remuestreos)
+        self._wx = np.zeros((remuestreos, num_pixeles))
+        self._wx2 = np.zeros((remuestreos, num_pixeles))
+
+    @property
+    def n(self):
+        return self.momentos.n
+
+    @property
+    def conteos(self):
+        """Histograma (288, bins) con los bordes comunes."""
+        return self._conteos.reshape(len(self._base), -1)
+
+    def agregar(self, tramas):
+        """Incorpora un bloque (N, 288); los valores fuera de los bordes van al primer o último bin."""
+        x = np.asarray(tramas, dtype=np.float64).reshape(-1, len(self._base))
+        if len(x) == 0:
+            return
+        self._conteos += _conteos_bloque(x, self.bordes, self._base, self._ancho)
+        self.momentos.agregar(x)
+
+        # Un producto de matrices por bloque para todas las réplicas
+        pesos = self._rng.poisson(1.0, (self.remuestreos, len(x))).astype(np.float64)
+        self._w += pesos.sum(axis=1)
+        self._wx += pesos @ x
+        self._wx2 += pesos @ np.square(x)
+
+    def percentiles(self, percentiles=PERCENTILES_REPRODUCIBILIDAD):
+        """(len(percentiles), 288): centro del primer bin cuyo acumulado alcanza cada percentil."""
+        acumulado = np.cumsum(self.conteos, axis=1)
+        centros = (self.bordes[:-1] + self.bordes[1:]) / 2
+        objetivos = np.ceil(np.asarray(percentiles, dtype=float) / 100 * self.n).clip(1)
+        # Bins con acumulado por debajo del objetivo = índice del primer bin que lo alcanza
+        bins = np.count_nonzero(acumulado < objetivos[:, None, None], axis=2)
+        return centros[bins]
+
+    def resultado(self, percentiles=PERCENTILES_REPRODUCIBILIDAD, nivel=NIVEL_CONFIANZA):
+        """Arreglos por píxel: media, std, CV (%), mínimo, máximo, percentiles e intervalos bootstrap."""
+        foto = self.momentos.instantanea()
+        if foto["n"] == 0:
+            return None
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cv = 100 * foto["std"] / foto["media"]
+            media_b = self._wx / self._w[:, None]
+            std_b = np.sqrt(np.maximum(self._wx2 / self._w[:, None] - np.square(media_b), 0))
+            cv_b = 100 * std_b / media_b
+        colas = 100 * np.array([(1 - nivel) / 2, (1 + nivel) / 2])
+        with warnings.catch_warnings():
+            # Píxeles con media 0 en todos los remuestreos (oscuros tras el clip): CV indefinido, IC NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            ic_cv = np.nanpercentile(cv_b, colas, axis=0)
+        return {
+            "n": foto["n"],
+            "media": foto["media"],
+            "std": foto["std"],
+            "cv": cv,
+            "minimo": foto["minimo"],
+            "maximo": foto["maximo"],
+            "percentiles": np.asarray(percentiles),
+            "valores_percentiles": self.percentiles(percentiles),
+            "nivel_confianza": nivel,
+            "ic_media": np.percentile(media_b, colas, axis=0),
+            "ic_std": np.percentile(std_b, colas, axis=0),
+            "ic_cv": ic_cv,
+            "bordes": self.bordes,
+            "histograma": self.conteos,
+        }
+
+
+def reproducibilidad_por_pixel(matriz_intensidad, tramas_por_bloque=4096, transformar=None, **opciones):
+    """Resultado de ReproducibilidadPorPixel recorriendo 'matriz_intensidad' (p. ej. un memmap) por bloques.
+
+    'transformar(bloque, inicio)' se aplica a cada bloque antes de acumularlo
+    (p. ej. la calibración; 'inicio' es el índice de su primera fila).
+    """
+    acumulador = ReproducibilidadPorPixel(**opciones)
+    for inicio in range(0, len(matriz_intensidad), tramas_por_bloque):
+        bloque = matriz_intensidad[inicio:inicio + tramas_por_bloque]
+        acumulador.agregar(transformar(bloque, inicio) if transformar else bloque)
+    return acumulador.resultado()
+
+
+# --- REDUCCIÓN DE RÁFAGAS ---
+
+METODOS_RAFAGA = ("media", "mediana", "sigma")
+
+
+def reducir_rafaga(tramas, metodo="sigma", sigma=3.0, iteraciones=3):
+    """Reduce una ráfaga (N, 288) a un espectro, vectorizado sobre toda la ráfaga.
+
+    metodo: 'media', 'mediana' o 'sigma' (media con rechazo iterativo de
+    valores a más de 'sigma' desviaciones). Devuelve (espectro, std, n_usadas)
+    por píxel; std y n_usadas se calculan sobre las tramas que quedaron.
+    """
+    x = np.asarray(tramas, dtype=np.float64)
+    if metodo == "media":
+        return x.mean(axis=0), x.std(axis=0), np.full(x.shape[1], len(x))
+    if metodo == "mediana":
+        return np.median(x, axis=0), x.std(axis=0), np.full(x.shape[1], len(x))
+    if metodo != "sigma":
+        raise ValueError(f"Método de ráfaga desconocido: '{metodo}' (usar uno de {METODOS_RAFAGA})")
+
+    usadas = np.ones(x.shape, dtype=bool)
+    for _ in range(iteraciones):
+        n = usadas.sum(axis=0)
+        media = np.where(usadas, x, 0).sum(axis=0) / n
+        std = np.sqrt(np.where(usadas, np.square(x - media), 0).sum(axis=0) / n)
+        # Con std = 0 (píxel constante) no se rechaza nada
+        nuevas = np.abs(x - media) <= sigma * std
+        # Con sigma < 1 un píxel puede quedarse sin tramas: conserva las de la vuelta anterior
+        vacios = ~nuevas.any(axis=0)
+        nuevas[:, vacios] = usadas[:, vacios]
+        if np.array_equal(nuevas, usadas):
+            break
+        usadas = nuevas
+
+    n = usadas.sum(axis=0)
+    media = np.where(usadas, x, 0).sum(axis=0) / n
+    std = np.sqrt(np.where(usadas, np.square(x - media), 0).sum(axis=0) / n)
+    return media, std, n
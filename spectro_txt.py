@@ -0,0 +1,189 @@
+import datetime
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from spectro_core import NUM_PIXELES, OFFSET_VALOR
+
+# --- LECTOR RÁPIDO DE CAPTURAS .TXT (Espectro_Captura_*.txt) ---
+#
+# Formato: 3 líneas de encabezado '#' y 288 filas 'longitud_onda<TAB>intensidad'.
+# Las intensidades enteras se convierten directamente desde los bytes con NumPy
+# (posiciones de TAB y fin de línea), para todos los archivos de un grupo en una
+# sola pasada; los que no siguen ese formato fijo pasan por un parser genérico.
+# Las carpetas grandes se reparten entre procesos.
+
+LINEAS_ENCABEZADO = 3
+MIN_ARCHIVOS_PARALELO = 256 # Por debajo, el arranque de procesos cuesta más de lo que ahorra
+
+_TAB = 9
+_LF = 10
+_CR = 13
+_CERO = 48
+_POTENCIAS_10 = 10 ** np.arange(9, dtype=np.int32)
+
+
+def leer_encabezado(lineas):
+    """Devuelve {'tiempo': epoch o None, 'offset': int o (288,)} a partir de las líneas de encabezado."""
+    meta = {"tiempo": None, "offset": OFFSET_VALOR}
+    for linea in lineas:
+        linea = linea.decode("utf-8", errors="ignore")
+        if "Capturado el" in linea:
+            texto = linea.split("Capturado el", 1)[1].strip()
+            meta["tiempo"] = datetime.datetime.fromisoformat(texto).timestamp() # 'YYYY-MM-DD HH:MM:SS'
+        elif "Offset sustraido:" in linea:
+            # 'Offset sustraido: 127' o 'Offset sustraido: 127 (oscuro por píxel: 126,127,...)'; las
+            # capturas anteriores sólo anotaban la media: '127 (oscuro por píxel, ver calibracion.npz)'
+            meta["offset"] = int(linea.split(":", 1)[1].split()[0])
+            if "por píxel:" in linea:
+                oscuro = np.array(linea.split("por píxel:", 1)[1].strip(" )\r\n").split(","), dtype=np.int64)
+                if oscuro.size == NUM_PIXELES:
+                    meta["offset"] = oscuro
+    return meta
+
+
+def _intensidades_formato_fijo(cuerpos):
+    """Convierte la segunda columna (enteros) de varios cuerpos de archivo en una sola pasada.
+
+    Devuelve (matriz (N, 288), ok (N,)); las filas con ok=False no siguen el
+    formato fijo y deben leerse con el parser genérico.
+    """
+    num = len(cuerpos)
+    ok = np.array([c.count(b"\t") == NUM_PIXELES and c.count(b"\n") >= NUM_PIXELES - 1 for c in cuerpos],
+                  dtype=bool)
+    matriz = np.zeros((num, NUM_PIXELES))
+    if not ok.any():
+        return matriz, ok
+
+    # Un solo buffer con exactamente 288 saltos de línea por archivo
+    bloque = b"".join(c.rstrip(b"\r\n") + b"\n" for c, v in zip(cuerpos, ok) if v)
+    arr = np.frombuffer(bloque, dtype=np.uint8)
+    tabs = np.flatnonzero(arr == _TAB)
+    fines = np.flatnonzero(arr == _LF)
+    if tabs.size != fines.size:
+        # Filas en blanco intercaladas: que lo resuelva el parser genérico
+        ok[:] = False
+        return matriz, ok
+    fines -= arr[fines - 1] == _CR # CRLF (capturas guardadas en Windows)
+
+    # Dígitos alineados a la derecha desde el fin de línea: la columna k (k = 1..9)
+    # tiene siempre peso 10**(k-1), así que el valor es un producto matricial
+    largos = fines - tabs - 1
+    columnas = np.arange(min(max(int(largos.max()), 1), 9), 0, -1)
+    en_numero = columnas <= largos[:, None]
+    digitos = arr[fines[:, None] - columnas].astype(np.int32)
+    digitos -= _CERO
+    invalidos = np.any(en_numero & ((digitos < 0) | (digitos > 9)), axis=1) | (largos < 1) | (largos > 9)
+    np.multiply(digitos, en_numero, out=digitos)
+    valores = digitos @ _POTENCIAS_10[columnas - 1]
+
+    filas_ok = np.flatnonzero(ok)
+    matriz[filas_ok] = valores.reshape(-1, NUM_PIXELES)
+    ok[filas_ok[invalidos.reshape(-1, NUM_PIXELES).any(axis=1)]] = False
+    return matriz, ok
+
+
+def _separar(contenido):
+    """Divide el contenido en (líneas de encabezado, cuerpo)."""
+    partes = contenido.split(b"\n", LINEAS_ENCABEZADO)
+    if len(partes) <= LINEAS_ENCABEZADO:
+        raise ValueError("archivo sin datos")
+    return partes[:LINEAS_ENCABEZADO], partes[-1]
+
+
+def _leer_generico(cuerpo):
+    """Parser genérico (decimales, espacios en vez de TAB, etc.)."""
+    datos = np.array(cuerpo.split(), dtype=np.float64)
+    if datos.size != 2 * NUM_PIXELES:
+        raise ValueError(f"se esperaban {NUM_PIXELES} filas de 2 columnas, hay {datos.size} valores")
+    datos = datos.reshape(NUM_PIXELES, 2)
+    return datos[:, 0], datos[:, 1]
+
+
+def leer_captura_txt(ruta_archivo, con_longitud_onda=False):
+    """Lee una captura .txt. Devuelve (meta, longitud_onda o None, intensidad (288,))."""
+    with open(ruta_archivo, "rb") as f:
+        encabezado, cuerpo = _separar(f.read())
+    meta = leer_encabezado(encabezado)
+    if meta["tiempo"] is None:
+        meta["tiempo"] = os.path.getmtime(ruta_archivo)
+
+    if not con_longitud_onda:
+        matriz, ok = _intensidades_formato_fijo([cuerpo])
+        if ok[0]:
+            return meta, None, matriz[0]
+    longitud_onda, intensidad = _leer_generico(cuerpo)
+    return meta, longitud_onda, intensidad
+
+
+def _leer_lote(rutas):
+    """Lee un grupo de archivos en un proceso trabajador (un solo array de vuelta)."""
+    metas = [None] * len(rutas)
+    cuerpos = [b""] * len(rutas)
+    errores = []
+    for i, ruta_archivo in enumerate(rutas):
+        try:
+            with open(ruta_archivo, "rb") as f:
+                encabezado, cuerpos[i] = _separar(f.read())
+            metas[i] = leer_encabezado(encabezado)
+            if metas[i]["tiempo"] is None:
+                metas[i]["tiempo"] = os.path.getmtime(ruta_archivo)
+        except Exception as e:
+            errores.append(f"Error al procesar el archivo {os.path.basename(ruta_archivo)}: {e}")
+
+    matriz, ok = _intensidades_formato_fijo(cuerpos)
+
+    # Los que no siguen el formato fijo pasan por el parser genérico
+    for i in np.flatnonzero(~ok):
+        if metas[i] is None:
+            continue
+        try:
+            _, matriz[i] = _leer_generico(cuerpos[i])
+        except Exception as e:
+            metas[i] = None
+            errores.append(f"Error al procesar el archivo {os.path.basename(rutas[i])}: {e}")
+    return matriz, metas, errores
+
+
+def cargar_capturas_txt(rutas, procesos=None):
+    """Carga muchas capturas .txt en un solo array.
+
+    Devuelve (longitud_onda, matriz (N, 288), metadatos, rutas) sólo con los
+    archivos válidos. Con procesos=None se usan todos los núcleos cuando hay al
+    menos MIN_ARCHIVOS_PARALELO archivos; procesos=1 fuerza la lectura secuencial.
+    """
+    rutas = list(rutas)
+    longitud_onda = None
+    for ruta_archivo in rutas:
+        # El eje X es común a la carpeta: se toma del primer archivo legible
+        try:
+            _, longitud_onda, _ = leer_captura_txt(ruta_archivo, con_longitud_onda=True)
+            break
+        except Exception:
+            continue
+
+    if procesos is None:
+        procesos = (os.cpu_count() or 1) if len(rutas) >= MIN_ARCHIVOS_PARALELO else 1
+
+    if procesos > 1:
+        # Varios grupos por proceso para repartir bien la carga
+        tam_grupo = max(1, -(-len(rutas) // (procesos * 4)))
+        grupos = [rutas[i:i + tam_grupo] for i in range(0, len(rutas), tam_grupo)]
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            resultados = list(ejecutor.map(_leer_lote, grupos))
+    else:
+        resultados = [_leer_lote(rutas)]
+
+    matriz = np.concatenate([r[0] for r in resultados]) if resultados else np.empty((0, NUM_PIXELES))
+    metas = [m for r in resultados for m in r[1]]
+    for r in resultados:
+        for error in r[2]:
+            print(error)
+
+    validos = np.array([m is not None for m in metas], dtype=bool)
+    if not validos.all():
+        matriz = matriz[validos]
+        metas = [m for m in metas if m is not None]
+        rutas = [r for r, v in zip(rutas, validos) if v]
+    return longitud_onda, matriz, metas, rutas
@@ -0,0 +1,44 @@
+import numpy as np
+
+import spectro_calibracion
+from spectro_calibracion import COEFICIENTES_LINEALES, Calibracion, obtener_calibracion
+from spectro_core import LONGITUD_ONDA, NUM_PIXELES, OFFSET_VALOR
+from spectro_dataset import EscritorDataset
+
+
+def test_coeficientes_lineales_equivalen_al_eje_original():
+    np.testing.assert_allclose(Calibracion.por_defecto().longitud_onda, LONGITUD_ONDA)
+
+
+def test_coeficientes_como_array(tmp_path, monkeypatch):
+    coeficientes = np.array(COEFICIENTES_LINEALES) + [1.0, 0.0] # Como los devuelve np.polyfit
+    monkeypatch.setattr(spectro_calibracion, "COEFICIENTES_LONGITUD_ONDA", coeficientes)
+    calibracion = obtener_calibracion(str(tmp_path / "sin_oscuros"), str(tmp_path / "calibracion.npz"))
+    np.testing.assert_allclose(calibracion.longitud_onda, LONGITUD_ONDA + 1)
+
+
+def test_reajustar_con_offset_por_fila():
+    calibracion = Calibracion(np.full(NUM_PIXELES, 120))
+    intensidad = np.full((2, NUM_PIXELES), 10.0)
+    offsets = np.array([[OFFSET_VALOR], [100]]) # Cada fila guardada con su offset
+    np.testing.assert_array_equal(calibracion.reajustar(intensidad, offsets)[:, 0], [17, 0])
+
+
+def capturar_oscuros(carpeta, calibracion, num, rng, oscuro_real=120.0):
+    """Guarda 'num' oscuros como la captura única: con el oscuro de 'calibracion' sustraído."""
+    tramas = np.clip(np.rint(rng.normal(oscuro_real, 4, (num, NUM_PIXELES))), 0, None).astype(np.uint16)
+    with EscritorDataset(carpeta, offset=calibracion.oscuro) as escritor:
+        escritor.agregar(calibracion.aplicar(tramas))
+
+
+def test_oscuros_crudos_no_suben_al_recapturar(tmp_path):
+    carpeta, ruta = str(tmp_path / "Oscuro"), str(tmp_path / "calibracion.npz")
+    rng = np.random.default_rng(0)
+    # Oscuros de antes, guardados con el offset fijo restado (todo recortado en 0): no se usan
+    capturar_oscuros(carpeta, Calibracion.por_defecto(), 8, rng)
+    assert np.all(obtener_calibracion(carpeta, ruta).oscuro == OFFSET_VALOR)
+
+    for _ in range(5):
+        capturar_oscuros(carpeta, Calibracion.cruda(), 8, rng)
+        calibracion = obtener_calibracion(carpeta, ruta)
+        assert abs(calibracion.oscuro.mean() - 120) < 0.5
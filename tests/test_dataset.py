@@ -0,0 +1,147 @@
+import datetime
+import json
+import os
+
+import numpy as np
+import pytest
+
+import spectro_dataset
+from spectro_core import LONGITUD_ONDA, NUM_PIXELES, OFFSET_VALOR
+from spectro_dataset import (ARCHIVO_DATOS, ARCHIVO_META, ARCHIVO_TIEMPOS, EscritorDataset, abrir_dataset,
+                             cargar_espectros, importar_txt, offset_filas, offset_sustraido, txt_pendientes)
+
+T0 = datetime.datetime(2025, 11, 14, 22, 0, 0).timestamp()
+
+
+def escribir_txt(carpeta, tiempo, intensidad, offset=OFFSET_VALOR):
+    """Captura .txt con el formato de espectrometro_captura_de_espectro_unico.py."""
+    fecha = datetime.datetime.fromtimestamp(tiempo)
+    encabezado = f"Espectro C12880MA - Capturado el {fecha.strftime('%Y-%m-%d %H:%M:%S')}\n"
+    offset = np.asarray(offset)
+    encabezado += f"Offset sustraido: {int(round(offset.mean()))}"
+    if offset.ndim:
+        encabezado += f" (oscuro por píxel: {','.join(map(str, offset.tolist()))})"
+    encabezado += "\nLongitud_Onda (nm)\tIntensidad (ADC)"
+    ruta = os.path.join(carpeta, f"Espectro_Captura_{fecha.strftime('%Y%m%d_%H%M%S')}.txt")
+    np.savetxt(ruta, np.stack((LONGITUD_ONDA, intensidad), axis=1), fmt=["%.4f", "%d"], delimiter="\t",
+               header=encabezado, comments="# ")
+    return ruta
+
+
+@pytest.fixture
+def carpeta_txt(tmp_path):
+    """Carpeta con 3 capturas .txt antiguas (intensidad constante 10, 11, 12)."""
+    for i in range(3):
+        escribir_txt(tmp_path, T0 + 60 * i, np.full(NUM_PIXELES, 10 + i))
+    return str(tmp_path)
+
+
+def test_captura_nueva_en_carpeta_con_txt_conserva_las_anteriores(carpeta_txt):
+    with EscritorDataset(carpeta_txt) as escritor:
+        assert escritor.importados_txt == 3
+        escritor.agregar(np.full(NUM_PIXELES, 50), T0 + 3600)
+
+    _, matriz, etiquetas = cargar_espectros(carpeta_txt)
+    assert matriz.shape == (4, NUM_PIXELES)
+    np.testing.assert_array_equal(matriz[:, 0], [10, 11, 12, 50])
+    assert etiquetas[0] == "20251114_220000"
+    assert txt_pendientes(carpeta_txt) == []
+
+    # Reabrir no vuelve a importarlos
+    with EscritorDataset(carpeta_txt) as escritor:
+        assert escritor.importados_txt == 0
+    assert len(abrir_dataset(carpeta_txt)) == 4
+
+
+def test_cargar_espectros_agrega_los_txt_sin_importar(carpeta_txt, monkeypatch):
+    # Dataset creado antes que los .txt de la carpeta (p. ej. copiados después)
+    importar_txt(carpeta_txt)
+    escribir_txt(carpeta_txt, T0 - 60, np.full(NUM_PIXELES, 7), offset=100)
+    escribir_txt(carpeta_txt, T0 - 120, np.full(NUM_PIXELES, 5), offset=100)
+
+    _, matriz, etiquetas = cargar_espectros(carpeta_txt)
+    np.testing.assert_array_equal(matriz[:, 0], [10, 11, 12, 5, 7])
+    assert etiquetas[-2:] == ["20251114_215800", "20251114_215900"]
+    offset = offset_sustraido(carpeta_txt)
+    np.testing.assert_array_equal(offset[:, 0], [127, 127, 127, 100, 100])
+    assert offset_sustraido(carpeta_txt, 3) == 100
+
+    # Filas y offsets en una sola lectura de los .txt pendientes
+    lecturas = []
+    leer_txt_pendientes = spectro_dataset._leer_txt_pendientes
+    monkeypatch.setattr(spectro_dataset, "_leer_txt_pendientes",
+                        lambda rutas: lecturas.append(rutas) or leer_txt_pendientes(rutas))
+    _, matriz_con_offsets, _, offsets = cargar_espectros(carpeta_txt, con_offsets=True)
+    assert len(lecturas) == 1
+    np.testing.assert_array_equal(matriz_con_offsets, matriz)
+    np.testing.assert_array_equal(offsets, offset)
+    assert np.all(offset_filas(offsets, 3) == 100)
+    monkeypatch.undo()
+
+    # Al importarlos quedan en el mismo orden y con su offset
+    assert importar_txt(carpeta_txt) == 2
+    _, matriz_importada, etiquetas_importadas = cargar_espectros(carpeta_txt)
+    np.testing.assert_array_equal(matriz_importada, matriz)
+    assert etiquetas_importadas == etiquetas
+    np.testing.assert_array_equal(offset_sustraido(carpeta_txt), offset)
+
+
+def test_offset_distinto_abre_un_tramo(tmp_path):
+    carpeta = str(tmp_path)
+    oscuro = 120 + np.arange(NUM_PIXELES) % 7
+    with EscritorDataset(carpeta, offset=OFFSET_VALOR) as escritor:
+        escritor.agregar(np.zeros((2, NUM_PIXELES)))
+    with EscritorDataset(carpeta, offset=oscuro) as escritor:
+        escritor.agregar(np.zeros((3, NUM_PIXELES)))
+    with EscritorDataset(carpeta, offset=OFFSET_VALOR) as escritor:
+        escritor.agregar(np.zeros((1, NUM_PIXELES)))
+
+    ds = abrir_dataset(carpeta)
+    assert len(ds) == 6
+    assert ds.meta["tramos_offset"] == [[0, 0], [2, 1], [5, 0]]
+    assert ds.offset_filas(0, 2) == OFFSET_VALOR
+    np.testing.assert_array_equal(ds.offset_filas(2, 5), oscuro)
+    por_fila = ds.offset_filas()
+    assert por_fila.shape == (6, NUM_PIXELES)
+    np.testing.assert_array_equal(por_fila[:, 1], [127, 127, 121, 121, 121, 127])
+
+
+def test_txt_con_oscuro_por_pixel(tmp_path):
+    carpeta = str(tmp_path)
+    oscuro = 120 + np.arange(NUM_PIXELES) % 7
+    escribir_txt(carpeta, T0, np.full(NUM_PIXELES, 10), offset=oscuro)
+    escribir_txt(carpeta, T0 + 60, np.full(NUM_PIXELES, 10))
+
+    offset = offset_sustraido(carpeta)
+    np.testing.assert_array_equal(offset[0], oscuro)
+    np.testing.assert_array_equal(offset[1], OFFSET_VALOR)
+    importar_txt(carpeta)
+    np.testing.assert_array_equal(offset_sustraido(carpeta), offset)
+
+
+def test_lee_metadatos_version_1(tmp_path):
+    carpeta = str(tmp_path)
+    np.full((3, NUM_PIXELES), 10, dtype="<u2").tofile(os.path.join(carpeta, ARCHIVO_DATOS))
+    (T0 + np.arange(3.0)).tofile(os.path.join(carpeta, ARCHIVO_TIEMPOS))
+    with open(os.path.join(carpeta, ARCHIVO_META), "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "num_pixeles": NUM_PIXELES, "dtype": "<u2", "offset": 130,
+                   "longitud_onda": LONGITUD_ONDA.tolist(), "importados": []}, f)
+
+    assert offset_sustraido(carpeta) == 130
+    with EscritorDataset(carpeta, offset=OFFSET_VALOR) as escritor:
+        escritor.agregar(np.zeros(NUM_PIXELES))
+    np.testing.assert_array_equal(offset_sustraido(carpeta)[:, 0], [130, 130, 130, 127])
+
+
+def test_trama_a_medias_se_descarta_al_agregar(tmp_path):
+    carpeta = str(tmp_path)
+    with EscritorDataset(carpeta) as escritor:
+        escritor.agregar(np.ones((2, NUM_PIXELES)), T0)
+    with open(os.path.join(carpeta, ARCHIVO_DATOS), "ab") as f:
+        f.write(b"\x01\x00" * 10) # Escritura interrumpida
+    with EscritorDataset(carpeta) as escritor:
+        escritor.agregar(np.full(NUM_PIXELES, 2), T0 + 1)
+
+    ds = abrir_dataset(carpeta)
+    np.testing.assert_array_equal(ds.intensidad[:, 0], [1, 1, 2])
+    np.testing.assert_array_equal(ds.tiempos, [T0, T0, T0 + 1])
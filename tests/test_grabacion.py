@@ -0,0 +1,27 @@
+import numpy as np
+
+import spectro_grabacion
+from spectro_grabacion import GrabadorContinuo, LectorGrabacion
+from spectro_simulador import tramas_sinteticas
+
+
+def test_error_de_escritura_cuenta_todas_las_tramas_perdidas(tmp_path, monkeypatch):
+    codificar = spectro_grabacion._codificar
+    llamadas = []
+
+    def codificar_con_disco_lleno(*args):
+        llamadas.append(1)
+        if len(llamadas) > 1:
+            raise OSError(28, "No space left on device")
+        return codificar(*args)
+
+    monkeypatch.setattr(spectro_grabacion, "_codificar", codificar_con_disco_lleno)
+    tramas = tramas_sinteticas(600)
+    with GrabadorContinuo(str(tmp_path), tramas_por_bloque=100, max_bloques_cola=8) as grabador:
+        for lote in np.split(tramas, 6):
+            grabador.agregar(lote, np.arange(len(lote), dtype=float))
+
+    assert isinstance(grabador.error, OSError)
+    escritas = len(LectorGrabacion(str(tmp_path)))
+    assert escritas == 100
+    assert grabador.tramas - grabador.tramas_descartadas == escritas
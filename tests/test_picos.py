@@ -0,0 +1,26 @@
+import numpy as np
+
+from spectro_picos import SeguidorPicos
+
+
+def picos(*nm):
+    return {"nm": np.array([nm], dtype=float), "altura": np.full((1, len(nm)), 100.0)}
+
+
+def test_pista_sigue_un_pico_que_deriva():
+    seguidor = SeguidorPicos(tolerancia_nm=3.0)
+    for k in range(20):
+        seguidor.actualizar_lote(picos(530.0 + 0.1 * k, 700.0))
+    activas = seguidor.activas(min_tramas=2)
+    assert [p.n for p in activas] == [20, 20]
+    assert abs(activas[0].media_nm - 530.95) < 1e-9
+
+
+def test_pistas_cerradas_acotadas():
+    # Un pico distinto por trama (ruido): cada pista se cierra tras max_perdidas tramas sin verse
+    seguidor = SeguidorPicos(tolerancia_nm=1.0, max_perdidas=2, max_cerradas=50)
+    for k in range(1000):
+        seguidor.actualizar_lote(picos(400.0 + 5 * k))
+    assert len(seguidor.cerradas) == 50
+    assert len(seguidor.pistas) <= 3
+    assert seguidor.cerradas[-1].id == 996 # Se conservan las más recientes
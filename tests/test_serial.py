@@ -0,0 +1,170 @@
+import io
+
+import numpy as np
+import pytest
+
+from spectro_core import NUM_PIXELES
+from spectro_serial import (BYTES_TRAMA_BINARIA, DecodificadorBinario, DecodificadorTramas, HiloAdquisicion,
+                            codificar_binario, crear_decodificador)
+from spectro_simulador import PuertoSimulado, codificar_texto, tramas_sinteticas
+
+TRAMAS = tramas_sinteticas(10)
+
+
+def decodificar(decodificador, trozos):
+    """Alimenta los trozos en orden; devuelve las tramas (copiadas) y los contadores del decodificador."""
+    tramas, secuencias = [], []
+    for trozo in trozos:
+        lote = decodificador.alimentar(trozo)
+        tramas.append(np.array(lote))
+        secuencias.append(np.array(getattr(decodificador, "secuencias", np.arange(len(lote)))))
+    contadores = {nombre: valor for nombre, valor in vars(decodificador).items()
+                  if nombre.startswith(("tramas_", "lineas_"))}
+    return np.concatenate(tramas), np.concatenate(secuencias), contadores
+
+
+def comprobar_todos_los_cortes(clase, datos):
+    """El resultado de decodificar 'datos' no depende de cómo llegan repartidos en las lecturas.
+
+    Prueba un corte en cada posición y también un byte por lectura; devuelve el resultado de una sola lectura.
+    """
+    tramas, secuencias, contadores = decodificar(clase(), [datos])
+    repartos = [[datos[:k], datos[k:]] for k in range(1, len(datos))]
+    repartos.append([datos[k:k + 1] for k in range(len(datos))])
+    for trozos in repartos:
+        tramas_k, secuencias_k, contadores_k = decodificar(clase(), trozos)
+        np.testing.assert_array_equal(tramas_k, tramas)
+        if clase is DecodificadorBinario:
+            np.testing.assert_array_equal(secuencias_k, secuencias)
+        assert contadores_k == contadores, [len(t) for t in trozos[:2]]
+    return tramas, secuencias, contadores
+
+
+def tramas_binarias(tramas=TRAMAS, contador_inicial=0):
+    """Lista con los bytes de cada trama binaria (contador consecutivo)."""
+    datos = codificar_binario(tramas, contador_inicial)
+    return [datos[i:i + BYTES_TRAMA_BINARIA] for i in range(0, len(datos), BYTES_TRAMA_BINARIA)]
+
+
+def test_binario_sin_errores():
+    tramas, secuencias, contadores = comprobar_todos_los_cortes(DecodificadorBinario, b"".join(tramas_binarias()))
+    np.testing.assert_array_equal(tramas, TRAMAS)
+    np.testing.assert_array_equal(secuencias, np.arange(10))
+    assert contadores == {"tramas_validas": 10, "tramas_invalidas": 0, "tramas_perdidas": 0}
+
+
+def test_trama_perdida_salto_del_contador():
+    partes = tramas_binarias()
+    del partes[4]
+    tramas, secuencias, contadores = comprobar_todos_los_cortes(DecodificadorBinario, b"".join(partes))
+    np.testing.assert_array_equal(tramas, np.delete(TRAMAS, 4, axis=0))
+    np.testing.assert_array_equal(secuencias, [0, 1, 2, 3, 5, 6, 7, 8, 9])
+    assert contadores == {"tramas_validas": 9, "tramas_invalidas": 0, "tramas_perdidas": 1}
+
+
+def test_contador_da_la_vuelta():
+    _, secuencias, contadores = comprobar_todos_los_cortes(
+        DecodificadorBinario, b"".join(tramas_binarias(contador_inicial=0xFFFC)))
+    np.testing.assert_array_equal(secuencias, np.arange(10))
+    assert contadores["tramas_perdidas"] == 0
+
+
+@pytest.mark.parametrize("posicion", [3, 100, BYTES_TRAMA_BINARIA - 1])
+def test_checksum_incorrecto(posicion):
+    # Una trama corrupta de cada 10: cuenta una sola vez, se lea como se lea
+    partes = [bytearray(p) for p in tramas_binarias()]
+    partes[3][posicion] ^= 0xFF
+    tramas, secuencias, contadores = comprobar_todos_los_cortes(DecodificadorBinario, b"".join(partes))
+    np.testing.assert_array_equal(tramas, np.delete(TRAMAS, 3, axis=0))
+    np.testing.assert_array_equal(secuencias, [0, 1, 2, 4, 5, 6, 7, 8, 9])
+    assert contadores == {"tramas_validas": 9, "tramas_invalidas": 1, "tramas_perdidas": 1}
+
+
+def test_trama_corrupta_leida_de_a_una_trama():
+    partes = [bytearray(p) for p in tramas_binarias()]
+    partes[6][200] ^= 0xFF
+    _, _, en_una = decodificar(DecodificadorBinario(), [b"".join(partes)])
+    _, _, de_a_una = decodificar(DecodificadorBinario(), [bytes(p) for p in partes])
+    assert en_una["tramas_invalidas"] == de_a_una["tramas_invalidas"] == 1
+
+
+def test_basura_entre_tramas():
+    partes = tramas_binarias()
+    partes.insert(5, b"\x00\xff basura \xa5 sin cabecera\r\n")
+    tramas, _, contadores = comprobar_todos_los_cortes(DecodificadorBinario, b"".join(partes))
+    np.testing.assert_array_equal(tramas, TRAMAS)
+    assert contadores == {"tramas_validas": 10, "tramas_invalidas": 1, "tramas_perdidas": 0}
+
+
+def test_cambio_de_texto_a_binario():
+    # Líneas de texto que quedaban en el puerto al pedir el modo binario: una sola racha descartada
+    datos = b"".join(codificar_texto(TRAMAS[:3])) + b"".join(tramas_binarias(TRAMAS[3:]))
+    tramas, secuencias, contadores = comprobar_todos_los_cortes(DecodificadorBinario, datos)
+    np.testing.assert_array_equal(tramas, TRAMAS[3:])
+    np.testing.assert_array_equal(secuencias, np.arange(7))
+    assert contadores == {"tramas_validas": 7, "tramas_invalidas": 1, "tramas_perdidas": 0}
+
+
+def test_texto_igual_a_loadtxt():
+    datos = b"".join(codificar_texto(TRAMAS[:4]))
+    esperado = np.loadtxt(io.BytesIO(datos), delimiter=",", usecols=range(NUM_PIXELES), dtype=np.uint16)
+    tramas, _, contadores = comprobar_todos_los_cortes(DecodificadorTramas, datos)
+    np.testing.assert_array_equal(tramas, esperado)
+    np.testing.assert_array_equal(tramas, TRAMAS[:4])
+    assert contadores == {"tramas_validas": 4, "lineas_invalidas": 0}
+
+
+def test_texto_lineas_invalidas():
+    lineas = codificar_texto(TRAMAS[:4])
+    lineas.insert(2, b"1,2,3,\n") # Trama incompleta
+    lineas.insert(1, b"\xa5Z\x00\x01\n") # Restos binarios
+    datos = b"".join(lineas).replace(b"\n", b"\r\n")
+    tramas, _, contadores = comprobar_todos_los_cortes(DecodificadorTramas, datos)
+    np.testing.assert_array_equal(tramas, TRAMAS[:4])
+    assert contadores == {"tramas_validas": 4, "lineas_invalidas": 2}
+
+
+def leer_todo(ser, decodificador):
+    tramas, secuencias = [], []
+    while True:
+        lote = decodificador.leer(ser)
+        if len(lote):
+            tramas.append(np.array(lote))
+            secuencias.append(np.array(decodificador.secuencias))
+        elif ser._terminado() and ser.in_waiting == 0:
+            return np.concatenate(tramas), np.concatenate(secuencias)
+
+
+def test_puerto_simulado_binario_con_perdidas_y_corrupcion():
+    ser = PuertoSimulado(TRAMAS, velocidad=None, num_tramas=300, prob_perdida=0.05, prob_corrupcion=0.05,
+                         semilla=3)
+    decodificador = crear_decodificador("binario", ser)
+    assert isinstance(decodificador, DecodificadorBinario)
+    assert ser.binario # El firmware simulado atendió el comando
+    tramas, secuencias = leer_todo(ser, decodificador)
+
+    # El firmware envía TRAMAS en ciclo: cada trama recibida es la que corresponde a su secuencia
+    primera = int(np.flatnonzero(np.all(TRAMAS == tramas[0], axis=1))[0])
+    np.testing.assert_array_equal(tramas, TRAMAS[(primera + secuencias) % len(TRAMAS)])
+    assert decodificador.tramas_validas == len(tramas) < 300
+    assert decodificador.tramas_invalidas > 0
+    # Desde la primera recibida, cada trama enviada llegó o se cuenta como perdida
+    assert decodificador.tramas_validas + decodificador.tramas_perdidas == secuencias[-1] + 1
+
+
+def test_hilo_imprime_el_primer_error_de_cada_tipo(capsys):
+    class FuenteConErrores:
+        lecturas = 0
+
+        def leer_tramas(self):
+            self.lecturas += 1
+            if self.lecturas > 6:
+                hilo._detener.set() # run() en este hilo: sin join
+                return ()
+            raise (ValueError if self.lecturas % 2 else OSError)(self.lecturas) # Tipos alternados
+
+    hilo = HiloAdquisicion(FuenteConErrores(), None)
+    hilo.run()
+    assert hilo.errores == 6
+    impresos = capsys.readouterr().out.splitlines()
+    assert len(impresos) == 2 and "ValueError(1)" in impresos[0] and "OSError(2)" in impresos[1]
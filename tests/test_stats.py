@@ -0,0 +1,40 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from spectro_core import NUM_PIXELES
+from spectro_stats import reducir_rafaga
+
+
+def rafaga(num=32, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return 200 + rng.normal(0, 3, (num, NUM_PIXELES))
+
+
+def test_sigma_rechaza_valores_atipicos():
+    tramas = rafaga()
+    tramas[5, 10] = 1000
+    espectro, _, usadas = reducir_rafaga(tramas, "sigma", 3.0)
+    assert usadas[10] == 31
+    assert abs(espectro[10] - np.delete(tramas[:, 10], 5).mean()) < 1e-9
+
+
+@pytest.mark.parametrize("sigma", [0.0, 0.3, 0.9])
+def test_sigma_menor_que_uno_nunca_deja_un_pixel_vacio(sigma):
+    tramas = rafaga(8)
+    tramas[:, 0] = [0, 10, 0, 10, 0, 10, 0, 10] # Todas a exactamente 1 std de la media
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        espectro, std, usadas = reducir_rafaga(tramas, "sigma", sigma)
+    assert np.all(usadas >= 1)
+    assert np.all(np.isfinite(espectro)) and np.all(np.isfinite(std))
+    assert espectro[0] == 5
+
+
+def test_media_y_mediana():
+    tramas = rafaga(5)
+    np.testing.assert_allclose(reducir_rafaga(tramas, "media")[0], tramas.mean(axis=0))
+    np.testing.assert_allclose(reducir_rafaga(tramas, "mediana")[0], np.median(tramas, axis=0))
+    with pytest.raises(ValueError):
+        reducir_rafaga(tramas, "moda")